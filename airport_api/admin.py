@@ -11,7 +11,9 @@ from airport_api.models import (
     CrewMember,
     Order,
     Ticket,
+    SeatHold,
 )
+from airport_api.seat_holds import delete_holds
 
 
 class TicketInline(admin.TabularInline):
@@ -83,3 +85,22 @@ class TicketAdmin(admin.ModelAdmin):
     @admin.display(description="passenger_full_name")
     def passenger_full_name(self, obj):
         return f"{obj.passenger_first_name} {obj.passenger_last_name}"
+
+
+@admin.register(SeatHold)
+class SeatHoldAdmin(admin.ModelAdmin):
+    list_display = ("flight", "row", "seat", "user", "expires_at")
+    search_fields = ("flight__flight_number",)
+
+    # Holds are placed through the API, which keeps Flight.seats_held in step.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def delete_model(self, request, obj):
+        delete_holds([(obj.id, obj.flight_id)])
+
+    def delete_queryset(self, request, queryset):
+        delete_holds(list(queryset.values_list("id", "flight_id")))
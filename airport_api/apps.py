@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+
+def restore_search_triggers(using, **kwargs):
+    from airport_api.search import restore_sqlite_search_triggers
+
+    connection = connections[using]
+    if connection.vendor == "sqlite":
+        restore_sqlite_search_triggers(connection)
 
 
 class AirportApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "airport_api"
+
+    def ready(self):
+        import airport_api.signals  # noqa: F401
+
+        post_migrate.connect(restore_search_triggers, sender=self)
@@ -0,0 +1,142 @@
+"""
+Async views of the hot read endpoints: flight list and detail,
+route list and airport list. Their queries run on the async ORM,
+acount() for page counts, aiterator() for the rows of a page and aget()
+for a single object, while authentication, permissions, throttles,
+ETags, the response cache and replica reads are the viewsets' own.
+Other methods and cursor pages are handed to the sync viewset.
+"""
+
+from collections.abc import Sequence
+from types import MethodType
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.urls import URLPattern
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.response import Response
+
+
+class PendingRows(Sequence):
+    """
+    Stands in for a list's queryset in DRF's paginator, which only
+    counts it and slices out a page, so page numbers, links and errors
+    stay DRF's own. The rows of the page are read into `rows` afterwards.
+    """
+
+    def __init__(self, count):
+        self.total = count
+        self.rows = []
+        self.page = slice(0, 0)
+
+    def count(self):
+        return self.total
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, index):
+        self.page = index
+        return self.rows
+
+
+async def read_rows(queryset):
+    return [row async for row in queryset.aiterator()]
+
+
+async def serialized(serializer):
+    # Serializers may still follow relations, which is sync only.
+    return await sync_to_async(lambda: serializer.data)()
+
+
+async def list_objects(view, request, *args, **kwargs):
+    queryset = view.filter_queryset(view.get_queryset())
+    paginator = view.paginator
+    if paginator is not None:
+        rows = PendingRows(await queryset.acount())
+        if paginator.paginate_queryset(rows, request, view=view) is not None:
+            rows.rows[:] = await read_rows(queryset[rows.page])
+            serializer = view.get_serializer(rows.rows, many=True)
+            return paginator.get_paginated_response(await serialized(serializer))
+
+    serializer = view.get_serializer(await read_rows(queryset), many=True)
+    return Response(await serialized(serializer))
+
+
+async def retrieve_object(view, request, *args, **kwargs):
+    queryset = view.filter_queryset(view.get_queryset())
+    lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+    try:
+        instance = await queryset.aget(
+            **{view.lookup_field: view.kwargs[lookup_url_kwarg]}
+        )
+    except queryset.model.DoesNotExist:
+        raise Http404(f"No {queryset.model._meta.object_name} matches the given query.")
+    except (TypeError, ValueError, ValidationError):
+        raise Http404
+    view.check_object_permissions(request, instance)
+    return Response(await serialized(view.get_serializer(instance)))
+
+
+HANDLERS = {"list": list_objects, "retrieve": retrieve_object}
+
+
+def async_view(sync_view):
+    """
+    Returns an async view serving the list or retrieve action of the
+    viewset view `sync_view`, as returned by ViewSet.as_view().
+    """
+    actions = sync_view.actions
+
+    async def view(request, *args, **kwargs):
+        handler = HANDLERS.get(actions.get(request.method.lower()))
+        if handler is None or request.GET.get("pagination") == "cursor":
+            return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+        viewset = sync_view.cls(**sync_view.initkwargs)
+        viewset.action_map = actions
+        viewset.get = MethodType(handler, viewset)
+        return await dispatch(viewset, request, *args, **kwargs)
+
+    view.cls = sync_view.cls
+    view.initkwargs = sync_view.initkwargs
+    view.actions = actions
+    return csrf_exempt(view)
+
+
+async def dispatch(view, request, *args, **kwargs):
+    """
+    APIView.dispatch() of a GET request with an async handler.
+    The checks in initial() run in a thread, as authentication
+    and throttling read the database and the cache.
+    """
+    view.args = args
+    view.kwargs = kwargs
+    request = view.initialize_request(request, *args, **kwargs)
+    view.request = request
+    view.headers = view.default_response_headers
+    try:
+        await sync_to_async(view.initial)(request, *args, **kwargs)
+        response = await view.get(request, *args, **kwargs)
+    except Exception as exc:
+        response = view.handle_exception(exc)
+    view.response = view.finalize_response(request, response, *args, **kwargs)
+    return view.response
+
+
+def async_urls(urls, names):
+    """
+    Returns the router's `urls` with the views of the patterns
+    named in `names` replaced by their async views.
+    """
+    return [
+        (
+            URLPattern(
+                url.pattern, async_view(url.callback), url.default_args, url.name
+            )
+            if url.name in names
+            else url
+        )
+        for url in urls
+    ]
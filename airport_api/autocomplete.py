@@ -0,0 +1,140 @@
+import bisect
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass, replace
+
+from django.conf import settings
+
+from airport_api.models import Airport, City
+from airport_api.response_cache import model_versions
+
+# Matches on airport names rank above matches on cities,
+# which rank above matches on countries.
+MATCH_KINDS = ("airport", "city", "country")
+
+
+@dataclass(frozen=True)
+class AirportSuggestion:
+    id: int
+    name: str
+    city: str
+    country: str
+    matched: str = ""
+
+
+def normalize(text):
+    """
+    Folds case and strips accents, so "kyi" finds "Kyïv".
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(
+        char for char in decomposed if not unicodedata.combining(char)
+    ).casefold()
+
+
+def index_terms(text):
+    """
+    Returns the full normalized text and every word that starts
+    inside it, so "new" and "york" both find "New York".
+    """
+    text = normalize(text)
+    words = text.split()
+    return {" ".join(words[index:]) for index in range(len(words))}
+
+
+class AirportPrefixIndex:
+    """
+    Sorted arrays of normalized names, one per kind of match,
+    kept in memory of a worker process. A lookup is a binary search
+    for the prefix followed by a scan that stops after `limit` hits.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._versions = None
+        self._airports = []
+        self._terms = {kind: ([], []) for kind in MATCH_KINDS}
+
+    def _ensure_built(self):
+        ttl = (
+            self.ttl
+            if self.ttl is not None
+            else getattr(settings, "AUTOCOMPLETE_INDEX_TTL", 300)
+        )
+        # Versions are bumped by writes in any worker sharing the cache,
+        # the TTL bounds staleness when the cache is local to the worker.
+        versions = model_versions((Airport, City))
+        if (
+            self._built_at is None
+            or versions != self._versions
+            or time.monotonic() - self._built_at > ttl
+        ):
+            self.build(versions)
+
+    def build(self, versions=None):
+        airports = [
+            AirportSuggestion(*row)
+            for row in Airport.objects.order_by().values_list(
+                "id", "name", "city__name", "city__country"
+            )
+        ]
+
+        entries = {kind: [] for kind in MATCH_KINDS}
+        for position, airport in enumerate(airports):
+            for kind, text in zip(
+                MATCH_KINDS, (airport.name, airport.city, airport.country)
+            ):
+                for term in index_terms(text):
+                    entries[kind].append((term, text, position))
+
+        terms = {}
+        for kind, kind_entries in entries.items():
+            kind_entries.sort()
+            terms[kind] = (
+                [term for term, _, _ in kind_entries],
+                [position for _, _, position in kind_entries],
+            )
+
+        with self._lock:
+            self._airports = airports
+            self._terms = terms
+            self._versions = versions or model_versions((Airport, City))
+            self._built_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def search(self, query, limit=10):
+        prefix = " ".join(normalize(query).split())
+        if not prefix:
+            return []
+
+        with self._lock:
+            self._ensure_built()
+            found = {}
+            for kind in MATCH_KINDS:
+                keys, positions = self._terms[kind]
+                index = bisect.bisect_left(keys, prefix)
+                while (
+                    len(found) < limit
+                    and index < len(keys)
+                    and keys[index].startswith(prefix)
+                ):
+                    position = positions[index]
+                    if position not in found:
+                        found[position] = kind
+                    index += 1
+                if len(found) == limit:
+                    break
+
+            return [
+                replace(self._airports[position], matched=kind)
+                for position, kind in found.items()
+            ]
+
+
+airport_index = AirportPrefixIndex()
@@ -0,0 +1,390 @@
+import http.client
+import json
+import statistics
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count
+from django.http.request import validate_host
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from airport_api.models import Flight, Order, Route, Ticket
+from airport_api.response_cache import get_cache
+from airport_api.seat_holds import active_holds
+from core.middleware import QueryCounter
+
+# Relative change of a metric that counts as a regression.
+DEFAULT_THRESHOLD = 0.2
+COMPARED_METRICS = ("p50_ms", "p95_ms", "queries", "peak_kib")
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+@dataclass
+class Scenario:
+    name: str
+    path: str
+    method: str = "get"
+    params: dict = field(default_factory=dict)
+    data: object = None
+    # Writes are rolled back, so every iteration sees the same data.
+    rollback: bool = False
+
+
+@contextmanager
+def throttling_disabled():
+    throttle_classes = APIView.throttle_classes
+    APIView.throttle_classes = ()
+    try:
+        yield
+    finally:
+        APIView.throttle_classes = throttle_classes
+
+
+def benchmark_host():
+    allowed = settings.ALLOWED_HOSTS
+    if not allowed and settings.DEBUG:
+        allowed = [".localhost", "127.0.0.1", "[::1]"]
+    for host in ("testserver", "localhost", *(host.lstrip(".") for host in allowed)):
+        if validate_host(host, allowed):
+            return host
+    raise BenchmarkError("ALLOWED_HOSTS has no host the benchmark can use.")
+
+
+def percentile(quantiles, value):
+    return round(quantiles[value - 1], 3)
+
+
+def summarize(timings, queries, peak_bytes):
+    timings = [seconds * 1000 for seconds in timings]
+    quantiles = (
+        statistics.quantiles(timings, n=100, method="inclusive")
+        if len(timings) > 1
+        else timings * 99
+    )
+    return {
+        "p50_ms": percentile(quantiles, 50),
+        "p95_ms": percentile(quantiles, 95),
+        "p99_ms": percentile(quantiles, 99),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "queries": max(queries),
+        "peak_kib": round(peak_bytes / 1024, 1),
+    }
+
+
+def build_scenarios():
+    """
+    Requests against the hot endpoints, with parameters taken from
+    the data, so filters and orders hit real rows.
+    """
+    flight = (
+        Flight.objects.annotate(available=Flight.available_seats_expression())
+        .filter(available__gte=50)
+        .select_related("route__source__city", "route__destination__city")
+        .order_by("-seats_sold")
+        .first()
+    )
+    if flight is None:
+        raise BenchmarkError(
+            "No flight with 50 free seats, run generate_dataset first."
+        )
+
+    departure_date = flight.departure_time.date()
+    flights_url = reverse("airport:flight-list")
+    scenarios = [
+        Scenario("flights.list", flights_url),
+        Scenario("flights.list.cursor", flights_url, params={"pagination": "cursor"}),
+        Scenario(
+            "flights.list.departure_after",
+            flights_url,
+            params={"departure_time_after": departure_date},
+        ),
+        Scenario(
+            "flights.list.departure_before",
+            flights_url,
+            params={"departure_time_before": departure_date + timedelta(days=1)},
+        ),
+        Scenario(
+            "flights.list.arrival_after",
+            flights_url,
+            params={"arrival_time_after": departure_date},
+        ),
+        Scenario(
+            "flights.list.arrival_before",
+            flights_url,
+            params={"arrival_time_before": departure_date + timedelta(days=1)},
+        ),
+        Scenario(
+            "flights.list.source_city",
+            flights_url,
+            params={"source_city": flight.route.source.city.name},
+        ),
+        Scenario(
+            "flights.list.destination_city",
+            flights_url,
+            params={"destination_city": flight.route.destination.city.name},
+        ),
+        Scenario(
+            "flights.retrieve",
+            reverse("airport:flight-detail", args=[flight.id]),
+        ),
+        Scenario("orders.list", reverse("airport:order-list")),
+        Scenario("routes.list", reverse("airport:route-list")),
+    ]
+
+    taken = set(Ticket.objects.filter(flight=flight).values_list("row", "seat")) | set(
+        active_holds().filter(flight=flight).values_list("row", "seat")
+    )
+    free_seats = [
+        (row, seat)
+        for row in range(1, flight.airplane.rows + 1)
+        for seat in range(1, flight.airplane.seats_in_row + 1)
+        if (row, seat) not in taken
+    ]
+    for size in (1, 10, 50):
+        scenarios.append(
+            Scenario(
+                f"orders.create.{size}",
+                reverse("airport:order-list"),
+                method="post",
+                data={
+                    "tickets": [
+                        {
+                            "row": row,
+                            "seat": seat,
+                            "passenger_first_name": "Bench",
+                            "passenger_last_name": "Mark",
+                            "flight": flight.id,
+                        }
+                        for row, seat in free_seats[:size]
+                    ]
+                },
+                rollback=True,
+            )
+        )
+    return scenarios
+
+
+class BenchmarkRunner:
+    """
+    Sends each scenario through the full Django stack in process.
+    Latency and query counts are measured over `iterations` requests,
+    allocations over one extra request traced by tracemalloc,
+    which would otherwise slow the timed requests down.
+    """
+
+    def __init__(self, iterations=30, warmup=3, cold_cache=False):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.cold_cache = cold_cache
+        self.user = (
+            get_user_model()
+            .objects.annotate(orders_count=Count("orders"))
+            .order_by("-orders_count")
+            .first()
+        )
+        if self.user is None:
+            raise BenchmarkError("No users, run generate_dataset first.")
+        # Not a loopback address, so the debug toolbar stays out of the way.
+        self.client = APIClient(HTTP_HOST=benchmark_host(), REMOTE_ADDR="10.0.0.1")
+        self.client.force_authenticate(self.user)
+
+    def request(self, scenario):
+        if scenario.method == "get":
+            return self.client.get(scenario.path, scenario.params)
+        return getattr(self.client, scenario.method)(
+            scenario.path, scenario.data, format="json"
+        )
+
+    def send(self, scenario):
+        if self.cold_cache:
+            get_cache().clear()
+        if not scenario.rollback:
+            return self.request(scenario)
+
+        with transaction.atomic():
+            response = self.request(scenario)
+            transaction.set_rollback(True)
+        return response
+
+    def check(self, scenario, response):
+        if response.status_code >= 400:
+            raise BenchmarkError(
+                f"{scenario.name} answered {response.status_code}: "
+                f"{response.content[:200]!r}"
+            )
+
+    def run_scenario(self, scenario):
+        for _ in range(self.warmup):
+            self.check(scenario, self.send(scenario))
+
+        timings, queries = [], []
+        for _ in range(self.iterations):
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                response = self.send(scenario)
+                timings.append(time.perf_counter() - started)
+            self.check(scenario, response)
+            queries.append(counter.count)
+
+        tracemalloc.start()
+        try:
+            self.send(scenario)
+            _, peak_bytes = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return summarize(timings, queries, peak_bytes)
+
+    def run(self, names=None, log=None):
+        with throttling_disabled():
+            scenarios = build_scenarios()
+            if names:
+                scenarios = [
+                    scenario
+                    for scenario in scenarios
+                    if any(scenario.name.startswith(name) for name in names)
+                ]
+
+            results = {}
+            for scenario in scenarios:
+                results[scenario.name] = self.run_scenario(scenario)
+                if log:
+                    log(scenario.name, results[scenario.name])
+
+        return {
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "iterations": self.iterations,
+            "cold_cache": self.cold_cache,
+            "dataset": {
+                "flights": Flight.objects.count(),
+                "routes": Route.objects.count(),
+                "orders": Order.objects.count(),
+                "tickets": Ticket.objects.count(),
+            },
+            "scenarios": results,
+        }
+
+
+class LoadTester:
+    """
+    Sends GET requests to a running server from `concurrency` threads,
+    each over its own keep-alive connection, for `duration` seconds.
+    Unlike BenchmarkRunner it goes through the real server,
+    so it measures the serving mode (workers, threads, ASGI)
+    rather than the view code.
+    """
+
+    def __init__(self, url, concurrency=16, duration=10, headers=None):
+        self.url = urlsplit(url)
+        if self.url.scheme not in ("http", "https") or not self.url.hostname:
+            raise BenchmarkError(f"{url} is not an http(s) URL.")
+        self.concurrency = concurrency
+        self.duration = duration
+        self.headers = headers or {}
+        self.lock = threading.Lock()
+
+    def connect(self):
+        connection_class = (
+            http.client.HTTPSConnection
+            if self.url.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        return connection_class(self.url.hostname, self.url.port, timeout=30)
+
+    def worker(self, deadline, timings, statuses):
+        path = self.url.path or "/"
+        if self.url.query:
+            path = f"{path}?{self.url.query}"
+        connection = self.connect()
+        local_timings, local_statuses = [], Counter()
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    connection.request("GET", path, headers=self.headers)
+                    response = connection.getresponse()
+                    response.read()
+                except (OSError, http.client.HTTPException):
+                    local_statuses["error"] += 1
+                    connection.close()
+                    connection = self.connect()
+                    continue
+                local_timings.append(time.perf_counter() - started)
+                local_statuses[response.status] += 1
+        finally:
+            connection.close()
+        with self.lock:
+            timings += local_timings
+            statuses.update(local_statuses)
+
+    def run(self):
+        timings, statuses = [], Counter()
+        started = time.perf_counter()
+        deadline = started + self.duration
+        threads = [
+            threading.Thread(target=self.worker, args=(deadline, timings, statuses))
+            for _ in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if not timings:
+            raise BenchmarkError(f"No request succeeded: {dict(statuses)}")
+        metrics = summarize(timings, [0], 0)
+        return {
+            "url": self.url.geturl(),
+            "concurrency": self.concurrency,
+            "requests": len(timings),
+            "requests_per_second": round(len(timings) / elapsed, 1),
+            "p50_ms": metrics["p50_ms"],
+            "p95_ms": metrics["p95_ms"],
+            "p99_ms": metrics["p99_ms"],
+            "statuses": {str(status): count for status, count in statuses.items()},
+        }
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Returns (scenario, metric, old, new, change, regressed) rows for
+    every metric of the scenarios present in both runs. Any extra query
+    is a regression, other metrics regress above `threshold`.
+    """
+    rows = []
+    for name, new_metrics in current["scenarios"].items():
+        old_metrics = baseline["scenarios"].get(name)
+        if old_metrics is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = old_metrics[metric], new_metrics[metric]
+            change = (new - old) / old if old else 0.0
+            if metric == "queries":
+                regressed = new > old
+            else:
+                regressed = change > threshold
+            rows.append((name, metric, old, new, change, regressed))
+    return rows
@@ -0,0 +1,276 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import UniqueConstraint, prefetch_related_objects
+from django.dispatch import Signal
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+BULK_BATCH_SIZE = 500
+BULK_MAX_ITEMS = 5000
+
+# Sent once per bulk write with the created or updated `instances`,
+# in place of the post_save signals bulk_create and bulk_update skip.
+post_bulk_save = Signal()
+
+
+def unique_field_sets(model):
+    """
+    Returns the field names of every unique field and unconditional
+    unique constraint of the model, e.g. [("flight_number",)].
+    """
+    field_sets = [
+        (field.name,)
+        for field in model._meta.concrete_fields
+        if field.unique and not field.primary_key
+    ]
+    field_sets += [
+        tuple(constraint.fields)
+        for constraint in model._meta.constraints
+        if isinstance(constraint, UniqueConstraint)
+        and constraint.fields
+        and constraint.condition is None
+    ]
+    return field_sets
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    Validates and writes a list of objects in a fixed number of queries:
+    related objects are fetched with one query per table, uniqueness is
+    checked in memory plus one query per unique field set, and rows are
+    written with bulk_create/bulk_update in batches in one transaction.
+
+    Updates expect the instances as a {pk: object} dict and an "id"
+    in every item. Errors are returned per item, in request order.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.model = self.child.Meta.model
+        self.many_to_many = [
+            name
+            for name, field in self.child.fields.items()
+            if not field.read_only and isinstance(field, serializers.ManyRelatedField)
+        ]
+
+    def prefetch_related(self, data):
+        # PrefetchedPrimaryKeyRelatedField reads objects from the context.
+        pks = defaultdict(set)
+        querysets = {}
+        for name, field in self.child.fields.items():
+            relation = getattr(field, "child_relation", field)
+            context_key = getattr(relation, "context_key", None)
+            if context_key is None or field.read_only:
+                continue
+            querysets[context_key] = relation.get_queryset()
+            for item in data:
+                if not isinstance(item, dict) or name not in item:
+                    continue
+                values = item[name] if relation is not field else [item[name]]
+                for value in values if isinstance(values, list) else []:
+                    try:
+                        pks[context_key].add(int(value))
+                    except (TypeError, ValueError):
+                        continue
+
+        for context_key, queryset in querysets.items():
+            self.context[context_key] = queryset.in_bulk(pks[context_key])
+
+    def run_child_validation(self, data):
+        instance = None
+        if self.instance is not None:
+            pk = data.get("id") if isinstance(data, dict) else None
+            try:
+                instance = self.instance.get(int(pk))
+            except (TypeError, ValueError):
+                pass
+            if instance is None:
+                self.validated_items.append(None)
+                raise serializers.ValidationError(
+                    {"id": [f'Invalid pk "{pk}" - object does not exist.']},
+                    code="does_not_exist",
+                )
+
+        self.child.instance = instance
+        self.child.initial_data = data
+        try:
+            attrs = super().run_child_validation(data)
+        except serializers.ValidationError:
+            self.validated_items.append(None)
+            raise
+        self.validated_items.append((instance, attrs))
+        return attrs
+
+    def to_internal_value(self, data):
+        self.validated_items = []
+        if isinstance(data, list):
+            self.prefetch_related(data)
+
+        try:
+            validated_data = super().to_internal_value(data)
+        except serializers.ValidationError as error:
+            if not isinstance(error.detail, list):
+                raise
+            errors = error.detail
+        else:
+            errors = [{} for _ in validated_data]
+
+        for index, unique_errors in self.check_unique().items():
+            errors[index] = {**errors[index], **unique_errors}
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        self.child.instance = None
+        self.targets = [instance for instance, _ in self.validated_items]
+        return validated_data
+
+    def check_unique(self):
+        """
+        Finds values of unique fields repeated inside the request
+        or already taken by rows that are not part of it.
+        """
+        errors = defaultdict(dict)
+        updated_pks = [item[0].pk for item in self.validated_items if item and item[0]]
+
+        for field_names in unique_field_sets(self.model):
+            fields = [self.model._meta.get_field(name) for name in field_names]
+            if len(fields) == 1:
+                error_key = field_names[0]
+                taken_message = (
+                    f"{self.model._meta.verbose_name} with this "
+                    f"{fields[0].verbose_name} already exists."
+                )
+            else:
+                error_key = api_settings.NON_FIELD_ERRORS_KEY
+                taken_message = (
+                    f"The fields {', '.join(field_names)} must make a unique set."
+                )
+
+            first_seen = {}
+            for index, item in enumerate(self.validated_items):
+                if item is None:
+                    continue
+                instance, attrs = item
+                key = tuple(
+                    (
+                        getattr(attrs[field.name], "pk", attrs[field.name])
+                        if field.name in attrs
+                        else getattr(instance, field.attname, None)
+                    )
+                    for field in fields
+                )
+                if None in key:
+                    continue
+                if key in first_seen:
+                    errors[index][error_key] = [
+                        f"Repeats the {', '.join(field_names)} "
+                        f"of item {first_seen[key]}."
+                    ]
+                else:
+                    first_seen[key] = index
+
+            if not first_seen:
+                continue
+            taken = (
+                self.model.objects.filter(
+                    **{f"{fields[0].attname}__in": {key[0] for key in first_seen}}
+                )
+                .exclude(pk__in=updated_pks)
+                .values_list(*(field.attname for field in fields))
+            )
+            for key in set(taken).intersection(first_seen):
+                errors[first_seen[key]][error_key] = [taken_message]
+
+        return errors
+
+    def split_attrs(self, attrs):
+        attrs = dict(attrs)
+        related = {name: attrs.pop(name) for name in self.many_to_many if name in attrs}
+        return attrs, related
+
+    def set_many_to_many(self, instances, related_items):
+        for name in self.many_to_many:
+            field = self.model._meta.get_field(name)
+            through = field.remote_field.through
+            source = field.m2m_field_name()
+            target = field.m2m_reverse_field_name()
+            changed = [
+                (instance, dict.fromkeys(related[name]))
+                for instance, related in zip(instances, related_items)
+                if name in related
+            ]
+            if not changed:
+                continue
+
+            through.objects.filter(
+                **{f"{source}__in": [instance.pk for instance, _ in changed]}
+            ).delete()
+            through.objects.bulk_create(
+                [
+                    through(**{f"{source}_id": instance.pk, f"{target}_id": obj.pk})
+                    for instance, objs in changed
+                    for obj in objs
+                ],
+                batch_size=BULK_BATCH_SIZE,
+            )
+
+    def write(self, save):
+        try:
+            with transaction.atomic():
+                instances = save()
+        except IntegrityError:
+            # A concurrent request took one of the unique values.
+            raise serializers.ValidationError(
+                {
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        "One of the items conflicts with an existing object."
+                    ]
+                },
+                code="unique",
+            )
+        prefetch_related_objects(instances, *self.many_to_many)
+        return instances
+
+    def create(self, validated_data):
+        def save():
+            instances, related_items = [], []
+            for attrs in validated_data:
+                attrs, related = self.split_attrs(attrs)
+                instances.append(self.model(**attrs))
+                related_items.append(related)
+
+            self.model.objects.bulk_create(instances, batch_size=BULK_BATCH_SIZE)
+            self.set_many_to_many(instances, related_items)
+            post_bulk_save.send(sender=self.model, instances=instances, created=True)
+            return instances
+
+        return self.write(save)
+
+    def update(self, instance, validated_data):
+        def save():
+            instances, related_items = [], []
+            update_fields = set()
+            for target, attrs in zip(self.targets, validated_data):
+                attrs, related = self.split_attrs(attrs)
+                for name, value in attrs.items():
+                    setattr(target, name, value)
+                update_fields.update(attrs)
+                instances.append(target)
+                related_items.append(related)
+
+            # bulk_update doesn't call pre_save, so auto_now is applied here.
+            for field in self.model._meta.concrete_fields:
+                if getattr(field, "auto_now", False):
+                    for target in instances:
+                        field.pre_save(target, add=False)
+                    update_fields.add(field.name)
+
+            self.model.objects.bulk_update(
+                instances, sorted(update_fields), batch_size=BULK_BATCH_SIZE
+            )
+            self.set_many_to_many(instances, related_items)
+            post_bulk_save.send(sender=self.model, instances=instances, created=False)
+            return instances
+
+        return self.write(save)
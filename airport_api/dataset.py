@@ -0,0 +1,358 @@
+import math
+import random
+import secrets
+import string
+from datetime import timedelta
+from itertools import accumulate, product
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from airport_api.bulk import post_bulk_save
+from airport_api.models import (
+    City,
+    Airport,
+    Route,
+    AirplaneType,
+    Airplane,
+    Role,
+    CrewMember,
+    Flight,
+    Order,
+    Ticket,
+)
+
+SYLLABLES = "ka lo mi ra to ne sa vi do ber lin por ta ze gra mo sk an ul ri".split()
+FIRST_NAMES = (
+    "Anna Ivan Olena Taras Maria John Emma Lucas "
+    "Sofia Noah Mia Oleh Iryna Liam Chloe Adam"
+).split()
+LAST_NAMES = (
+    "Shevchenko Kovalenko Bondar Smith Brown Muller "
+    "Rossi Novak Garcia Tkachenko Lee Martin"
+).split()
+
+# name -> (rows, seats in row, cruise speed in km/h)
+AIRPLANE_TYPES = {
+    "Regional": ((15, 22), 4, 650),
+    "Narrow-body": ((25, 33), 6, 830),
+    "Wide-body": ((35, 50), 9, 900),
+}
+ROLES = ("Captain", "First Officer", "Flight Attendant", "Flight Engineer")
+
+# Share of orders with 1, 2, 3 and 4 tickets.
+TICKETS_PER_ORDER = (0.55, 0.25, 0.12, 0.08)
+# Relative number of departures in each hour of the day,
+# with morning and evening peaks.
+# fmt: off
+DEPARTURE_HOURS = (
+    1, 1, 1, 1, 1, 3, 8, 10, 9, 7, 6, 6,
+    6, 6, 6, 7, 8, 9, 10, 8, 6, 4, 2, 1,
+)
+# fmt: on
+
+
+def zipf_weights(count, exponent=1.1):
+    """
+    Popularity of the n-th item falls like 1 / n^exponent,
+    so a few hubs get most of the routes and passengers.
+    """
+    return [1 / (rank + 1) ** exponent for rank in range(count)]
+
+
+def distance_km(first, second):
+    (lat1, lon1), (lat2, lon2) = (map(math.radians, point) for point in (first, second))
+    hav = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return max(1, round(2 * 6371 * math.asin(math.sqrt(hav))))
+
+
+class DatasetGenerator:
+    """
+    Builds a random but reproducible schedule with bulk inserts.
+    The same seed and sizes always produce the same rows.
+    """
+
+    def __init__(
+        self,
+        seed=0,
+        cities=100,
+        airplanes=50,
+        routes=500,
+        flights=10000,
+        crew_members=500,
+        users=1000,
+        orders=50000,
+        days=60,
+        batch_size=5000,
+        log=None,
+    ):
+        self.random = random.Random(seed)
+        self.sizes = {
+            "cities": cities,
+            "airplanes": airplanes,
+            "routes": routes,
+            "flights": flights,
+            "crew_members": crew_members,
+            "users": users,
+            "orders": orders,
+        }
+        self.days = days
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+
+    def bulk_create(self, model, objects, **kwargs):
+        created = model.objects.bulk_create(
+            objects, batch_size=self.batch_size, **kwargs
+        )
+        post_bulk_save.send(sender=model, instances=created, created=True)
+        self.log(f"{model._meta.verbose_name_plural}: {len(created)}")
+        return created
+
+    def generate(self):
+        with transaction.atomic():
+            self.create_network()
+            self.create_fleet()
+            self.create_flights()
+        self.create_orders()
+
+    def city_name(self, used):
+        while True:
+            name = "".join(
+                self.random.choice(SYLLABLES) for _ in range(self.random.randint(2, 3))
+            ).capitalize()
+            if name not in used:
+                used.add(name)
+                return name
+
+    def create_network(self):
+        used = set()
+        countries = [
+            self.city_name(used) for _ in range(max(1, self.sizes["cities"] // 8))
+        ]
+        cities = self.bulk_create(
+            City,
+            [
+                City(name=self.city_name(used), country=self.random.choice(countries))
+                for _ in range(self.sizes["cities"])
+            ],
+        )
+        self.coordinates = {
+            city.pk: (self.random.uniform(-60, 70), self.random.uniform(-180, 180))
+            for city in cities
+        }
+
+        # Bigger cities, the first ones, get more airports.
+        airports = []
+        for rank, city in enumerate(cities):
+            count = (
+                3 if rank < len(cities) // 20 else 2 if rank < len(cities) // 5 else 1
+            )
+            airports += [
+                Airport(city=city, name=f"{city.name} {label}")
+                for label in ("International", "Central", "North")[:count]
+            ]
+        self.airports = self.bulk_create(Airport, airports)
+
+        weights = list(accumulate(zipf_weights(len(self.airports))))
+        pairs = set()
+        max_routes = len(self.airports) * (len(self.airports) - 1)
+        while len(pairs) < min(self.sizes["routes"], max_routes):
+            source, destination = self.random.choices(
+                self.airports, cum_weights=weights, k=2
+            )
+            if source.city_id != destination.city_id:
+                pairs.add((source, destination))
+        self.routes = self.bulk_create(
+            Route,
+            [
+                Route(
+                    source=source,
+                    destination=destination,
+                    distance=distance_km(
+                        self.coordinates[source.city_id],
+                        self.coordinates[destination.city_id],
+                    ),
+                )
+                for source, destination in sorted(
+                    pairs, key=lambda pair: (pair[0].pk, pair[1].pk)
+                )
+            ],
+        )
+
+    def create_fleet(self):
+        airplane_types = self.bulk_create(
+            AirplaneType, [AirplaneType(name=name) for name in AIRPLANE_TYPES]
+        )
+        airplanes = []
+        for number in range(self.sizes["airplanes"]):
+            airplane_type = self.random.choices(airplane_types, (3, 6, 1))[0]
+            rows, seats_in_row, _ = AIRPLANE_TYPES[airplane_type.name]
+            airplanes.append(
+                Airplane(
+                    model_name=f"{airplane_type.name} {number + 1:03d}",
+                    rows=self.random.randint(*rows),
+                    seats_in_row=seats_in_row,
+                    airplane_type=airplane_type,
+                )
+            )
+        self.airplanes = self.bulk_create(Airplane, airplanes)
+
+        roles = self.bulk_create(Role, [Role(name=name) for name in ROLES])
+        self.crew_members = self.bulk_create(
+            CrewMember,
+            [
+                CrewMember(
+                    first_name=self.random.choice(FIRST_NAMES),
+                    last_name=self.random.choice(LAST_NAMES),
+                    role=self.random.choices(roles, (1, 1, 4, 0.3))[0],
+                )
+                for _ in range(self.sizes["crew_members"])
+            ],
+        )
+
+    def flight_numbers(self):
+        for letters in product(string.ascii_uppercase, repeat=2):
+            for number in range(1, 10000):
+                yield f"{''.join(letters)}{number}"
+
+    def create_flights(self):
+        start = timezone.now().replace(minute=0, second=0, microsecond=0)
+        route_weights = zipf_weights(len(self.routes), exponent=0.8)
+        speeds = {name: speed for name, (_, _, speed) in AIRPLANE_TYPES.items()}
+        airplane_types = {
+            airplane_type.pk: airplane_type.name
+            for airplane_type in AirplaneType.objects.all()
+        }
+        flight_numbers = self.flight_numbers()
+
+        flights = []
+        for route in self.random.choices(
+            self.routes, route_weights, k=self.sizes["flights"]
+        ):
+            airplane = self.random.choice(self.airplanes)
+            departure_time = start + timedelta(
+                days=self.random.randrange(self.days),
+                hours=self.random.choices(range(24), DEPARTURE_HOURS)[0],
+                minutes=self.random.randrange(0, 60, 5),
+            )
+            speed = speeds[airplane_types[airplane.airplane_type_id]]
+            flights.append(
+                Flight(
+                    flight_number=next(flight_numbers),
+                    route=route,
+                    airplane=airplane,
+                    departure_time=departure_time,
+                    arrival_time=departure_time
+                    + timedelta(minutes=30 + route.distance / speed * 60),
+                    status=self.random.choices(
+                        (Flight.Status.SCHEDULED, Flight.Status.CANCELED), (98, 2)
+                    )[0],
+                )
+            )
+        self.flights = self.bulk_create(Flight, flights)
+
+        through = Flight.crew.through
+        if self.crew_members:
+            self.bulk_create(
+                through,
+                [
+                    through(flight_id=flight.pk, crewmember_id=member.pk)
+                    for flight in self.flights
+                    for member in self.random.sample(
+                        self.crew_members, min(4, len(self.crew_members))
+                    )
+                ],
+            )
+
+    def create_orders(self):
+        password = make_password(None)
+        # Not seeded, so repeated runs don't clash on unique emails.
+        run = secrets.token_hex(4)
+        users = self.bulk_create(
+            get_user_model(),
+            [
+                get_user_model()(
+                    email=f"passenger{number}.{run}@example.com",
+                    password=password,
+                )
+                for number in range(self.sizes["users"])
+            ],
+        )
+        if not users or not self.flights:
+            return
+
+        # Free seats of every flight in random order, shuffled on first use.
+        free_seats = {}
+        sold = {}
+        flight_weights = zipf_weights(len(self.flights), exponent=0.6)
+        self.random.shuffle(flight_weights)
+        flight_weights = list(accumulate(flight_weights))
+
+        orders_left = self.sizes["orders"]
+        orders_created = 0
+        tickets_created = 0
+        while orders_left > 0:
+            batch = min(self.batch_size, orders_left)
+            orders_left -= batch
+
+            # (user, flight, seats) of every order, orders picking
+            # a full flight are skipped.
+            planned = []
+            for _ in range(batch):
+                size = self.random.choices((1, 2, 3, 4), TICKETS_PER_ORDER)[0]
+                (flight,) = self.random.choices(
+                    self.flights, cum_weights=flight_weights
+                )
+                seats = free_seats.get(flight.pk)
+                if seats is None:
+                    airplane = flight.airplane
+                    seats = list(
+                        product(
+                            range(1, airplane.rows + 1),
+                            range(1, airplane.seats_in_row + 1),
+                        )
+                    )
+                    self.random.shuffle(seats)
+                    free_seats[flight.pk] = seats
+                if not seats:
+                    continue
+                taken = [seats.pop() for _ in range(min(size, len(seats)))]
+                sold[flight.pk] = sold.get(flight.pk, 0) + len(taken)
+                planned.append((self.random.choice(users), flight, taken))
+
+            with transaction.atomic():
+                orders = Order.objects.bulk_create(
+                    [Order(user_id=user.pk) for user, _, _ in planned],
+                    batch_size=self.batch_size,
+                )
+                tickets = [
+                    Ticket(
+                        order_id=order.pk,
+                        flight_id=flight.pk,
+                        row=row,
+                        seat=seat,
+                        passenger_first_name=self.random.choice(FIRST_NAMES),
+                        passenger_last_name=self.random.choice(LAST_NAMES),
+                    )
+                    for order, (_, flight, taken) in zip(orders, planned)
+                    for row, seat in taken
+                ]
+                Ticket.objects.bulk_create(tickets, batch_size=self.batch_size)
+                orders_created += len(orders)
+                tickets_created += len(tickets)
+
+        self.log(f"orders: {orders_created}")
+        self.log(f"tickets: {tickets_created}")
+
+        # bulk_create skips the signal that counts sold seats.
+        for flight in self.flights:
+            flight.seats_sold = sold.get(flight.pk, 0)
+        Flight.objects.bulk_update(
+            self.flights, ["seats_sold"], batch_size=self.batch_size
+        )
+        post_bulk_save.send(sender=Flight, instances=self.flights, created=False)
@@ -0,0 +1,152 @@
+from collections import defaultdict
+
+from django.db.models import F, Q
+
+from airport_api.models import (
+    Airplane,
+    Airport,
+    City,
+    CrewMember,
+    Flight,
+    FlightSearchEntry,
+    Route,
+)
+
+BATCH_SIZE = 1000
+
+ENTRY_FIELDS = (
+    "flight_number",
+    "source_city",
+    "destination_city",
+    "route_name",
+    "airplane_model",
+    "capacity",
+    "seats_sold",
+    "seats_held",
+    "departure_time",
+    "arrival_time",
+    "status",
+    "updated_at",
+)
+
+# Model copied into the entries -> lookups from Flight to it.
+FLIGHT_LOOKUPS = {
+    Route: ("route",),
+    Airport: ("route__source", "route__destination"),
+    City: ("route__source__city", "route__destination__city"),
+    Airplane: ("airplane",),
+}
+
+
+def build_entries(flights):
+    """
+    Yields unsaved search entries of the flights queryset,
+    read with one query per BATCH_SIZE flights.
+    """
+    rows = (
+        flights.order_by()
+        .annotate(
+            source_city=F("route__source__city__name"),
+            destination_city=F("route__destination__city__name"),
+            airplane_model=F("airplane__model_name"),
+            capacity=F("airplane__rows") * F("airplane__seats_in_row"),
+        )
+        .values_list(
+            "id",
+            "flight_number",
+            "source_city",
+            "destination_city",
+            "airplane_model",
+            "capacity",
+            "seats_sold",
+            "seats_held",
+            "departure_time",
+            "arrival_time",
+            "status",
+        )
+    )
+    for (
+        flight_id,
+        flight_number,
+        source_city,
+        destination_city,
+        airplane_model,
+        capacity,
+        seats_sold,
+        seats_held,
+        departure_time,
+        arrival_time,
+        status,
+    ) in rows.iterator(chunk_size=BATCH_SIZE):
+        yield FlightSearchEntry(
+            flight_id=flight_id,
+            flight_number=flight_number,
+            source_city=source_city,
+            destination_city=destination_city,
+            # Route.name, without loading the route and its cities.
+            route_name=f"{source_city} - {destination_city}",
+            airplane_model=airplane_model,
+            capacity=capacity,
+            seats_sold=seats_sold,
+            seats_held=seats_held,
+            departure_time=departure_time,
+            arrival_time=arrival_time,
+            status=status,
+        )
+
+
+def refresh_flights(flights):
+    """
+    Writes the search entries of the flights queryset,
+    inserting the missing ones and overwriting the others.
+    Returns the number of entries written.
+    """
+    written = 0
+    batch = []
+    for entry in build_entries(flights):
+        batch.append(entry)
+        if len(batch) == BATCH_SIZE:
+            written += upsert(batch)
+            batch = []
+    return written + upsert(batch)
+
+
+def upsert(entries):
+    if entries:
+        FlightSearchEntry.objects.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=["flight"],
+            update_fields=ENTRY_FIELDS,
+        )
+    return len(entries)
+
+
+def refresh_flights_of(model, pks):
+    """
+    Refreshes the entries of the flights that copy a field of the
+    `model` objects with the pks, e.g. a renamed city's name.
+    """
+    if not pks:
+        return 0
+    condition = Q()
+    for lookup in FLIGHT_LOOKUPS[model]:
+        condition |= Q(**{f"{lookup}__in": pks})
+    return refresh_flights(Flight.objects.filter(condition))
+
+
+def attach_crew(entries):
+    """
+    Sets `crew_names` of the entries, as the flight list shows them,
+    with one query for all of them.
+    """
+    crew_names = defaultdict(list)
+    members = (
+        CrewMember.objects.filter(flights__in=[entry.pk for entry in entries])
+        .annotate(listed_flight=F("flights"))
+        .only("first_name", "last_name")
+    )
+    for member in members:
+        crew_names[member.listed_flight].append(member.full_name)
+    for entry in entries:
+        entry.crew_names = crew_names[entry.pk]
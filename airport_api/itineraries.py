@@ -0,0 +1,324 @@
+import bisect
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from airport_api.models import Flight
+
+
+@dataclass(frozen=True)
+class FlightLeg:
+    id: int
+    flight_number: str
+    route_id: int
+    source_id: int
+    destination_id: int
+    departure_time: datetime
+    arrival_time: datetime
+    distance: int
+
+
+@dataclass
+class Itinerary:
+    legs: list
+    source: str
+    destination: str
+
+    @property
+    def departure_time(self):
+        return self.legs[0].departure_time
+
+    @property
+    def arrival_time(self):
+        return self.legs[-1].arrival_time
+
+    @property
+    def duration(self):
+        return int((self.arrival_time - self.departure_time).total_seconds() // 60)
+
+    @property
+    def distance(self):
+        return sum(leg.distance for leg in self.legs)
+
+    @property
+    def connections(self):
+        return len(self.legs) - 1
+
+
+class FlightGraph:
+    """
+    Time-expanded flight graph kept in memory of a worker process.
+
+    Airports are nodes, bookable flights are edges sorted by departure
+    time, so the connections from an airport inside a time window
+    are found with a binary search instead of a query.
+
+    Updates replace an airport's departure list instead of changing it
+    in place, so a search only holds the lock to take a snapshot.
+    """
+
+    def __init__(self, ttl=None, max_expansions=None):
+        self.ttl = ttl
+        self.max_expansions = max_expansions
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._legs = {}
+        self._departures = {}
+        self._airport_names = {}
+
+    def _is_stale(self):
+        ttl = (
+            self.ttl
+            if self.ttl is not None
+            else getattr(settings, "ITINERARY_GRAPH_TTL", 300)
+        )
+        return self._built_at is None or time.monotonic() - self._built_at > ttl
+
+    @staticmethod
+    def _bookable(flights):
+        return flights.filter(departure_time__gt=timezone.now()).exclude(
+            status=Flight.Status.CANCELED
+        )
+
+    @staticmethod
+    def _flight_rows(flights):
+        rows = flights.order_by().values_list(
+            "id",
+            "flight_number",
+            "route_id",
+            "route__source_id",
+            "route__destination_id",
+            "departure_time",
+            "arrival_time",
+            "route__distance",
+            "route__source__name",
+            "route__source__city__name",
+            "route__destination__name",
+            "route__destination__city__name",
+        )
+        for row in rows.iterator(chunk_size=2000):
+            leg = FlightLeg(*row[:8])
+            source_name, source_city, destination_name, destination_city = row[8:]
+            yield (
+                leg,
+                f"{source_city} - {source_name}",
+                f"{destination_city} - {destination_name}",
+            )
+
+    def build(self):
+        legs = {}
+        departures = {}
+        airport_names = {}
+
+        for leg, source_name, destination_name in self._flight_rows(
+            self._bookable(Flight.objects.all())
+        ):
+            legs[leg.id] = leg
+            departures.setdefault(leg.source_id, []).append(
+                (leg.departure_time, leg.id, leg)
+            )
+            airport_names[leg.source_id] = source_name
+            airport_names[leg.destination_id] = destination_name
+
+        for airport_departures in departures.values():
+            airport_departures.sort(key=lambda entry: entry[:2])
+
+        with self._lock:
+            self._legs = legs
+            self._departures = departures
+            self._airport_names = airport_names
+            self._built_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def _remove(self, flight_id):
+        leg = self._legs.pop(flight_id, None)
+        if leg is None:
+            return
+        self._departures[leg.source_id] = [
+            entry for entry in self._departures[leg.source_id] if entry[1] != leg.id
+        ]
+
+    def remove_flight(self, flight_id):
+        with self._lock:
+            if self._built_at is not None:
+                self._remove(flight_id)
+
+    def update_flight(self, flight_id):
+        with self._lock:
+            if self._built_at is None:
+                return
+
+        rows = list(
+            self._flight_rows(self._bookable(Flight.objects.filter(pk=flight_id)))
+        )
+
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._remove(flight_id)
+
+            for leg, source_name, destination_name in rows:
+                self._legs[leg.id] = leg
+                airport_departures = list(self._departures.get(leg.source_id, []))
+                bisect.insort(
+                    airport_departures,
+                    (leg.departure_time, leg.id, leg),
+                    key=lambda entry: entry[:2],
+                )
+                self._departures[leg.source_id] = airport_departures
+                self._airport_names[leg.source_id] = source_name
+                self._airport_names[leg.destination_id] = destination_name
+
+    @staticmethod
+    def _departing_between(departures, airport_id, earliest, latest):
+        airport_departures = departures.get(airport_id, [])
+        start = bisect.bisect_left(
+            airport_departures, (earliest, 0), key=lambda entry: entry[:2]
+        )
+        for departure_time, _, leg in airport_departures[start:]:
+            if departure_time > latest:
+                break
+            yield leg
+
+    def search(
+        self,
+        source_ids,
+        destination_ids,
+        departure_after,
+        departure_before,
+        min_connection,
+        max_connection,
+        max_legs,
+    ):
+        """
+        Returns itineraries with at most `max_legs` flights
+        that leave a source airport inside the departure window
+        and reach a destination airport, never visiting an airport twice.
+
+        The search stops after `max_expansions` flights were tried,
+        so a busy hub can't make one request walk the whole schedule.
+        """
+        with self._lock:
+            stale = self._is_stale()
+        if stale:
+            self.build()
+        with self._lock:
+            departures = self._departures
+            airport_names = self._airport_names
+
+        max_expansions = (
+            self.max_expansions
+            if self.max_expansions is not None
+            else getattr(settings, "ITINERARY_MAX_EXPANSIONS", 10000)
+        )
+        expansions = 0
+        found = []
+
+        def extend(path, visited):
+            nonlocal expansions
+            last_leg = path[-1]
+            if last_leg.destination_id in destination_ids:
+                found.append(list(path))
+                return
+            if len(path) == max_legs:
+                return
+
+            for leg in self._departing_between(
+                departures,
+                last_leg.destination_id,
+                last_leg.arrival_time + min_connection,
+                last_leg.arrival_time + max_connection,
+            ):
+                if expansions >= max_expansions:
+                    return
+                if leg.destination_id in visited:
+                    continue
+                expansions += 1
+                path.append(leg)
+                visited.add(leg.destination_id)
+                extend(path, visited)
+                visited.discard(leg.destination_id)
+                path.pop()
+
+        # Flights departing before now may stay in the graph until
+        # the next rebuild, skip them here.
+        departure_after = max(departure_after, timezone.now())
+        for source_id in source_ids:
+            for leg in self._departing_between(
+                departures,
+                source_id,
+                departure_after,
+                departure_before,
+            ):
+                if expansions >= max_expansions:
+                    break
+                if leg.destination_id in source_ids:
+                    continue
+                expansions += 1
+                extend([leg], {source_id, leg.destination_id})
+
+        return [
+            Itinerary(
+                legs=legs,
+                source=airport_names.get(legs[0].source_id, ""),
+                destination=airport_names.get(legs[-1].destination_id, ""),
+            )
+            for legs in found
+        ]
+
+
+flight_graph = FlightGraph()
+
+
+def find_itineraries(
+    source_ids,
+    destination_ids,
+    departure_date,
+    min_connection=timedelta(minutes=45),
+    max_connection=timedelta(hours=12),
+    max_legs=3,
+    passengers=1,
+    sort_by="duration",
+    limit=10,
+):
+    departure_after = timezone.make_aware(
+        datetime.combine(departure_date, datetime.min.time())
+    )
+    itineraries = flight_graph.search(
+        set(source_ids),
+        set(destination_ids),
+        departure_after,
+        departure_after + timedelta(days=1),
+        min_connection,
+        max_connection,
+        max_legs,
+    )
+
+    # Seats are sold far more often than the schedule changes,
+    # so availability is checked against the database in one query
+    # instead of being kept up to date in the graph.
+    flight_ids = {leg.id for itinerary in itineraries for leg in itinerary.legs}
+    available_seats = dict(
+        Flight.objects.filter(id__in=flight_ids)
+        .annotate(available_seats=Flight.available_seats_expression())
+        .values_list("id", "available_seats")
+    )
+    itineraries = [
+        itinerary
+        for itinerary in itineraries
+        if all(available_seats.get(leg.id, 0) >= passengers for leg in itinerary.legs)
+    ]
+
+    if sort_by == "distance":
+        itineraries.sort(key=lambda item: (item.distance, item.duration))
+    else:
+        itineraries.sort(key=lambda item: (item.duration, item.distance))
+
+    return itineraries[:limit]
@@ -0,0 +1,105 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from airport_api.benchmarks import (
+    DEFAULT_THRESHOLD,
+    BenchmarkError,
+    BenchmarkRunner,
+    compare_results,
+    load_results,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures latency percentiles, query counts and allocations "
+        "of the hot API endpoints and compares runs to find regressions"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=30)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            help="Only run scenarios starting with this name, e.g. flights.list.",
+        )
+        parser.add_argument(
+            "--cold-cache",
+            action="store_true",
+            help="Clear the response cache before every request.",
+        )
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument(
+            "--compare",
+            nargs="+",
+            metavar=("BASELINE", "CURRENT"),
+            help=(
+                "Compare with a baseline JSON file. With a second file, "
+                "compares the two files without running the benchmark."
+            ),
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=DEFAULT_THRESHOLD,
+            help="Relative slowdown reported as a regression (default 0.2).",
+        )
+
+    def handle(self, *args, **options):
+        compare = options["compare"] or []
+        if len(compare) > 2:
+            raise CommandError("--compare takes a baseline and an optional run.")
+
+        try:
+            if len(compare) == 2:
+                current = load_results(compare[1])
+            else:
+                current = self.run_benchmark(options)
+            baseline = load_results(compare[0]) if compare else None
+        except (BenchmarkError, OSError, ValueError) as error:
+            raise CommandError(error)
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(current, file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
+
+        if baseline is not None:
+            self.report_comparison(baseline, current, options["threshold"])
+
+    def run_benchmark(self, options):
+        runner = BenchmarkRunner(
+            iterations=options["iterations"],
+            warmup=options["warmup"],
+            cold_cache=options["cold_cache"],
+        )
+        self.stdout.write(
+            f"{'scenario':<34}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+            f"{'queries':>9}{'peak KiB':>10}"
+        )
+        return runner.run(names=options["scenario"], log=self.log_result)
+
+    def log_result(self, name, metrics):
+        self.stdout.write(
+            f"{name:<34}{metrics['p50_ms']:>9.2f}{metrics['p95_ms']:>9.2f}"
+            f"{metrics['p99_ms']:>9.2f}{metrics['queries']:>9}"
+            f"{metrics['peak_kib']:>10.1f}"
+        )
+
+    def report_comparison(self, baseline, current, threshold):
+        regressions = 0
+        for name, metric, old, new, change, regressed in compare_results(
+            baseline, current, threshold
+        ):
+            line = f"{name:<34}{metric:<10}{old:>10}{new:>10}{change:>+9.1%}"
+            if regressed:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(f"{line}  REGRESSION"))
+            else:
+                self.stdout.write(line)
+
+        if regressions:
+            raise CommandError(f"{regressions} regression(s) against the baseline.")
+        self.stdout.write(self.style.SUCCESS("No regressions."))
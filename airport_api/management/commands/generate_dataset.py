@@ -0,0 +1,116 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router, transaction
+
+from airport_api.dataset import DatasetGenerator
+from airport_api.models import (
+    City,
+    Airport,
+    Route,
+    AirplaneType,
+    Airplane,
+    Role,
+    CrewMember,
+    Flight,
+    FlightSearchEntry,
+    Order,
+    Ticket,
+    SeatHold,
+)
+
+# Every table --flush empties, children before their parents.
+FLUSH_ORDER = (
+    Ticket,
+    SeatHold,
+    Order,
+    FlightSearchEntry,
+    Flight.crew.through,
+    Flight,
+    CrewMember,
+    Role,
+    Route,
+    Airport,
+    City,
+    Airplane,
+    AirplaneType,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills an empty database with a seeded random schedule "
+        "of realistic shape for performance testing"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0)
+        for name, default in (
+            ("cities", 100),
+            ("airplanes", 50),
+            ("routes", 500),
+            ("flights", 10000),
+            ("crew-members", 500),
+            ("users", 1000),
+            ("orders", 50000),
+        ):
+            parser.add_argument(
+                f"--{name}",
+                type=int,
+                default=default,
+                help=f"Number of {name.replace('-', ' ')} (default {default}).",
+            )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=60,
+            help="Flights depart within this many days from now.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of rows per INSERT.",
+        )
+        parser.add_argument(
+            "--flush",
+            action="store_true",
+            help="Delete existing cities, airplanes, crew and orders first.",
+        )
+
+    def handle(self, *args, **options):
+        models = (Order, City, AirplaneType, Role)
+        if options["flush"]:
+            # One DELETE per table. A cascading delete() would load every
+            # row to send its delete signals, which only keep counters and
+            # caches of rows that are all going away. The generator's
+            # post_bulk_save signals invalidate the caches afterwards.
+            with transaction.atomic():
+                for model in FLUSH_ORDER:
+                    model._base_manager.all()._raw_delete(router.db_for_write(model))
+        elif any(model.objects.exists() for model in models):
+            raise CommandError(
+                "The database already has airport data, pass --flush to replace it."
+            )
+
+        generator = DatasetGenerator(
+            seed=options["seed"],
+            cities=options["cities"],
+            airplanes=options["airplanes"],
+            routes=options["routes"],
+            flights=options["flights"],
+            crew_members=options["crew_members"],
+            users=options["users"],
+            orders=options["orders"],
+            days=options["days"],
+            batch_size=options["batch_size"],
+            log=self.stdout.write,
+        )
+        started = time.perf_counter()
+        generator.generate()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated the dataset in {time.perf_counter() - started:.2f}s."
+            )
+        )
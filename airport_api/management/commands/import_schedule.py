@@ -0,0 +1,71 @@
+import pathlib
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from airport_api.schedule_import import (
+    ScheduleImporter,
+    ScheduleImportError,
+    read_rows,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports a CSV or JSON timetable of flights with their routes, "
+        "airports, cities, airplanes and crew, creating what is missing "
+        "and updating flights that already exist"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to the .csv or .json timetable.")
+        parser.add_argument(
+            "--format",
+            choices=("csv", "json"),
+            help="File format, guessed from the extension by default.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of timetable rows written per transaction.",
+        )
+        parser.add_argument(
+            "--copy",
+            action="store_true",
+            help="Load flights with COPY (PostgreSQL only).",
+        )
+
+    def handle(self, *args, **options):
+        path = pathlib.Path(options["path"])
+        file_format = options["format"] or path.suffix.lstrip(".").lower()
+        if file_format not in ("csv", "json"):
+            raise CommandError("Pass --format for files without .csv/.json.")
+
+        started = time.perf_counter()
+        try:
+            importer = ScheduleImporter(
+                batch_size=options["batch_size"],
+                use_copy=options["copy"],
+            )
+            with path.open(newline="", encoding="utf-8") as file:
+                counts = importer.run(read_rows(file, file_format))
+        except OSError as error:
+            raise CommandError(error)
+        except ScheduleImportError as error:
+            raise CommandError(
+                f"Import stopped, batches before the invalid rows were saved:\n"
+                f"{error}"
+            )
+        elapsed = time.perf_counter() - started
+
+        for name, count in sorted(counts.items()):
+            if name != "rows":
+                self.stdout.write(f"{name}: {count}")
+        rows = counts["rows"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {rows} row(s) in {elapsed:.2f}s "
+                f"({rows / elapsed if elapsed else 0:.0f} rows/sec)."
+            )
+        )
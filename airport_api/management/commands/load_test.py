@@ -0,0 +1,57 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from airport_api.benchmarks import BenchmarkError, LoadTester
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the throughput and latency of a running server "
+        "under concurrent GET requests"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "url",
+            nargs="?",
+            default="http://127.0.0.1:8000/api/airport/flights/",
+        )
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument(
+            "--duration", type=float, default=10, help="Seconds to send requests."
+        )
+        parser.add_argument(
+            "--token", help="JWT access token sent as a Bearer authorization."
+        )
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options["token"]:
+            headers["Authorization"] = f"Bearer {options['token']}"
+
+        try:
+            results = LoadTester(
+                options["url"],
+                concurrency=options["concurrency"],
+                duration=options["duration"],
+                headers=headers,
+            ).run()
+        except BenchmarkError as error:
+            raise CommandError(error)
+
+        self.stdout.write(
+            f"{results['requests']} requests, "
+            f"{results['requests_per_second']} req/s, "
+            f"p50 {results['p50_ms']} ms, p95 {results['p95_ms']} ms, "
+            f"p99 {results['p99_ms']} ms"
+        )
+        self.stdout.write(f"Statuses: {results['statuses']}")
+        if any(not status.startswith("2") for status in results["statuses"]):
+            self.stdout.write(self.style.WARNING("Some requests failed."))
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
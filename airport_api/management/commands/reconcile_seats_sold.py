@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from airport_api.flight_search import refresh_flights
+from airport_api.models import Flight, SeatHold, Ticket
+
+# Flight counter -> model whose rows it counts.
+COUNTERS = {
+    "seats_sold": Ticket,
+    "seats_held": SeatHold,
+}
+
+
+def rows_per_flight(model):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(flight=OuterRef("pk"))
+            .order_by()
+            .values("flight")
+            .annotate(count=Count("id"))
+            .values("count")
+        ),
+        Value(0),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalculates Flight.seats_sold and Flight.seats_held counters "
+        "that drifted from tickets and seat holds"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report drifted flights without fixing them.",
+        )
+
+    def handle(self, *args, **options):
+        drifted_count = 0
+
+        for counter, model in COUNTERS.items():
+            drifted = (
+                Flight.objects.annotate(actual=rows_per_flight(model))
+                .exclude(**{counter: F("actual")})
+                .values_list("id", "flight_number", counter, "actual")
+            )
+
+            drifted_ids = []
+            for flight_id, flight_number, value, actual in drifted:
+                self.stdout.write(
+                    f"Flight {flight_number}: {counter}={value}, "
+                    f"{model._meta.verbose_name_plural}={actual}"
+                )
+                drifted_ids.append(flight_id)
+
+            drifted_count += len(drifted_ids)
+            if drifted_ids and not options["dry_run"]:
+                # Recount inside the UPDATE itself, so rows created
+                # while the command runs are not lost.
+                Flight.objects.filter(id__in=drifted_ids).update(
+                    **{counter: rows_per_flight(model)},
+                    updated_at=timezone.now(),
+                )
+                refresh_flights(Flight.objects.filter(id__in=drifted_ids))
+
+        if not drifted_count:
+            self.stdout.write(self.style.SUCCESS("All counters are in sync."))
+        elif options["dry_run"]:
+            self.stdout.write(f"{drifted_count} counter(s) drifted.")
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"Reconciled {drifted_count} counter(s).")
+            )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from airport_api.flight_search import refresh_flights
+from airport_api.models import Flight
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the flight search entries the flight list reads, "
+        "e.g. after loading fixtures or writing flights with raw SQL"
+    )
+
+    def handle(self, *args, **options):
+        refreshed = refresh_flights(Flight.objects.all())
+        self.stdout.write(
+            self.style.SUCCESS(f"Refreshed {refreshed} flight search entries.")
+        )
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from airport_api.seat_holds import sweep_expired_holds
+
+
+class Command(BaseCommand):
+    help = "Deletes expired seat holds and releases their seats"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep running and sweep every N seconds.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of holds deleted per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            swept = sweep_expired_holds(batch_size=options["batch_size"])
+            self.stdout.write(f"Swept {swept} expired hold(s).")
+
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
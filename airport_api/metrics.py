@@ -0,0 +1,36 @@
+from core.metrics import Counter
+
+# Hits and misses of the response and seat map caches,
+# the hit ratio is hits / (hits + misses) per cache.
+cache_requests = Counter(
+    "airport_cache_requests_total",
+    "Lookups in the response and seat map caches.",
+    ("cache", "outcome"),
+)
+orders = Counter(
+    "airport_orders_total",
+    "Order creation attempts by outcome.",
+    ("outcome",),
+)
+tickets_sold = Counter(
+    "airport_tickets_sold_total",
+    "Tickets sold, rate() gives tickets per second.",
+)
+
+# Error codes of OrderSerializer meaning another customer got the seat first.
+SEAT_CONFLICT_CODES = {"seat_taken", "seat_held"}
+
+
+def error_codes(codes):
+    if isinstance(codes, dict):
+        codes = list(codes.values())
+    if isinstance(codes, list):
+        return {code for item in codes for code in error_codes(item)}
+    return {codes}
+
+
+def record_order_error(error):
+    if error_codes(error.get_codes()) & SEAT_CONFLICT_CODES:
+        orders.inc(outcome="seat_conflict")
+    else:
+        orders.inc(outcome="validation_error")
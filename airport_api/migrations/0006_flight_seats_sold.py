@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:14
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_seats_sold(apps, schema_editor):
+    Flight = apps.get_model("airport_api", "Flight")
+    Ticket = apps.get_model("airport_api", "Ticket")
+
+    tickets_count = (
+        Ticket.objects.filter(flight=OuterRef("pk"))
+        .order_by()
+        .values("flight")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    Flight.objects.update(seats_sold=Coalesce(Subquery(tickets_count), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport_api", "0005_alter_city_options_alter_route_options_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="flight",
+            name="seats_sold",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_seats_sold, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+# Kept in step with airport_api.search.SEARCH_COLUMNS.
+SEARCH_COLUMNS = {
+    "airport_api_city": ("name", "country"),
+    "airport_api_airport": ("name",),
+    "airport_api_airplanetype": ("name",),
+    "airport_api_airplane": ("model_name",),
+    "airport_api_role": ("name",),
+    "airport_api_crewmember": ("first_name", "last_name"),
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # SQLite gets FTS5 tables from migration 0012 instead.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, columns in SEARCH_COLUMNS.items():
+        for column in columns:
+            # icontains compiles to UPPER(column) LIKE UPPER(...).
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_{column}_trgm "
+                f"ON {table} USING gin (UPPER({column}) gin_trgm_ops)"
+            )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    for table, columns in SEARCH_COLUMNS.items():
+        for column in columns:
+            schema_editor.execute(f"DROP INDEX IF EXISTS {table}_{column}_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport_api", "0008_updated_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,120 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def populate_flight_search(apps, schema_editor):
+    Flight = apps.get_model("airport_api", "Flight")
+    FlightSearchEntry = apps.get_model("airport_api", "FlightSearchEntry")
+
+    rows = Flight.objects.order_by().values_list(
+        "id",
+        "flight_number",
+        "route__source__city__name",
+        "route__destination__city__name",
+        "airplane__model_name",
+        F("airplane__rows") * F("airplane__seats_in_row"),
+        "seats_sold",
+        "seats_held",
+        "departure_time",
+        "arrival_time",
+        "status",
+    )
+    now = timezone.now()
+    FlightSearchEntry.objects.bulk_create(
+        (
+            FlightSearchEntry(
+                flight_id=flight_id,
+                flight_number=flight_number,
+                source_city=source_city,
+                destination_city=destination_city,
+                route_name=f"{source_city} - {destination_city}",
+                airplane_model=airplane_model,
+                capacity=capacity,
+                seats_sold=seats_sold,
+                seats_held=seats_held,
+                departure_time=departure_time,
+                arrival_time=arrival_time,
+                status=status,
+                updated_at=now,
+            )
+            for (
+                flight_id,
+                flight_number,
+                source_city,
+                destination_city,
+                airplane_model,
+                capacity,
+                seats_sold,
+                seats_held,
+                departure_time,
+                arrival_time,
+                status,
+            ) in rows.iterator(chunk_size=1000)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport_api", "0010_flight_order_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FlightSearchEntry",
+            fields=[
+                (
+                    "flight",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_entry",
+                        serialize=False,
+                        to="airport_api.flight",
+                    ),
+                ),
+                ("flight_number", models.CharField(max_length=7)),
+                ("source_city", models.CharField(max_length=255)),
+                ("destination_city", models.CharField(max_length=255)),
+                ("route_name", models.CharField(max_length=511)),
+                ("airplane_model", models.CharField(max_length=255)),
+                ("capacity", models.PositiveIntegerField()),
+                ("seats_sold", models.PositiveIntegerField(default=0)),
+                ("seats_held", models.PositiveIntegerField(default=0)),
+                ("departure_time", models.DateTimeField()),
+                ("arrival_time", models.DateTimeField()),
+                (
+                    "status",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (0, "Scheduled"),
+                            (1, "In air"),
+                            (2, "Landed"),
+                            (3, "Canceled"),
+                        ]
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+            options={
+                "verbose_name_plural": "flight search entries",
+                "ordering": ("departure_time", "status"),
+                "indexes": [
+                    models.Index(
+                        fields=["departure_time", "status", "flight"],
+                        name="flight_search_departure_idx",
+                    ),
+                    models.Index(
+                        fields=["arrival_time"], name="flight_search_arrival_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(populate_flight_search, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,97 @@
+import sqlite3
+
+from django.db import migrations
+
+# Kept in step with airport_api.search.SEARCH_COLUMNS.
+SEARCH_COLUMNS = {
+    "airport_api_city": ("name", "country"),
+    "airport_api_airport": ("name",),
+    "airport_api_airplanetype": ("name",),
+    "airport_api_airplane": ("model_name",),
+    "airport_api_role": ("name",),
+    "airport_api_crewmember": ("first_name", "last_name"),
+}
+
+
+def has_fts5_trigram(schema_editor):
+    # Kept in step with airport_api.search.sqlite_has_fts5_trigram.
+    if schema_editor.connection.vendor != "sqlite":
+        return False
+    if sqlite3.sqlite_version_info < (3, 34):
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def drop_search_tables(apps, schema_editor):
+    if not has_fts5_trigram(schema_editor):
+        return
+
+    for table in SEARCH_COLUMNS:
+        fts_table = f"{table}_fts"
+        for trigger in ("insert", "delete", "update"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {fts_table}_{trigger}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {fts_table}")
+
+
+def create_search_tables(apps, schema_editor):
+    """
+    Creates an FTS5 shadow table per searched table and the triggers that
+    keep it in sync. The trigram tokenizer matches a query of three or more
+    characters as a substring, like the trigram indexes on PostgreSQL.
+
+    Django re-creates a SQLite table when a migration alters it, which drops
+    its triggers; airport_api.search.restore_sqlite_search_triggers puts
+    them back after every migrate.
+    """
+    # Replaces tables an older version created with another tokenizer.
+    drop_search_tables(apps, schema_editor)
+    if not has_fts5_trigram(schema_editor):
+        return
+
+    for table, columns in SEARCH_COLUMNS.items():
+        fts_table = f"{table}_fts"
+        column_list = ", ".join(columns)
+        new_values = ", ".join(f"new.{column}" for column in columns)
+        old_values = ", ".join(f"old.{column}" for column in columns)
+
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {fts_table} USING fts5("
+            f"{column_list}, content='{table}', content_rowid='id', "
+            f"tokenize='trigram')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {fts_table}_insert AFTER INSERT "
+            f"ON {table} BEGIN "
+            f"INSERT INTO {fts_table}(rowid, {column_list}) "
+            f"VALUES (new.id, {new_values}); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {fts_table}_delete AFTER DELETE "
+            f"ON {table} BEGIN "
+            f"INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) "
+            f"VALUES ('delete', old.id, {old_values}); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {fts_table}_update AFTER UPDATE "
+            f"ON {table} BEGIN "
+            f"INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) "
+            f"VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO {fts_table}(rowid, {column_list}) "
+            f"VALUES (new.id, {new_values}); END"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport_api", "0011_flight_search_entry"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
@@ -0,0 +1,390 @@
+import hashlib
+from contextlib import ExitStack
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max, Subquery, Value
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from airport_api import response_cache
+from airport_api.bulk import BULK_MAX_ITEMS
+from airport_api.serializers import collect_pks, parse_field_names
+from core.db_router import pin_to_primary, pinned_to_primary, read_replica, replicas
+
+
+def latest_update(model):
+    """
+    Scalar subquery with the latest `updated_at` of the model,
+    served from the index on `updated_at`.
+    """
+    return Subquery(
+        model.objects.order_by()
+        .annotate(group=Value(1))
+        .values("group")
+        .annotate(latest=Max("updated_at"))
+        .values("latest")
+    )
+
+
+def wrap_read_handler(view, request, wrapper, async_wrapper):
+    """
+    Routes list and retrieve requests through `wrapper(handler, ...)`,
+    or `async_wrapper` for the async handlers of airport_api.async_views.
+    The handler is swapped on the view instance after authentication,
+    permission and throttling checks, so the router still only exposes
+    the actions the viewset implements.
+    """
+    if view.action in ("list", "retrieve"):
+        method = request.method.lower()
+        handler = getattr(view, method)
+        if iscoroutinefunction(handler):
+            wrapper = async_wrapper
+        setattr(view, method, partial(wrapper, handler))
+
+
+def is_conditional(request):
+    return "If-None-Match" in request.headers or "If-Modified-Since" in request.headers
+
+
+def not_modified(request, etag, last_modified=None):
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified,
+    )
+    if response is not None:
+        response["ETag"] = etag
+    return response
+
+
+class ReplicaReadMixin:
+    """
+    Reads safe-method requests from a read replica, see core.db_router.
+    Falls back to the primary when no replica is reachable and while
+    the user is pinned to it by `pin_to_primary()`, which every
+    successful write through the viewset does.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.replica_read = ExitStack()
+        if request.method in SAFE_METHODS and not pinned_to_primary(request.user):
+            self.replica_read.enter_context(replicas.reading())
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # Also runs when initial() raised, before a replica was chosen.
+        if hasattr(self, "replica_read"):
+            self.replica_read.close()
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and request.user.is_authenticated
+        ):
+            pin_to_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def may_read_stale(models):
+    """
+    Whether the current request reads from a replica that may not have
+    caught up with a recent write to `models` yet. What it reads then
+    must not be cached under the versions the write has just bumped.
+    """
+    if read_replica.get() is None:
+        return False
+    return response_cache.recently_invalidated(models)
+
+
+class CursorPaginationMixin:
+    """
+    Switches a viewset to keyset pagination when the client
+    sends `?pagination=cursor`. Cursor pages skip the COUNT query
+    and do not slow down with depth, unlike page numbers.
+    """
+
+    cursor_pagination_class = None
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator") and self.use_cursor_pagination():
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
+
+    def use_cursor_pagination(self) -> bool:
+        return (
+            self.cursor_pagination_class is not None
+            and self.request is not None
+            and self.request.query_params.get("pagination") == "cursor"
+        )
+
+
+class SparseFieldsMixin:
+    """
+    Tells get_queryset which fields the client asked for with
+    `?fields=` and `?expand=`, so it only joins, prefetches
+    and annotates what the serializer is going to render.
+    """
+
+    def wants_field(self, name) -> bool:
+        fields = parse_field_names(self.request.query_params.get("fields"))
+        return not fields or name in fields
+
+    def expands_field(self, name) -> bool:
+        return self.wants_field(name) and name in parse_field_names(
+            self.request.query_params.get("expand")
+        )
+
+
+class BulkWriteMixin:
+    """
+    Adds `bulk/`, which creates (POST) or partially updates (PATCH)
+    a list of objects at once with `bulk_serializer_class`,
+    a serializer whose list serializer is BulkListSerializer.
+    """
+
+    bulk_serializer_class = None
+
+    @action(methods=["POST", "PATCH"], detail=False, url_path="bulk")
+    def bulk(self, request):
+        context = self.get_serializer_context()
+        if request.method == "POST":
+            serializer = self.bulk_serializer_class(
+                data=request.data,
+                many=True,
+                max_length=BULK_MAX_ITEMS,
+                context=context,
+            )
+            response_status = status.HTTP_201_CREATED
+        else:
+            instances = self.bulk_serializer_class.Meta.model.objects.in_bulk(
+                collect_pks(request.data, "id")
+            )
+            serializer = self.bulk_serializer_class(
+                instances,
+                data=request.data,
+                many=True,
+                partial=True,
+                max_length=BULK_MAX_ITEMS,
+                context=context,
+            )
+            response_status = status.HTTP_200_OK
+
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=response_status)
+
+
+class ConditionalGetMixin:
+    """
+    Answers list and retrieve requests with 304 Not Modified
+    while the client's ETag is still current.
+
+    The ETag is built from max(updated_at) and the row count of the
+    filtered queryset plus the latest update of every related model
+    in `response_models`, all in one query and before anything is
+    serialized. Related models listed in `related_updates` only count
+    with the rows joined to the filtered queryset, so a busy model
+    doesn't change the ETag of responses that don't render the rows
+    written to. Last-Modified is only sent for single objects,
+    a deleted row doesn't move max(updated_at) of a list.
+
+    Only conditional requests pay for that query every time. Plain
+    requests get the validators stored in the response cache for up to
+    VALIDATORS_CACHE_TIMEOUT seconds; an outdated ETag there only makes
+    the next revalidation answer 200 with a fresh one.
+    """
+
+    response_models = ()
+    # {related model: lookups of its `updated_at` from the queryset's model}
+    related_updates = {}
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        wrap_read_handler(
+            self, request, self.conditional_response, self.aconditional_response
+        )
+
+    def get_response_models(self):
+        return self.response_models or (self.queryset.model,)
+
+    def get_validators(self):
+        detail = self.action == "retrieve"
+        queryset = self.filter_queryset(self.get_queryset())
+        if detail:
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            try:
+                queryset = queryset.filter(
+                    **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+                )
+            except (TypeError, ValueError, ValidationError):
+                # Malformed lookups are left to get_object() to answer with 404.
+                return None, None
+
+        related_models = [
+            model for model in self.get_response_models() if model is not queryset.model
+        ]
+        aggregates = {}
+        for index, model in enumerate(related_models):
+            lookups = self.related_updates.get(model)
+            if lookups is None:
+                aggregates[f"latest_{index}"] = Max(latest_update(model))
+            for lookup in lookups or ():
+                aggregates[f"latest_{index}_{lookup}"] = Max(lookup)
+        state = queryset.order_by().aggregate(
+            latest=Max("updated_at"),
+            # Joins to related rows repeat the queryset's rows.
+            count=Count("pk", distinct=bool(self.related_updates)),
+            **aggregates,
+        )
+
+        fingerprint = "|".join(
+            [
+                type(self).__name__,
+                self.request.accepted_renderer.format,
+                *(str(state[key]) for key in sorted(state)),
+            ]
+        )
+        etag = f'"{hashlib.md5(fingerprint.encode()).hexdigest()}"'
+
+        last_modified = None
+        if detail and state["count"]:
+            updates = [value for value in state.values() if hasattr(value, "timestamp")]
+            if updates:
+                last_modified = int(max(updates).timestamp())
+        return etag, last_modified
+
+    def validators_cache_key(self, request):
+        return response_cache.response_cache_key(
+            f"{type(self).__name__}:validators:{request.user.pk or 0}",
+            self.get_response_models(),
+            request.path,
+            request.query_params,
+            request.accepted_renderer.format,
+        )
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        validators, response = self.revalidate(request)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            self.add_validators(response, validators)
+        return response
+
+    async def aconditional_response(self, handler, request, *args, **kwargs):
+        validators, response = await sync_to_async(self.revalidate)(request)
+        if response is None:
+            response = await handler(request, *args, **kwargs)
+            self.add_validators(response, validators)
+        return response
+
+    def revalidate(self, request):
+        """
+        Returns the validators of the response and the 304 response
+        if the client's copy is still current, None otherwise.
+        """
+        cache = response_cache.get_cache()
+        key = self.validators_cache_key(request)
+
+        validators = None
+        if not is_conditional(request):
+            validators = cache.get(key)
+        if validators is None:
+            validators = self.get_validators()
+            if not may_read_stale(self.get_response_models()):
+                cache.set(key, validators, settings.VALIDATORS_CACHE_TIMEOUT)
+        etag, last_modified = validators
+        if etag is None:
+            return validators, None
+        return validators, not_modified(request, etag, last_modified)
+
+    def add_validators(self, response, validators):
+        etag, last_modified = validators
+        if etag is not None and response.status_code == 200:
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+
+
+class ResponseCacheMixin:
+    """
+    Caches the serialized data of list and retrieve responses,
+    keyed by path and normalized query params.
+    Entries are versioned by `response_models`, the models the response
+    is built from, and go stale as soon as any of them is written to.
+    Validators set by ConditionalGetMixin are cached along with the data,
+    so a revalidation hit answers 304 without touching the database.
+    """
+
+    response_models = ()
+    cached_headers = ("ETag", "Last-Modified")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        response_cache.cached_views.add(cls.__name__)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        wrap_read_handler(self, request, self.cached_response, self.acached_response)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key, response = self.cache_lookup(request)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            self.cache_store(key, response)
+        return response
+
+    async def acached_response(self, handler, request, *args, **kwargs):
+        key, response = await sync_to_async(self.cache_lookup)(request)
+        if response is None:
+            response = await handler(request, *args, **kwargs)
+            await sync_to_async(self.cache_store)(key, response)
+        return response
+
+    def cache_lookup(self, request):
+        """
+        Returns the cache key of the request and the cached response,
+        None on a miss.
+        """
+        name = type(self).__name__
+        key = response_cache.response_cache_key(
+            name,
+            self.response_models or (self.queryset.model,),
+            request.path,
+            request.query_params,
+            request.accepted_renderer.format,
+        )
+
+        cached = response_cache.get_cache().get(key)
+        if cached is None:
+            response_cache.record("misses", name)
+            return key, None
+
+        response_cache.record("hits", name)
+        data, headers = cached
+        etag = headers.get("ETag")
+        response = etag and not_modified(request, etag)
+        if not response:
+            response = Response(data, headers=headers)
+        response["X-Cache"] = "HIT"
+        return key, response
+
+    def cache_store(self, key, response):
+        models = self.response_models or (self.queryset.model,)
+        if response.status_code == 200 and not may_read_stale(models):
+            headers = {
+                header: response[header]
+                for header in self.cached_headers
+                if response.has_header(header)
+            }
+            response_cache.get_cache().set(
+                key,
+                (response.data, headers),
+                settings.RESPONSE_CACHE_TIMEOUT,
+            )
+        response["X-Cache"] = "MISS"
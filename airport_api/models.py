@@ -5,7 +5,8 @@ from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.db import models
-from django.db.models import UniqueConstraint
+from django.db.models import UniqueConstraint, F
+from django.utils import timezone
 from django.utils.text import slugify
 
 from airport_api.validators import validate_flight_number_format
@@ -14,6 +15,7 @@ from airport_api.validators import validate_flight_number_format
 class City(models.Model):
     name = models.CharField(max_length=255)
     country = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name_plural = "cities"
@@ -36,6 +38,7 @@ class Airport(models.Model):
         on_delete=models.CASCADE,
         related_name="airports",
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ("city__country", "city__name", "name")
@@ -56,6 +59,7 @@ class Route(models.Model):
         related_name="arriving_routes",
     )
     distance = models.IntegerField(validators=[MinValueValidator(1)])
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         constraints = (
@@ -96,6 +100,7 @@ class Route(models.Model):
 
 class AirplaneType(models.Model):
     name = models.CharField(max_length=255, unique=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ("name",)
@@ -113,6 +118,7 @@ class Airplane(models.Model):
         on_delete=models.CASCADE,
         related_name="airplanes",
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ("airplane_type__name", "model_name")
@@ -127,6 +133,7 @@ class Airplane(models.Model):
 
 class Role(models.Model):
     name = models.CharField(max_length=255, unique=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ("name",)
@@ -152,6 +159,7 @@ class CrewMember(models.Model):
         on_delete=models.CASCADE,
         related_name="crew_members",
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ("role__name", "first_name", "last_name")
@@ -165,12 +173,12 @@ class CrewMember(models.Model):
 
 
 class Flight(models.Model):
-    STATUS_CHOICES = [
-        (0, "Scheduled"),
-        (1, "In air"),
-        (2, "Landed"),
-        (3, "Canceled"),
-    ]
+    class Status(models.IntegerChoices):
+        SCHEDULED = 0, "Scheduled"
+        IN_AIR = 1, "In air"
+        LANDED = 2, "Landed"
+        CANCELED = 3, "Canceled"
+
     flight_number = models.CharField(
         max_length=7,
         validators=[validate_flight_number_format],
@@ -189,13 +197,50 @@ class Flight(models.Model):
     departure_time = models.DateTimeField()
     arrival_time = models.DateTimeField()
     status = models.PositiveSmallIntegerField(
-        choices=STATUS_CHOICES,
-        default=0,
+        choices=Status.choices,
+        default=Status.SCHEDULED,
     )
     crew = models.ManyToManyField(CrewMember, related_name="flights")
+    seats_sold = models.PositiveIntegerField(default=0, editable=False)
+    seats_held = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ("departure_time", "status")
+        indexes = (
+            # Serves the default and the cursor ordering
+            # and departure time ranges.
+            models.Index(
+                fields=["departure_time", "status", "id"],
+                name="flight_departure_idx",
+            ),
+            models.Index(fields=["arrival_time"], name="flight_arrival_idx"),
+        )
+
+    @staticmethod
+    def available_seats_expression():
+        return (
+            F("airplane__seats_in_row") * F("airplane__rows")
+            - F("seats_sold")
+            - F("seats_held")
+        )
+
+    @staticmethod
+    def change_seats_sold(flight_id, delta):
+        Flight.change_counter(flight_id, "seats_sold", delta)
+
+    @staticmethod
+    def change_seats_held(flight_id, delta):
+        Flight.change_counter(flight_id, "seats_held", delta)
+
+    @staticmethod
+    def change_counter(flight_id, counter, delta):
+        # The search entry copies the counter, update both in step.
+        for model in (Flight, FlightSearchEntry):
+            model.objects.filter(pk=flight_id).update(
+                **{counter: F(counter) + delta},
+                updated_at=timezone.now(),
+            )
 
     def clean(self):
         if self.departure_time > self.arrival_time:
@@ -209,6 +254,52 @@ class Flight(models.Model):
         return f"Flight {self.flight_number}"
 
 
+class FlightSearchEntry(models.Model):
+    """
+    Denormalized copy of a flight with everything the flight list shows
+    but its crew, so the list reads a single table.
+    Kept in step with the flights, their routes, airports, cities
+    and airplanes by airport_api.flight_search.
+    """
+
+    flight = models.OneToOneField(
+        Flight,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_entry",
+    )
+    flight_number = models.CharField(max_length=7)
+    source_city = models.CharField(max_length=255)
+    destination_city = models.CharField(max_length=255)
+    route_name = models.CharField(max_length=511)
+    airplane_model = models.CharField(max_length=255)
+    capacity = models.PositiveIntegerField()
+    seats_sold = models.PositiveIntegerField(default=0)
+    seats_held = models.PositiveIntegerField(default=0)
+    departure_time = models.DateTimeField()
+    arrival_time = models.DateTimeField()
+    status = models.PositiveSmallIntegerField(choices=Flight.Status.choices)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        verbose_name_plural = "flight search entries"
+        ordering = ("departure_time", "status")
+        indexes = (
+            models.Index(
+                fields=["departure_time", "status", "flight"],
+                name="flight_search_departure_idx",
+            ),
+            models.Index(fields=["arrival_time"], name="flight_search_arrival_idx"),
+        )
+
+    @staticmethod
+    def available_seats_expression():
+        return F("capacity") - F("seats_sold") - F("seats_held")
+
+    def __str__(self):
+        return f"Search entry of flight {self.flight_number}"
+
+
 class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey(
@@ -216,9 +307,17 @@ class Order(models.Model):
         on_delete=models.CASCADE,
         related_name="orders",
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = (
+            # Orders of a user, newest first, as listed and cursor paginated.
+            models.Index(
+                fields=["user", "-created_at", "-id"],
+                name="order_user_created_idx",
+            ),
+        )
 
     def __str__(self):
         return f"Order: {self.created_at}"
@@ -239,6 +338,7 @@ class Ticket(models.Model):
         on_delete=models.CASCADE,
         related_name="tickets",
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         constraints = (
@@ -279,3 +379,32 @@ class Ticket(models.Model):
 
     def __str__(self):
         return f"{self.flight} (row: {self.row}, seat: {self.seat})"
+
+
+class SeatHold(models.Model):
+    row = models.IntegerField()
+    seat = models.IntegerField()
+    flight = models.ForeignKey(
+        Flight,
+        on_delete=models.CASCADE,
+        related_name="seat_holds",
+    )
+    user = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name="seat_holds",
+    )
+    expires_at = models.DateTimeField(db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        constraints = (
+            UniqueConstraint(
+                fields=["flight", "row", "seat"],
+                name="unique_flight_seat_hold",
+            ),
+        )
+        ordering = ("expires_at",)
+
+    def __str__(self):
+        return f"Hold of {self.flight} (row: {self.row}, seat: {self.seat})"
@@ -1,4 +1,4 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 
 
 class BigResultSetPagination(PageNumberPagination):
@@ -11,3 +11,18 @@ class SmallResultSetPagination(PageNumberPagination):
     page_size = 5
     page_size_query_param = "page_size"
     max_page_size = 100
+
+
+class FlightCursorPagination(CursorPagination):
+    page_size = 5
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    # pk, as the list pages through FlightSearchEntry keyed by flight.
+    ordering = ("departure_time", "status", "pk")
+
+
+class OrderCursorPagination(CursorPagination):
+    page_size = 5
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-created_at", "-id")
@@ -0,0 +1,117 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from airport_api import metrics
+
+VERSION_KEY = "airport_api:response_cache:version:{label}"
+INVALIDATED_KEY = "airport_api:response_cache:invalidated:{label}"
+RESPONSE_KEY = "airport_api:response_cache:response:{name}:{versions}:{digest}"
+STATS_KEY = "airport_api:response_cache:{outcome}:{name}"
+
+# Names of the cached views, filled in by ResponseCacheMixin subclasses.
+cached_views = set()
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def model_versions(models):
+    """
+    Returns the current version of every model, responses are stored
+    under these versions so a write to any of the models makes
+    the old responses unreachable without deleting them.
+    """
+    cache = get_cache()
+    keys = [VERSION_KEY.format(label=model._meta.label_lower) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, 1, None)
+            versions[key] = cache.get(key, 1)
+    return [versions[key] for key in keys]
+
+
+def bump_model_version(model):
+    cache = get_cache()
+    key = VERSION_KEY.format(label=model._meta.label_lower)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def invalidate_model(model):
+    # Bumped right away for reads inside the writing transaction
+    # and again after commit, so a response rendered from the old rows
+    # by a concurrent request is not stored under the final version.
+    bump_model_version(model)
+    transaction.on_commit(lambda: committed(model))
+
+
+def committed(model):
+    bump_model_version(model)
+    if settings.REPLICA_DATABASES:
+        # Replicas may still serve the old rows for a while,
+        # see recently_invalidated().
+        get_cache().set(
+            INVALIDATED_KEY.format(label=model._meta.label_lower),
+            True,
+            settings.REPLICA_PIN_SECONDS,
+        )
+
+
+def recently_invalidated(models):
+    """
+    Whether any of the models was written to within the last
+    REPLICA_PIN_SECONDS, the time replicas are allowed to lag.
+    """
+    keys = [INVALIDATED_KEY.format(label=model._meta.label_lower) for model in models]
+    return bool(get_cache().get_many(keys))
+
+
+def response_cache_key(name, models, path, query_params, renderer_format):
+    query = "&".join(
+        f"{param}={value}"
+        for param, values in sorted(query_params.lists())
+        for value in sorted(values)
+    )
+    digest = hashlib.md5(f"{renderer_format}:{path}?{query}".encode()).hexdigest()
+    versions = ".".join(str(version) for version in model_versions(models))
+    return RESPONSE_KEY.format(name=name, versions=versions, digest=digest)
+
+
+def record(outcome, name):
+    metrics.cache_requests.inc(cache=f"response:{name}", outcome=outcome)
+    cache = get_cache()
+    key = STATS_KEY.format(outcome=outcome, name=name)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def response_cache_stats():
+    cache = get_cache()
+    names = sorted(cached_views)
+    counters = cache.get_many(
+        [
+            STATS_KEY.format(outcome=outcome, name=name)
+            for outcome in ("hits", "misses")
+            for name in names
+        ]
+    )
+    stats = {}
+    for name in names:
+        hits = counters.get(STATS_KEY.format(outcome="hits", name=name), 0)
+        misses = counters.get(STATS_KEY.format(outcome="misses", name=name), 0)
+        stats[name] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0,
+        }
+    return stats
@@ -0,0 +1,472 @@
+import csv
+import io
+import json
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from airport_api.bulk import post_bulk_save
+from airport_api.models import (
+    City,
+    Airport,
+    Route,
+    AirplaneType,
+    Airplane,
+    Role,
+    CrewMember,
+    Flight,
+)
+from airport_api.validators import validate_flight_number_format
+
+# Same format as CrewMember.__str__, e.g. "Anton Antonenko (Pilot)".
+CREW_MEMBER = re.compile(r"^\s*(\S+)\s+(.+?)\s*\((.+)\)\s*$")
+
+STATUSES = {label.lower(): value for value, label in Flight.Status.choices}
+
+FLIGHT_COPY_COLUMNS = (
+    "flight_number",
+    "route_id",
+    "airplane_id",
+    "departure_time",
+    "arrival_time",
+    "status",
+    "seats_sold",
+    "seats_held",
+    "updated_at",
+)
+FLIGHT_UPDATE_FIELDS = (
+    "route",
+    "airplane",
+    "departure_time",
+    "arrival_time",
+    "status",
+    "updated_at",
+)
+
+
+class ScheduleImportError(Exception):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("\n".join(errors))
+
+
+@dataclass
+class ScheduleRow:
+    flight_number: str
+    source: tuple
+    destination: tuple
+    distance: int
+    airplane: str
+    airplane_type: str
+    rows: int
+    seats_in_row: int
+    departure_time: object
+    arrival_time: object
+    status: int
+    crew: list = field(default_factory=list)
+
+
+def read_rows(file, file_format):
+    """
+    Yields timetable rows as dicts. CSV is read lazily,
+    crew members in a CSV row are separated by ";".
+    """
+    if file_format == "csv":
+        for row in csv.DictReader(file):
+            row["crew"] = [
+                member for member in (row.get("crew") or "").split(";") if member
+            ]
+            yield row
+    else:
+        data = json.load(file)
+        yield from data["flights"] if isinstance(data, dict) else data
+
+
+def parse_datetime_value(value):
+    parsed = parse_datetime(str(value))
+    if parsed is None:
+        raise ValueError(f"invalid datetime {value!r}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_row(row):
+    """
+    Validates one timetable row the way Flight.clean, Route.clean and
+    the model field validators would, without touching the database.
+    """
+    flight_number = row["flight_number"].strip()
+    validate_flight_number_format(flight_number)
+
+    source = (
+        row["source_city"].strip(),
+        row["source_country"].strip(),
+        row["source_airport"].strip(),
+    )
+    destination = (
+        row["destination_city"].strip(),
+        row["destination_country"].strip(),
+        row["destination_airport"].strip(),
+    )
+    Route.validate_source_and_destination(source, destination, ValueError)
+
+    departure_time = parse_datetime_value(row["departure_time"])
+    arrival_time = parse_datetime_value(row["arrival_time"])
+    if departure_time > arrival_time:
+        raise ValueError("departure can`t be later than arrival")
+
+    value = str(row.get("status") or 0).strip()
+    status = int(value) if value.isdigit() else STATUSES.get(value.lower())
+    if status not in Flight.Status.values:
+        raise ValueError(f"invalid status {value!r}")
+
+    crew = []
+    for member in row.get("crew") or []:
+        match = CREW_MEMBER.match(member)
+        if not match:
+            raise ValueError(f"invalid crew member {member!r}")
+        crew.append(tuple(part.strip() for part in match.groups()))
+
+    parsed = ScheduleRow(
+        flight_number=flight_number,
+        source=source,
+        destination=destination,
+        distance=int(row["distance"]),
+        airplane=row["airplane"].strip(),
+        airplane_type=row["airplane_type"].strip(),
+        rows=int(row["rows"]),
+        seats_in_row=int(row["seats_in_row"]),
+        departure_time=departure_time,
+        arrival_time=arrival_time,
+        status=status,
+        crew=crew,
+    )
+    if min(parsed.distance, parsed.rows, parsed.seats_in_row) < 1:
+        raise ValueError("distance, rows and seats_in_row must be positive")
+    return parsed
+
+
+class ScheduleImporter:
+    """
+    Loads a timetable in chunks. Natural keys are resolved through
+    {key: pk} dicts kept for the whole import, so each referenced
+    table costs one query per chunk for the keys it has not seen yet.
+    Reference data is inserted once, routes and flights are upserted
+    on their unique constraints and crew assignments are replaced.
+    """
+
+    def __init__(self, batch_size=1000, use_copy=False):
+        if use_copy and connection.vendor != "postgresql":
+            raise ScheduleImportError(["COPY is only available on PostgreSQL."])
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+        self.ids = defaultdict(dict)
+        # {model_name: (rows, seats_in_row)} of the airplanes in self.ids.
+        self.airplane_seats = {}
+        self.counts = Counter()
+
+    def run(self, rows):
+        rows = enumerate(rows, start=1)
+        while chunk := list(islice(rows, self.batch_size)):
+            self.import_chunk(chunk)
+        return self.counts
+
+    def import_chunk(self, numbered_rows):
+        parsed, errors = {}, []
+        for number, row in numbered_rows:
+            try:
+                schedule_row = parse_row(row)
+            except KeyError as error:
+                errors.append(f"Row {number}: missing {error}")
+            except (TypeError, ValueError) as error:
+                errors.append(f"Row {number}: {error}")
+            except ValidationError as error:
+                errors.append(f"Row {number}: {error.messages[0]}")
+            else:
+                # A flight repeated in the file is imported as its last row.
+                parsed[schedule_row.flight_number] = schedule_row
+        if errors:
+            raise ScheduleImportError(errors)
+        parsed = list(parsed.values())
+
+        with transaction.atomic():
+            self.import_references(parsed)
+            flights = self.import_flights(parsed)
+            self.import_crew(parsed, flights)
+        self.counts["rows"] += len(parsed)
+
+    def load_ids(self, model, key_fields, keys):
+        """
+        Reads the pks of the rows matching `keys` (tuples of
+        `key_fields` values) into self.ids[model] with one query.
+        """
+        known = self.ids[model]
+        wanted = {key for key in keys if key not in known}
+        if not wanted:
+            return
+        rows = model.objects.filter(
+            **{f"{key_fields[0]}__in": {key[0] for key in wanted}}
+        ).values_list(*key_fields, "pk")
+        for *key, pk in rows:
+            if tuple(key) in wanted:
+                known[tuple(key)] = pk
+
+    def resolve(self, model, key_fields, objects):
+        """
+        Inserts the objects of {key: unsaved object} that don't exist yet.
+        """
+        self.load_ids(model, key_fields, objects)
+        new = [obj for key, obj in objects.items() if key not in self.ids[model]]
+        if new:
+            model.objects.bulk_create(
+                new, batch_size=self.batch_size, ignore_conflicts=True
+            )
+            self.load_ids(model, key_fields, objects)
+            self.counts[model._meta.verbose_name_plural] += len(new)
+            post_bulk_save.send(sender=model, instances=new, created=True)
+
+    def upsert(self, model, key_fields, objects, update_fields):
+        model.objects.bulk_create(
+            list(objects.values()),
+            batch_size=self.batch_size,
+            update_conflicts=True,
+            unique_fields=[model._meta.get_field(name).name for name in key_fields],
+            update_fields=update_fields,
+        )
+        self.load_ids(model, key_fields, objects)
+        for key, obj in objects.items():
+            obj.pk = self.ids[model][key]
+        self.counts[model._meta.verbose_name_plural] += len(objects)
+        post_bulk_save.send(
+            sender=model, instances=list(objects.values()), created=False
+        )
+
+    def import_references(self, rows):
+        ids = self.ids
+        self.resolve(
+            City,
+            ("name", "country"),
+            {
+                (city, country): City(name=city, country=country)
+                for row in rows
+                for city, country, _ in (row.source, row.destination)
+            },
+        )
+        self.resolve(
+            Airport,
+            ("city_id", "name"),
+            {
+                (ids[City][city, country], name): Airport(
+                    city_id=ids[City][city, country], name=name
+                )
+                for row in rows
+                for city, country, name in (row.source, row.destination)
+            },
+        )
+        self.upsert(
+            Route,
+            ("source_id", "destination_id"),
+            {
+                (self.airport_id(row.source), self.airport_id(row.destination)): Route(
+                    source_id=self.airport_id(row.source),
+                    destination_id=self.airport_id(row.destination),
+                    distance=row.distance,
+                )
+                for row in rows
+            },
+            update_fields=["distance", "updated_at"],
+        )
+        self.resolve(
+            AirplaneType,
+            ("name",),
+            {
+                (row.airplane_type,): AirplaneType(name=row.airplane_type)
+                for row in rows
+            },
+        )
+        self.resolve_airplanes(rows)
+        self.resolve(
+            Role,
+            ("name",),
+            {(role,): Role(name=role) for row in rows for _, _, role in row.crew},
+        )
+        self.resolve(
+            CrewMember,
+            ("first_name", "last_name", "role_id"),
+            {
+                (first_name, last_name, ids[Role][(role,)]): CrewMember(
+                    first_name=first_name,
+                    last_name=last_name,
+                    role_id=ids[Role][(role,)],
+                )
+                for row in rows
+                for first_name, last_name, role in row.crew
+            },
+        )
+
+    def resolve_airplanes(self, rows):
+        """
+        Airplanes are matched by model name, which the database doesn't
+        keep unique. A name shared by several airplanes, or seats that
+        differ from the airplane's, is reported instead of guessed.
+        """
+        ids = self.ids[Airplane]
+        seats = self.airplane_seats
+        errors = []
+
+        new = {row.airplane for row in rows} - seats.keys()
+        found = defaultdict(list)
+        for pk, model_name, *airplane_seats in Airplane.objects.filter(
+            model_name__in=new
+        ).values_list("pk", "model_name", "rows", "seats_in_row"):
+            found[model_name].append((pk, tuple(airplane_seats)))
+        for model_name, airplanes in found.items():
+            if len(airplanes) > 1:
+                errors.append(
+                    f"Airplane {model_name!r}: {len(airplanes)} airplanes "
+                    f"have this model name."
+                )
+                continue
+            ids[(model_name,)], seats[model_name] = airplanes[0]
+
+        created = {}
+        for row in rows:
+            if row.airplane in new and row.airplane not in found:
+                # The first row of a new airplane decides its seats.
+                new.discard(row.airplane)
+                seats[row.airplane] = (row.rows, row.seats_in_row)
+                created[(row.airplane,)] = Airplane(
+                    model_name=row.airplane,
+                    rows=row.rows,
+                    seats_in_row=row.seats_in_row,
+                    airplane_type_id=self.ids[AirplaneType][(row.airplane_type,)],
+                )
+            expected = seats.get(row.airplane)
+            if expected and expected != (row.rows, row.seats_in_row):
+                errors.append(
+                    f"Flight {row.flight_number}: airplane {row.airplane!r} "
+                    f"has {expected[0]} rows of {expected[1]} seats, "
+                    f"not {row.rows} of {row.seats_in_row}."
+                )
+        if errors:
+            raise ScheduleImportError(errors)
+
+        if created:
+            self.resolve(Airplane, ("model_name",), created)
+
+    def airport_id(self, airport):
+        city, country, name = airport
+        return self.ids[Airport][self.ids[City][city, country], name]
+
+    def import_flights(self, rows):
+        now = timezone.now()
+        flights = {
+            (row.flight_number,): Flight(
+                flight_number=row.flight_number,
+                route_id=self.ids[Route][
+                    self.airport_id(row.source), self.airport_id(row.destination)
+                ],
+                airplane_id=self.ids[Airplane][(row.airplane,)],
+                departure_time=row.departure_time,
+                arrival_time=row.arrival_time,
+                status=row.status,
+                updated_at=now,
+            )
+            for row in rows
+        }
+        if self.use_copy:
+            self.copy_flights(flights)
+        else:
+            self.upsert(
+                Flight,
+                ("flight_number",),
+                flights,
+                update_fields=list(FLIGHT_UPDATE_FIELDS),
+            )
+        return flights
+
+    def copy_flights(self, flights):
+        """
+        Streams the flights into a temporary table with COPY and
+        upserts them from there in one INSERT ... ON CONFLICT.
+        """
+        quote = connection.ops.quote_name
+        table = quote(Flight._meta.db_table)
+        columns = ", ".join(quote(column) for column in FLIGHT_COPY_COLUMNS)
+        updates = ", ".join(
+            f"{quote(column)} = EXCLUDED.{quote(column)}"
+            for column in FLIGHT_COPY_COLUMNS
+            if column not in ("flight_number", "seats_sold", "seats_held")
+        )
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for flight in flights.values():
+            writer.writerow(
+                [
+                    flight.flight_number,
+                    flight.route_id,
+                    flight.airplane_id,
+                    flight.departure_time.isoformat(),
+                    flight.arrival_time.isoformat(),
+                    flight.status,
+                    flight.seats_sold,
+                    flight.seats_held,
+                    flight.updated_at.isoformat(),
+                ]
+            )
+        buffer.seek(0)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS import_flight "
+                f"AS SELECT {columns} FROM {table} WITH NO DATA"
+            )
+            cursor.execute("TRUNCATE import_flight")
+            copy = f"COPY import_flight ({columns}) FROM STDIN WITH (FORMAT csv)"
+            if hasattr(cursor.cursor, "copy_expert"):
+                cursor.cursor.copy_expert(copy, buffer)
+            else:
+                # psycopg 3, installed for the connection pool.
+                with cursor.cursor.copy(copy) as stream:
+                    stream.write(buffer.getvalue())
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) "
+                f"SELECT {columns} FROM import_flight "
+                f"ON CONFLICT ({quote('flight_number')}) DO UPDATE SET {updates}"
+            )
+
+        self.load_ids(Flight, ("flight_number",), flights)
+        for key, flight in flights.items():
+            flight.pk = self.ids[Flight][key]
+        self.counts[Flight._meta.verbose_name_plural] += len(flights)
+        post_bulk_save.send(
+            sender=Flight, instances=list(flights.values()), created=False
+        )
+
+    def import_crew(self, rows, flights):
+        through = Flight.crew.through
+        crew_ids = self.ids[CrewMember]
+        role_ids = self.ids[Role]
+        flight_ids = [flight.pk for flight in flights.values()]
+
+        through.objects.filter(flight_id__in=flight_ids).delete()
+        through.objects.bulk_create(
+            [
+                through(
+                    flight_id=flights[(row.flight_number,)].pk,
+                    crewmember_id=crew_ids[first_name, last_name, role_ids[(role,)]],
+                )
+                for row in rows
+                for first_name, last_name, role in dict.fromkeys(row.crew)
+            ],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
@@ -0,0 +1,201 @@
+import sqlite3
+from contextlib import closing
+from functools import cache
+
+from django.db import connection
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest
+
+# Text columns that get a trigram index on PostgreSQL
+# and an FTS5 trigram table on SQLite, see migrations 0009 and 0012.
+SEARCH_COLUMNS = {
+    "airport_api_city": ("name", "country"),
+    "airport_api_airport": ("name",),
+    "airport_api_airplanetype": ("name",),
+    "airport_api_airplane": ("model_name",),
+    "airport_api_role": ("name",),
+    "airport_api_crewmember": ("first_name", "last_name"),
+}
+
+
+def resolve_lookup(model, lookup):
+    """
+    Splits `lookup` ("source__city__name") into the relation path
+    ("source__city"), the model at its end and the column name.
+    """
+    *relations, field_name = lookup.split("__")
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return "__".join(relations), model, model._meta.get_field(field_name).column
+
+
+class SearchBackend:
+    """
+    Filters a queryset by a free-text query over several lookups
+    and annotates each row with `search_rank`, higher is better.
+    """
+
+    def search(self, queryset, query, lookups):
+        raise NotImplementedError
+
+
+class ContainsSearchBackend(SearchBackend):
+    """
+    Portable fallback, a row ranks by the number of lookups it matches.
+    """
+
+    def search(self, queryset, query, lookups):
+        conditions = [Q(**{f"{lookup}__icontains": query}) for lookup in lookups]
+        return self.rank_by_matches(queryset, conditions)
+
+    @staticmethod
+    def rank_by_matches(queryset, conditions):
+        match = Q()
+        rank = Value(0.0)
+        for condition in conditions:
+            match |= condition
+            rank += Case(
+                When(condition, then=Value(1.0)),
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        return queryset.filter(match).annotate(search_rank=rank)
+
+
+class TrigramSearchBackend(SearchBackend):
+    """
+    PostgreSQL backend. `icontains` compiles to UPPER(column) LIKE,
+    which is served by the pg_trgm GIN indexes on UPPER(column),
+    and rows are ranked by trigram similarity.
+    """
+
+    def search(self, queryset, query, lookups):
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        match = Q()
+        for lookup in lookups:
+            match |= Q(**{f"{lookup}__icontains": query})
+        similarities = [TrigramSimilarity(lookup, query) for lookup in lookups]
+        rank = similarities[0] if len(similarities) == 1 else Greatest(*similarities)
+        return queryset.filter(match).annotate(search_rank=rank)
+
+
+class FTS5SearchBackend(ContainsSearchBackend):
+    """
+    SQLite backend. The query is matched as a substring against the
+    FTS5 trigram table of the column, so the lookup reads the full-text
+    index instead of scanning the table. Like on PostgreSQL, queries
+    shorter than a trigram fall back to a LIKE scan.
+    """
+
+    def search(self, queryset, query, lookups):
+        if len(query) < 3:
+            return super().search(queryset, query, lookups)
+        phrase = '"{}"'.format(query.replace('"', '""'))
+
+        conditions = []
+        for lookup in lookups:
+            relation, model, column = resolve_lookup(queryset.model, lookup)
+            if column not in SEARCH_COLUMNS.get(model._meta.db_table, ()):
+                conditions.append(Q(**{f"{lookup}__icontains": query}))
+                continue
+
+            fts_table = f"{model._meta.db_table}_fts"
+            matching_ids = RawSQL(
+                f"SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH %s",
+                (f"{column} : {phrase}",),
+            )
+            pk_lookup = f"{relation}__pk__in" if relation else "pk__in"
+            conditions.append(Q(**{pk_lookup: matching_ids}))
+
+        return self.rank_by_matches(queryset, conditions)
+
+
+def sqlite_search_triggers(table):
+    """
+    Returns the triggers that keep the FTS5 table of `table` in sync,
+    as (name, SQL) pairs. Migration 0012 creates the same ones.
+    """
+    fts_table = f"{table}_fts"
+    columns = SEARCH_COLUMNS[table]
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    insert_new = (
+        f"INSERT INTO {fts_table}(rowid, {column_list}) "
+        f"VALUES (new.id, {new_values});"
+    )
+    delete_old = (
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) "
+        f"VALUES ('delete', old.id, {old_values});"
+    )
+    return [
+        (
+            f"{fts_table}_{event.lower()}",
+            f"CREATE TRIGGER IF NOT EXISTS {fts_table}_{event.lower()} "
+            f"AFTER {event} ON {table} BEGIN {body} END",
+        )
+        for event, body in (
+            ("INSERT", insert_new),
+            ("DELETE", delete_old),
+            ("UPDATE", f"{delete_old} {insert_new}"),
+        )
+    ]
+
+
+def restore_sqlite_search_triggers(connection):
+    """
+    Django re-creates a SQLite table when a migration alters it, which
+    drops the triggers of its FTS5 table. Puts missing triggers back and
+    re-indexes the table, since writes in between were not indexed.
+    Returns the tables that were repaired.
+    """
+    repaired = []
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT type, name FROM sqlite_master")
+        existing = set(cursor.fetchall())
+
+        for table in SEARCH_COLUMNS:
+            fts_table = f"{table}_fts"
+            if ("table", fts_table) not in existing:
+                continue
+            missing = [
+                sql
+                for name, sql in sqlite_search_triggers(table)
+                if ("trigger", name) not in existing
+            ]
+            if not missing:
+                continue
+            for sql in missing:
+                cursor.execute(sql)
+            cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+            repaired.append(table)
+    return repaired
+
+
+@cache
+def sqlite_has_fts5_trigram():
+    if sqlite3.sqlite_version_info < (3, 34):
+        return False
+    with closing(sqlite3.connect(":memory:")) as db:
+        return bool(
+            db.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0]
+        )
+
+
+def get_search_backend():
+    if connection.vendor == "postgresql":
+        return TrigramSearchBackend()
+    if connection.vendor == "sqlite" and sqlite_has_fts5_trigram():
+        return FTS5SearchBackend()
+    return ContainsSearchBackend()
+
+
+def search(queryset, query, lookups):
+    """
+    Filters `queryset` by `query` over `lookups` and orders it
+    by relevance with the backend matching the database.
+    """
+    queryset = get_search_backend().search(queryset, query, lookups)
+    return queryset.order_by("-search_rank", *queryset.model._meta.ordering)
@@ -0,0 +1,176 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.db.models import Q
+from django.utils import timezone
+
+from airport_api.models import Flight, SeatHold, Ticket
+from airport_api.seat_map import invalidate_seat_maps
+
+
+class SeatUnavailable(Exception):
+    def __init__(self, seats):
+        self.seats = sorted(seats)
+        super().__init__(
+            ", ".join(f"(row: {row}, seat: {seat})" for row, seat in self.seats)
+        )
+
+
+class HoldLimitExceeded(Exception):
+    def __init__(self, limit):
+        self.limit = limit
+        super().__init__(f"At most {limit} seats of a flight can be held at once.")
+
+
+def lock_flights(flight_ids):
+    """
+    Locks the flight rows so holds and sales of their seats
+    are checked and written one request at a time.
+    """
+    return list(
+        Flight.objects.select_for_update()
+        .filter(pk__in=flight_ids)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+
+def sold_seats(seats):
+    """
+    Returns the (flight_id, row, seat) triples of `seats` that have tickets.
+    """
+    seats = set(seats)
+    return seats.intersection(
+        Ticket.objects.filter(
+            flight_id__in={flight_id for flight_id, _, _ in seats},
+            row__in={row for _, row, _ in seats},
+            seat__in={seat for _, _, seat in seats},
+        ).values_list("flight_id", "row", "seat")
+    )
+
+
+def active_holds():
+    return SeatHold.objects.filter(expires_at__gt=timezone.now())
+
+
+def holds_on_seats(holds, seats):
+    """
+    Returns (id, flight_id, row, seat, user_id) of the holds
+    that are placed exactly on `seats` ((flight_id, row, seat) triples).
+    """
+    seats = set(seats)
+    candidates = holds.filter(
+        flight_id__in={flight_id for flight_id, _, _ in seats},
+        row__in={row for _, row, _ in seats},
+        seat__in={seat for _, _, seat in seats},
+    ).values_list("id", "flight_id", "row", "seat", "user_id")
+    return [hold for hold in candidates if hold[1:4] in seats]
+
+
+def delete_holds(holds):
+    """
+    Deletes holds given as (id, flight_id, ...) tuples and keeps
+    `Flight.seats_held` in step with one UPDATE per affected flight.
+    """
+    if not holds:
+        return 0
+
+    with transaction.atomic():
+        # Re-read under a lock, a concurrent request may have
+        # deleted some of the holds already.
+        locked = list(
+            SeatHold.objects.select_for_update()
+            .filter(id__in=[hold[0] for hold in holds])
+            .values_list("id", "flight_id")
+        )
+        SeatHold.objects.filter(id__in=[hold_id for hold_id, _ in locked]).delete()
+        released_per_flight = Counter(flight_id for _, flight_id in locked)
+        for flight_id, released in released_per_flight.items():
+            Flight.change_seats_held(flight_id, -released)
+
+    invalidate_seat_maps(list(released_per_flight))
+    return len(locked)
+
+
+def hold_seats(user, flight, seats, minutes):
+    """
+    Holds `seats` ((row, seat) pairs) of the flight for the user.
+    Holds the user already has on these seats are prolonged.
+    Raises SeatUnavailable if any seat is sold or held by someone else
+    and HoldLimitExceeded if the user would hold more than
+    SEAT_HOLD_MAX_SEATS seats of the flight.
+    """
+    seats = {(flight.id, row, seat) for row, seat in seats}
+    now = timezone.now()
+
+    with transaction.atomic():
+        lock_flights([flight.id])
+
+        taken = sold_seats(seats)
+        if taken:
+            raise SeatUnavailable((row, seat) for _, row, seat in taken)
+
+        # Expired holds of anybody and live holds of this user
+        # make room for the new ones.
+        delete_holds(
+            holds_on_seats(
+                SeatHold.objects.filter(Q(expires_at__lte=now) | Q(user=user)),
+                seats,
+            )
+        )
+
+        # Counted under the flight lock, so parallel requests
+        # of the user can't get past the limit together.
+        held = active_holds().filter(user=user, flight=flight).count()
+        if held + len(seats) > settings.SEAT_HOLD_MAX_SEATS:
+            raise HoldLimitExceeded(settings.SEAT_HOLD_MAX_SEATS)
+
+        holds = [
+            SeatHold(
+                flight=flight,
+                user=user,
+                row=row,
+                seat=seat,
+                expires_at=now + timedelta(minutes=minutes),
+            )
+            for _, row, seat in sorted(seats)
+        ]
+        try:
+            with transaction.atomic():
+                SeatHold.objects.bulk_create(holds)
+        except IntegrityError:
+            # Report what is on the seats now; under the flight lock
+            # this only happens if a row was written without taking it.
+            conflicts = sold_seats(seats).union(
+                hold[1:4] for hold in holds_on_seats(SeatHold.objects.all(), seats)
+            )
+            raise SeatUnavailable((row, seat) for _, row, seat in conflicts or seats)
+
+        Flight.change_seats_held(flight.id, len(holds))
+        invalidate_seat_maps([flight.id])
+
+    return holds
+
+
+def release_user_holds(user, seats):
+    """
+    Releases the user's holds on `seats` ((flight_id, row, seat) triples),
+    used when the held seats are turned into tickets.
+    """
+    return delete_holds(holds_on_seats(SeatHold.objects.filter(user=user), seats))
+
+
+def sweep_expired_holds(batch_size=1000):
+    swept = 0
+    while True:
+        expired = list(
+            SeatHold.objects.filter(expires_at__lte=timezone.now()).values_list(
+                "id", "flight_id"
+            )[:batch_size]
+        )
+        if not expired:
+            return swept
+        with transaction.atomic():
+            swept += delete_holds(expired)
@@ -0,0 +1,118 @@
+import base64
+import logging
+from math import ceil
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from airport_api import metrics
+from airport_api.models import Ticket, SeatHold
+
+SEAT_MAP_CACHE_KEY = "airport_api:seat_map:{flight_id}"
+
+logger = logging.getLogger(__name__)
+
+
+def seat_map_cache_key(flight_id):
+    return SEAT_MAP_CACHE_KEY.format(flight_id=flight_id)
+
+
+def seat_index(row, seat, seats_in_row):
+    return (row - 1) * seats_in_row + (seat - 1)
+
+
+def build_seat_map(flight):
+    """
+    Packs the occupancy of the flight's airplane into a bitset,
+    one bit per seat in row-major order, most significant bit first.
+    Sold seats are read with a single query that is covered
+    by the index of the `unique_flight_seat` constraint,
+    live seat holds are marked as taken too. Seats outside the grid,
+    left behind when the airplane was made smaller, are logged and skipped.
+
+    Returns the seat map and the number of seconds it stays valid,
+    which is bounded by the earliest hold expiry.
+    """
+    rows = flight.airplane.rows
+    seats_in_row = flight.airplane.seats_in_row
+    bitmap = bytearray((rows * seats_in_row + 7) // 8)
+    now = timezone.now()
+    timeout = settings.SEAT_MAP_CACHE_TIMEOUT
+
+    def mark(row, seat):
+        if not (1 <= row <= rows and 1 <= seat <= seats_in_row):
+            logger.warning(
+                "Seat %s:%s of flight %s is outside of its %sx%s airplane.",
+                row,
+                seat,
+                flight.id,
+                rows,
+                seats_in_row,
+            )
+            return False
+        index = seat_index(row, seat, seats_in_row)
+        bitmap[index >> 3] |= 0x80 >> (index & 7)
+        return True
+
+    taken = 0
+    for row, seat in Ticket.objects.filter(flight_id=flight.id).values_list(
+        "row", "seat"
+    ):
+        taken += mark(row, seat)
+
+    held = 0
+    for row, seat, expires_at in SeatHold.objects.filter(
+        flight_id=flight.id,
+        expires_at__gt=now,
+    ).values_list("row", "seat", "expires_at"):
+        held += mark(row, seat)
+        timeout = min(timeout, ceil((expires_at - now).total_seconds()))
+
+    seat_map = {
+        "flight": flight.id,
+        "rows": rows,
+        "seats_in_row": seats_in_row,
+        "taken": taken,
+        "held": held,
+        "bitmap": base64.b64encode(bytes(bitmap)).decode(),
+    }
+    return seat_map, timeout
+
+
+def get_seat_map(flight_id, get_flight):
+    """
+    Returns the cached seat map of the flight.
+    `get_flight` is called only on a cache miss,
+    so cached seat maps are served without touching the database.
+    """
+    key = seat_map_cache_key(flight_id)
+    seat_map = cache.get(key)
+    if seat_map is None:
+        metrics.cache_requests.inc(cache="seat_map", outcome="misses")
+        seat_map, timeout = build_seat_map(get_flight())
+        cache.set(key, seat_map, timeout)
+    else:
+        metrics.cache_requests.inc(cache="seat_map", outcome="hits")
+    return seat_map
+
+
+def expand_seat_map(seat_map):
+    bitmap = base64.b64decode(seat_map["bitmap"])
+    seats_in_row = seat_map["seats_in_row"]
+    return [
+        [
+            bool(bitmap[index >> 3] & (0x80 >> (index & 7)))
+            for index in range(
+                seat_index(row, 1, seats_in_row),
+                seat_index(row, seats_in_row, seats_in_row) + 1,
+            )
+        ]
+        for row in range(1, seat_map["rows"] + 1)
+    ]
+
+
+def invalidate_seat_maps(flight_ids):
+    keys = [seat_map_cache_key(flight_id) for flight_id in flight_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -1,7 +1,12 @@
+from collections import Counter
+
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from rest_framework import serializers
-from django.db import transaction
+from django.db import transaction, IntegrityError
 
+from airport_api.bulk import BulkListSerializer
+from airport_api.flight_search import attach_crew
 from airport_api.models import (
     City,
     Airport,
@@ -11,9 +16,67 @@ from airport_api.models import (
     Role,
     CrewMember,
     Flight,
+    FlightSearchEntry,
     Ticket,
     Order,
+    SeatHold,
+)
+from airport_api.seat_holds import (
+    HoldLimitExceeded,
+    SeatUnavailable,
+    active_holds,
+    holds_on_seats,
+    hold_seats,
+    lock_flights,
+    release_user_holds,
+    sold_seats,
 )
+from airport_api.seat_map import expand_seat_map, invalidate_seat_maps
+from airport_api.validators import validate_flight_number_format
+
+
+def parse_field_names(value):
+    """
+    Parses a comma separated `?fields=` or `?expand=` value.
+    """
+    if not value:
+        return set()
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+class DynamicFieldsMixin:
+    """
+    Lets the client trim the output of a root serializer with
+    `?fields=id,departure_time` and replace the fields listed in
+    `expandable_fields` with nested data with `?expand=route`.
+    """
+
+    # field name -> (serializer class, its init kwargs)
+    expandable_fields = {}
+
+    def is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        if request is None or not self.is_root():
+            return fields
+
+        for name in parse_field_names(request.query_params.get("expand")):
+            if name in self.expandable_fields:
+                serializer_class, kwargs = self.expandable_fields[name]
+                fields[name] = serializer_class(read_only=True, **kwargs)
+
+        requested = parse_field_names(request.query_params.get("fields"))
+        if requested:
+            fields = {
+                name: field for name, field in fields.items() if name in requested
+            }
+        return fields
 
 
 class CitySerializer(serializers.ModelSerializer):
@@ -39,6 +102,22 @@ class AirportRetrieveSerializer(AirportSerializer):
     city = CitySerializer()
 
 
+class AirportAutocompleteFilterSerializer(serializers.Serializer):
+    q = serializers.CharField(trim_whitespace=True)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+
+class AirportSuggestionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    city = serializers.CharField()
+    country = serializers.CharField()
+    matched = serializers.ChoiceField(
+        choices=("airport", "city", "country"),
+        help_text="Which name matched the query",
+    )
+
+
 class RouteSerializer(serializers.ModelSerializer):
     source = serializers.PrimaryKeyRelatedField(
         queryset=Airport.objects.select_related("city")
@@ -61,12 +140,17 @@ class RouteSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class RouteListSerializer(RouteSerializer):
+class RouteListSerializer(DynamicFieldsMixin, RouteSerializer):
     source = serializers.StringRelatedField()
     destination = serializers.StringRelatedField()
 
+    expandable_fields = {
+        "source": (AirportListSerializer, {}),
+        "destination": (AirportListSerializer, {}),
+    }
+
 
-class RouteRetrieveSerializer(RouteSerializer):
+class RouteRetrieveSerializer(DynamicFieldsMixin, RouteSerializer):
     source = AirportRetrieveSerializer()
     destination = AirportRetrieveSerializer()
 
@@ -128,6 +212,53 @@ class CrewMemberPhotoSerializer(serializers.ModelSerializer):
         fields = ("id", "photo")
 
 
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Looks up related objects in a {pk: object} dict that the root
+    serializer stored in its context under `context_key`,
+    so a list of N items doesn't issue N queries.
+    Falls back to the queryset when nothing was prefetched.
+    """
+
+    def __init__(self, context_key, **kwargs):
+        self.context_key = context_key
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        prefetched = self.context.get(self.context_key)
+        if prefetched is None:
+            return super().to_internal_value(data)
+
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return prefetched[int(data)]
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+
+
+def to_pks(values):
+    pks = set()
+    for value in values if isinstance(values, list) else []:
+        try:
+            pks.add(int(value))
+        except (TypeError, ValueError):
+            continue
+    return pks
+
+
+def collect_pks(items, field_name):
+    return to_pks(
+        [
+            item.get(field_name)
+            for item in (items if isinstance(items, list) else [])
+            if isinstance(item, dict)
+        ]
+    )
+
+
 class FlightSerializer(serializers.ModelSerializer):
     available_seats = serializers.IntegerField(read_only=True)
     route = serializers.PrimaryKeyRelatedField(
@@ -136,7 +267,8 @@ class FlightSerializer(serializers.ModelSerializer):
             "destination__city",
         )
     )
-    crew = serializers.PrimaryKeyRelatedField(
+    crew = PrefetchedPrimaryKeyRelatedField(
+        context_key="crew_members",
         many=True,
         queryset=CrewMember.objects.select_related("role"),
     )
@@ -155,6 +287,17 @@ class FlightSerializer(serializers.ModelSerializer):
             "crew",
         )
 
+    def to_internal_value(self, data):
+        # BulkListSerializer has already fetched the crew of the whole list.
+        if hasattr(data, "get") and "crew_members" not in self.context:
+            crew = (
+                data.getlist("crew") if hasattr(data, "getlist") else data.get("crew")
+            )
+            self.context["crew_members"] = CrewMember.objects.select_related(
+                "role"
+            ).in_bulk(to_pks(crew))
+        return super().to_internal_value(data)
+
 
 class FlightFilterSerializer(serializers.ModelSerializer):
     departure_time_after = serializers.DateField(required=False)
@@ -199,7 +342,63 @@ class FlightFilterSerializer(serializers.ModelSerializer):
         return data
 
 
-class FlightListSerializer(FlightSerializer):
+class ItineraryFilterSerializer(serializers.Serializer):
+    source_city = serializers.CharField()
+    destination_city = serializers.CharField()
+    departure_date = serializers.DateField()
+    min_connection = serializers.IntegerField(min_value=0, default=45)
+    max_connection = serializers.IntegerField(min_value=1, default=720)
+    max_legs = serializers.IntegerField(min_value=1, max_value=4, default=3)
+    passengers = serializers.IntegerField(min_value=1, default=1)
+    sort = serializers.ChoiceField(
+        choices=("duration", "distance"),
+        default="duration",
+    )
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+    def validate(self, data):
+        Route.validate_source_and_destination(
+            data["source_city"].lower(),
+            data["destination_city"].lower(),
+            serializers.ValidationError,
+        )
+
+        if data["min_connection"] > data["max_connection"]:
+            raise serializers.ValidationError(
+                "min_connection can`t be greater than max_connection."
+            )
+
+        return data
+
+
+class ExportFilterSerializer(serializers.Serializer):
+    output = serializers.ChoiceField(choices=("ndjson", "csv"), default="ndjson")
+    updated_after = serializers.DateTimeField(
+        required=False,
+        help_text="Export only rows changed after this time",
+    )
+
+
+class ItineraryLegSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    flight_number = serializers.CharField()
+    departure_time = serializers.DateTimeField(format="%d %b %Y, %H:%M")
+    arrival_time = serializers.DateTimeField(format="%d %b %Y, %H:%M")
+    distance = serializers.IntegerField()
+
+
+class ItinerarySerializer(serializers.Serializer):
+    source = serializers.CharField()
+    destination = serializers.CharField()
+    departure_time = serializers.DateTimeField(format="%d %b %Y, %H:%M")
+    arrival_time = serializers.DateTimeField(format="%d %b %Y, %H:%M")
+    duration = serializers.IntegerField(help_text="Total duration in minutes")
+    distance = serializers.IntegerField()
+    connections = serializers.IntegerField()
+    legs = ItineraryLegSerializer(many=True)
+
+
+class FlightListSerializer(DynamicFieldsMixin, FlightSerializer):
     route = serializers.SlugRelatedField(read_only=True, slug_field="name")
     airplane = serializers.SlugRelatedField(
         read_only=True,
@@ -214,8 +413,47 @@ class FlightListSerializer(FlightSerializer):
         slug_field="full_name",
     )
 
+    expandable_fields = {
+        "route": (RouteListSerializer, {}),
+        "airplane": (AirplaneListSerializer, {}),
+        "crew": (CrewMemberListSerializer, {"many": True}),
+    }
+
+
+class FlightSearchEntryListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        entries = list(data.all() if hasattr(data, "all") else data)
+        if "crew" in self.child.fields:
+            attach_crew(entries)
+        return super().to_representation(entries)
+
+
+class FlightSearchEntrySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Renders a FlightSearchEntry exactly like FlightListSerializer
+    renders its flight, without expandable fields.
+    """
+
+    id = serializers.IntegerField(read_only=True, source="flight_id")
+    available_seats = serializers.IntegerField(read_only=True)
+    route = serializers.CharField(read_only=True, source="route_name")
+    airplane = serializers.CharField(read_only=True, source="airplane_model")
+    departure_time = serializers.DateTimeField(format="%d %b %Y, %H:%M")
+    arrival_time = serializers.DateTimeField(format="%d %b %Y, %H:%M")
+    status = serializers.CharField(read_only=True, source="get_status_display")
+    crew = serializers.ListField(
+        child=serializers.CharField(),
+        read_only=True,
+        source="crew_names",
+    )
+
+    class Meta:
+        model = FlightSearchEntry
+        fields = FlightSerializer.Meta.fields
+        list_serializer_class = FlightSearchEntryListSerializer
 
-class FlightRetrieveSerializer(FlightSerializer):
+
+class FlightRetrieveSerializer(DynamicFieldsMixin, FlightSerializer):
     route = RouteListSerializer()
     airplane = AirplaneListSerializer()
     departure_time = serializers.DateTimeField(format="%d %b %Y, %H:%M")
@@ -223,8 +461,90 @@ class FlightRetrieveSerializer(FlightSerializer):
     status = serializers.CharField(read_only=True, source="get_status_display")
     crew = CrewMemberListSerializer(many=True)
 
+    expandable_fields = {
+        "route": (RouteRetrieveSerializer, {}),
+        "airplane": (AirplaneRetrieveSerializer, {}),
+    }
+
+
+class SeatMapSerializer(serializers.Serializer):
+    flight = serializers.IntegerField()
+    rows = serializers.IntegerField()
+    seats_in_row = serializers.IntegerField()
+    taken = serializers.IntegerField(help_text="Number of sold seats")
+    held = serializers.IntegerField(help_text="Number of temporarily held seats")
+    bitmap = serializers.CharField(
+        help_text="Base64 bitset, one bit per seat in row-major order, "
+        "most significant bit first, 1 means sold or held"
+    )
+    seats = serializers.SerializerMethodField()
+
+    def get_seats(self, obj) -> list[list[bool]]:
+        return expand_seat_map(obj)
+
+
+class SeatSerializer(serializers.Serializer):
+    row = serializers.IntegerField()
+    seat = serializers.IntegerField()
+
+
+class SeatHoldSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SeatHold
+        fields = ("id", "flight", "row", "seat", "expires_at")
+
+
+class SeatHoldCreateSerializer(serializers.Serializer):
+    flight = serializers.PrimaryKeyRelatedField(
+        queryset=Flight.objects.select_related("airplane")
+    )
+    seats = SeatSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=settings.SEAT_HOLD_MAX_SEATS,
+    )
+    minutes = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.SEAT_HOLD_MAX_MINUTES,
+        default=settings.SEAT_HOLD_MAX_MINUTES,
+    )
+
+    def validate(self, attrs):
+        for seat in attrs["seats"]:
+            Ticket.validate_row_and_seat(
+                attrs["flight"].airplane,
+                seat["row"],
+                seat["seat"],
+                serializers.ValidationError,
+            )
+        return attrs
+
+    def create(self, validated_data):
+        try:
+            return hold_seats(
+                validated_data["user"],
+                validated_data["flight"],
+                [(seat["row"], seat["seat"]) for seat in validated_data["seats"]],
+                validated_data["minutes"],
+            )
+        except SeatUnavailable as error:
+            raise serializers.ValidationError(
+                {"seats": [f"Seats {error} are not available."]},
+                code="seat_unavailable",
+            )
+        except HoldLimitExceeded as error:
+            raise serializers.ValidationError(
+                {"seats": [str(error)]},
+                code="hold_limit",
+            )
+
 
 class TicketSerializer(serializers.ModelSerializer):
+    flight = PrefetchedPrimaryKeyRelatedField(
+        context_key="flights",
+        queryset=Flight.objects.select_related("airplane"),
+    )
+
     class Meta:
         model = Ticket
         fields = (
@@ -235,6 +555,9 @@ class TicketSerializer(serializers.ModelSerializer):
             "passenger_last_name",
             "flight",
         )
+        # Taken seats are checked for the whole order at once
+        # in OrderSerializer.validate_tickets.
+        validators = []
 
     def validate(self, attrs):
         Ticket.validate_row_and_seat(
@@ -253,14 +576,101 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = ("id", "created_at", "tickets")
 
+    def to_internal_value(self, data):
+        if hasattr(data, "get"):
+            flight_ids = collect_pks(data.get("tickets"), "flight")
+            flights = Flight.objects.select_related("airplane")
+            self.context["flights"] = flights.in_bulk(flight_ids)
+        return super().to_internal_value(data)
+
+    def validate_tickets(self, tickets):
+        requested = set()
+        flights = {ticket["flight"].id: ticket["flight"] for ticket in tickets}
+        for ticket in tickets:
+            seat = (ticket["flight"].id, ticket["row"], ticket["seat"])
+            if seat in requested:
+                raise serializers.ValidationError(
+                    f"Seat (row: {ticket['row']}, seat: {ticket['seat']}) "
+                    f"on {ticket['flight']} is ordered more than once.",
+                    code="duplicate_seat",
+                )
+            requested.add(seat)
+
+        taken = sold_seats(requested)
+        if taken:
+            raise serializers.ValidationError(
+                [
+                    f"Seat (row: {row}, seat: {seat}) on "
+                    f"{flights[flight_id]} is already taken."
+                    for flight_id, row, seat in sorted(taken)
+                ],
+                code="seat_taken",
+            )
+
+        self.check_holds(requested, flights)
+        return tickets
+
+    def check_holds(self, requested, flights):
+        request = self.context.get("request")
+        user_id = getattr(getattr(request, "user", None), "id", None)
+        held = [
+            (flight_id, row, seat)
+            for _, flight_id, row, seat, holder_id in holds_on_seats(
+                active_holds(), requested
+            )
+            if holder_id != user_id
+        ]
+        if held:
+            raise serializers.ValidationError(
+                [
+                    f"Seat (row: {row}, seat: {seat}) on "
+                    f"{flights[flight_id]} is held by another customer."
+                    for flight_id, row, seat in sorted(held)
+                ],
+                code="seat_held",
+            )
+
     def create(self, validated_data):
-        with transaction.atomic():
-            tickets_data = validated_data.pop("tickets", None)
-            order = Order.objects.create(**validated_data)
-            Ticket.objects.bulk_create(
-                [Ticket(order=order, **ticket) for ticket in tickets_data]
+        tickets_data = validated_data.pop("tickets", None)
+        try:
+            with transaction.atomic():
+                flights = {
+                    ticket["flight"].id: ticket["flight"] for ticket in tickets_data
+                }
+                # Holds placed since validation are checked again
+                # under the flight lock, which hold_seats takes too.
+                lock_flights(flights)
+                self.check_holds(
+                    {
+                        (ticket["flight"].id, ticket["row"], ticket["seat"])
+                        for ticket in tickets_data
+                    },
+                    flights,
+                )
+                order = Order.objects.create(**validated_data)
+                Ticket.objects.bulk_create(
+                    [Ticket(order=order, **ticket) for ticket in tickets_data]
+                )
+                release_user_holds(
+                    order.user,
+                    [
+                        (ticket["flight"].id, ticket["row"], ticket["seat"])
+                        for ticket in tickets_data
+                    ],
+                )
+                sold_per_flight = Counter(
+                    ticket["flight"].id for ticket in tickets_data
+                )
+                for flight_id, sold in sold_per_flight.items():
+                    Flight.change_seats_sold(flight_id, sold)
+                invalidate_seat_maps(list(sold_per_flight))
+                return order
+        except IntegrityError:
+            # Another order took one of the seats after validation.
+            raise serializers.ValidationError(
+                {"tickets": ["One of the seats has just been taken."]},
+                code="seat_taken",
             )
-            return order
 
 
 class TicketListSerializer(TicketSerializer):
@@ -320,10 +730,99 @@ class TicketRetrieveSerializer(TicketSerializer):
         )
 
 
-class OrderListSerializer(OrderSerializer):
+class OrderListSerializer(DynamicFieldsMixin, OrderSerializer):
     created_at = serializers.DateTimeField(format="%d %b %Y, %H:%M")
     tickets = TicketListSerializer(many=True, read_only=True)
 
+    expandable_fields = {
+        "tickets": (TicketRetrieveSerializer, {"many": True}),
+    }
+
 
 class OrderRetrieveSerializer(OrderListSerializer):
     tickets = TicketRetrieveSerializer(many=True, read_only=True)
+
+    expandable_fields = {}
+
+
+class RouteBulkSerializer(RouteSerializer):
+    source = PrefetchedPrimaryKeyRelatedField(
+        context_key="airports",
+        queryset=Airport.objects.all(),
+    )
+    destination = PrefetchedPrimaryKeyRelatedField(
+        context_key="airports",
+        queryset=Airport.objects.all(),
+    )
+
+    class Meta(RouteSerializer.Meta):
+        # Uniqueness is checked for the whole list in BulkListSerializer.
+        validators = []
+        list_serializer_class = BulkListSerializer
+
+    def validate(self, attrs):
+        # Partial updates compare against the airports already set.
+        source, destination = (
+            attrs[name].pk if name in attrs else getattr(self.instance, f"{name}_id")
+            for name in ("source", "destination")
+        )
+        Route.validate_source_and_destination(
+            source,
+            destination,
+            serializers.ValidationError,
+        )
+        return attrs
+
+
+class CrewMemberBulkSerializer(CrewMemberSerializer):
+    role = PrefetchedPrimaryKeyRelatedField(
+        context_key="roles",
+        queryset=Role.objects.all(),
+    )
+
+    class Meta(CrewMemberSerializer.Meta):
+        list_serializer_class = BulkListSerializer
+
+
+class FlightBulkSerializer(FlightSerializer):
+    route = PrefetchedPrimaryKeyRelatedField(
+        context_key="routes",
+        queryset=Route.objects.all(),
+    )
+    airplane = PrefetchedPrimaryKeyRelatedField(
+        context_key="airplanes",
+        queryset=Airplane.objects.all(),
+    )
+    crew = PrefetchedPrimaryKeyRelatedField(
+        context_key="crew_members",
+        many=True,
+        queryset=CrewMember.objects.all(),
+    )
+
+    class Meta(FlightSerializer.Meta):
+        fields = (
+            "id",
+            "flight_number",
+            "route",
+            "airplane",
+            "departure_time",
+            "arrival_time",
+            "status",
+            "crew",
+        )
+        # Uniqueness is checked for the whole list in BulkListSerializer.
+        extra_kwargs = {
+            "flight_number": {"validators": [validate_flight_number_format]},
+        }
+        list_serializer_class = BulkListSerializer
+
+    def validate(self, attrs):
+        departure_time = attrs.get(
+            "departure_time", getattr(self.instance, "departure_time", None)
+        )
+        arrival_time = attrs.get(
+            "arrival_time", getattr(self.instance, "arrival_time", None)
+        )
+        if departure_time and arrival_time and departure_time > arrival_time:
+            raise serializers.ValidationError("Departure can`t be later than arrival.")
+        return attrs
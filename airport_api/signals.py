@@ -0,0 +1,170 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from airport_api.autocomplete import airport_index
+from airport_api.bulk import post_bulk_save
+from airport_api.flight_search import refresh_flights, refresh_flights_of
+from airport_api.itineraries import flight_graph
+from airport_api.models import (
+    City,
+    Airport,
+    Route,
+    AirplaneType,
+    Airplane,
+    Role,
+    CrewMember,
+    Flight,
+    Order,
+    Ticket,
+)
+from airport_api.response_cache import invalidate_model
+from airport_api.seat_map import invalidate_seat_maps
+
+
+@receiver(post_save, sender=Ticket)
+def increment_seats_sold(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Flight.change_seats_sold(instance.flight_id, 1)
+    invalidate_seat_maps([instance.flight_id])
+
+
+# Deleting one of these cascades to its flights and their tickets.
+FLIGHT_OWNERS = (Flight, Route, Airplane, Airport, City, AirplaneType)
+
+
+def deletes_flights(origin):
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, FLIGHT_OWNERS)
+
+
+@receiver(post_delete, sender=Ticket)
+def decrement_seats_sold(sender, instance, origin=None, **kwargs):
+    # The flight goes away with its tickets and its orders were touched
+    # once in touch_orders_of_deleted_flight, so skip a query per ticket.
+    if deletes_flights(origin):
+        return
+    Flight.change_seats_sold(instance.flight_id, -1)
+    Order.objects.filter(pk=instance.order_id).update(updated_at=timezone.now())
+    invalidate_seat_maps([instance.flight_id])
+
+
+@receiver(pre_delete, sender=Flight)
+def touch_orders_of_deleted_flight(sender, instance, **kwargs):
+    Order.objects.filter(tickets__flight=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Flight)
+def update_flight_graph(sender, instance, raw=False, **kwargs):
+    if not raw:
+        # Reads the flight back, so wait until it is committed.
+        flight_id = instance.id
+        transaction.on_commit(lambda: flight_graph.update_flight(flight_id))
+    invalidate_seat_maps([instance.id])
+
+
+@receiver(post_bulk_save, sender=Flight)
+def rebuild_flight_graph(sender, instances, **kwargs):
+    flight_graph.invalidate()
+    invalidate_seat_maps([instance.id for instance in instances])
+
+
+@receiver(post_save, sender=Flight)
+def refresh_flight_search_entry(sender, instance, raw=False, **kwargs):
+    # Fixtures may load the route or airplane later,
+    # run refresh_flight_search after loading them.
+    if not raw:
+        refresh_flights(Flight.objects.filter(pk=instance.pk))
+
+
+@receiver(post_bulk_save, sender=Flight)
+def refresh_flight_search_entries(sender, instances, **kwargs):
+    refresh_flights(Flight.objects.filter(pk__in=[flight.pk for flight in instances]))
+
+
+@receiver(post_save, sender=City)
+@receiver(post_save, sender=Airport)
+@receiver(post_save, sender=Route)
+@receiver(post_save, sender=Airplane)
+def refresh_flight_search_of_related(sender, instance, created, raw=False, **kwargs):
+    # A new object has no flights yet.
+    if not created and not raw:
+        refresh_flights_of(sender, [instance.pk])
+
+
+@receiver(post_bulk_save, sender=City)
+@receiver(post_bulk_save, sender=Airport)
+@receiver(post_bulk_save, sender=Route)
+@receiver(post_bulk_save, sender=Airplane)
+def refresh_flight_search_of_bulk_related(sender, instances, created, **kwargs):
+    if not created:
+        refresh_flights_of(sender, [instance.pk for instance in instances])
+
+
+@receiver(post_delete, sender=Flight)
+def remove_from_flight_graph(sender, instance, **kwargs):
+    flight_graph.remove_flight(instance.id)
+
+
+@receiver(post_save, sender=City)
+@receiver(post_save, sender=Airport)
+@receiver(post_save, sender=Route)
+@receiver(post_bulk_save, sender=City)
+@receiver(post_bulk_save, sender=Airport)
+@receiver(post_bulk_save, sender=Route)
+def invalidate_flight_graph(sender, **kwargs):
+    flight_graph.invalidate()
+
+
+@receiver(post_save, sender=Airplane)
+def invalidate_airplane_seat_maps(sender, instance, **kwargs):
+    invalidate_seat_maps(instance.flights.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+@receiver(post_bulk_save, sender=City)
+@receiver(post_save, sender=Airport)
+@receiver(post_delete, sender=Airport)
+@receiver(post_bulk_save, sender=Airport)
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+@receiver(post_bulk_save, sender=Route)
+@receiver(post_save, sender=AirplaneType)
+@receiver(post_delete, sender=AirplaneType)
+@receiver(post_bulk_save, sender=AirplaneType)
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_bulk_save, sender=Role)
+def invalidate_cached_responses(sender, **kwargs):
+    invalidate_model(sender)
+
+
+@receiver(m2m_changed, sender=Flight.crew.through)
+def touch_flights_on_crew_change(sender, instance, action, reverse, pk_set, **kwargs):
+    now = timezone.now()
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            Flight.objects.filter(pk=instance.pk).update(updated_at=now)
+    elif action in ("post_add", "post_remove"):
+        Flight.objects.filter(pk__in=pk_set).update(updated_at=now)
+    elif action == "pre_clear":
+        instance.flights.update(updated_at=now)
+
+
+@receiver(pre_delete, sender=CrewMember)
+def touch_flights_of_deleted_crew_member(sender, instance, **kwargs):
+    # Deleting the member silently drops it from the flights' crew.
+    instance.flights.update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+@receiver(post_bulk_save, sender=City)
+@receiver(post_save, sender=Airport)
+@receiver(post_delete, sender=Airport)
+@receiver(post_bulk_save, sender=Airport)
+def invalidate_airport_index(sender, **kwargs):
+    airport_index.invalidate()
@@ -1,6 +1,28 @@
+import json
+import tempfile
+from io import StringIO
+
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count, F
+from django.db.models.signals import post_delete
+from django.test import LiveServerTestCase, TestCase
+from django.urls import reverse
+
+from airport_api.benchmarks import throttling_disabled
+from airport_api.models import (
+    Airplane,
+    Airport,
+    City,
+    CrewMember,
+    Flight,
+    FlightSearchEntry,
+    Order,
+    Route,
+    Ticket,
+)
 
 from airport_api.tests.factories import (
     sample_city,
@@ -105,6 +127,94 @@ class FlightTest(TestCase):
         flight = sample_flight()
         self.assertEqual(str(flight), f"Flight {flight.flight_number}")
 
+    def test_seats_sold_follows_tickets(self):
+        flight = sample_flight()
+        ticket = sample_ticket(flight=flight)
+        sample_ticket(flight=flight, row=2)
+
+        flight.refresh_from_db()
+        self.assertEqual(flight.seats_sold, 2)
+
+        ticket.delete()
+        flight.refresh_from_db()
+        self.assertEqual(flight.seats_sold, 1)
+
+    def test_reconcile_seats_sold_command(self):
+        flight = sample_flight()
+        sample_ticket(flight=flight)
+        Flight.objects.filter(pk=flight.pk).update(seats_sold=10)
+
+        call_command("reconcile_seats_sold", stdout=StringIO())
+
+        flight.refresh_from_db()
+        self.assertEqual(flight.seats_sold, 1)
+        self.assertEqual(flight.search_entry.seats_sold, 1)
+
+    def test_seats_sold_change_touches_updated_at(self):
+        flight = sample_flight()
+        updated_at = flight.updated_at
+
+        sample_ticket(flight=flight)
+
+        flight.refresh_from_db()
+        self.assertGreater(flight.updated_at, updated_at)
+
+
+class FlightSearchEntryTest(TestCase):
+    def setUp(self):
+        self.flight = sample_flight()
+        self.flight.refresh_from_db()
+
+    def entry(self):
+        return FlightSearchEntry.objects.get(pk=self.flight.pk)
+
+    def test_entry_copies_flight(self):
+        entry = self.entry()
+
+        self.assertEqual(entry.flight_number, self.flight.flight_number)
+        self.assertEqual(entry.route_name, self.flight.route.name)
+        self.assertEqual(entry.source_city, self.flight.route.source.city.name)
+        self.assertEqual(entry.airplane_model, self.flight.airplane.model_name)
+        self.assertEqual(entry.capacity, self.flight.airplane.capacity)
+        self.assertEqual(entry.departure_time, self.flight.departure_time)
+        self.assertEqual(entry.status, self.flight.status)
+
+    def test_entry_follows_writes(self):
+        ticket = sample_ticket(flight=self.flight)
+        sample_ticket(flight=self.flight, row=2)
+        ticket.delete()
+        self.flight.refresh_from_db()
+        self.flight.status = 3
+        self.flight.save()
+        city = self.flight.route.destination.city
+        city.name = "Renamed"
+        city.save()
+        airplane = self.flight.airplane
+        airplane.rows = 2
+        airplane.save()
+
+        entry = self.entry()
+        self.assertEqual(entry.status, 3)
+        self.assertEqual(entry.destination_city, "Renamed")
+        self.assertTrue(entry.route_name.endswith(" - Renamed"))
+        self.assertEqual(entry.capacity, 2 * airplane.seats_in_row)
+        self.assertEqual(entry.seats_sold, 1)
+
+    def test_entry_is_deleted_with_flight(self):
+        self.flight.route.delete()
+
+        self.assertFalse(FlightSearchEntry.objects.exists())
+
+    def test_refresh_flight_search_command(self):
+        Flight.objects.filter(pk=self.flight.pk).update(flight_number="ZZ999")
+        other = sample_flight(flight_number="UA4321")
+        FlightSearchEntry.objects.filter(pk=other.pk).delete()
+
+        call_command("refresh_flight_search", stdout=StringIO())
+
+        self.assertEqual(self.entry().flight_number, "ZZ999")
+        self.assertEqual(FlightSearchEntry.objects.count(), 2)
+
 
 class OrderTest(TestCase):
     def test_str_method(self):
@@ -130,3 +240,263 @@ class TicketTest(TestCase):
             str(ticket),
             f"{ticket.flight} (row: {ticket.row}, seat: {ticket.seat})",
         )
+
+
+SCHEDULE_CSV = """\
+flight_number,source_airport,source_city,source_country,destination_airport,\
+destination_city,destination_country,distance,airplane,airplane_type,rows,\
+seats_in_row,departure_time,arrival_time,status,crew
+PS101,Boryspil,Kyiv,Ukraine,Danylo Halytskyi,Lviv,Ukraine,470,Boeing 737,\
+Jet,30,6,2025-07-01T08:00:00Z,2025-07-01T09:10:00Z,Scheduled,\
+Ivan Petrenko (Pilot);Olena Bondar (Stewardess)
+PS102,Danylo Halytskyi,Lviv,Ukraine,Boryspil,Kyiv,Ukraine,470,Boeing 737,\
+Jet,30,6,2025-07-01T11:00:00Z,2025-07-01T12:10:00Z,0,Ivan Petrenko (Pilot)
+"""
+
+
+class ImportScheduleCommandTest(TestCase):
+    def import_schedule(self, content, suffix=".csv", **options):
+        with tempfile.NamedTemporaryFile("w", suffix=suffix) as file:
+            file.write(content)
+            file.flush()
+            call_command("import_schedule", file.name, stdout=StringIO(), **options)
+
+    def test_import_creates_schedule(self):
+        self.import_schedule(SCHEDULE_CSV)
+
+        self.assertEqual(City.objects.count(), 2)
+        self.assertEqual(Airport.objects.count(), 2)
+        self.assertEqual(Route.objects.count(), 2)
+        self.assertEqual(CrewMember.objects.count(), 2)
+        flight = Flight.objects.get(flight_number="PS101")
+        self.assertEqual(flight.route.source.city.name, "Kyiv")
+        self.assertEqual(flight.airplane.capacity, 180)
+        self.assertEqual(flight.crew.count(), 2)
+
+    def test_import_updates_existing_flights(self):
+        self.import_schedule(SCHEDULE_CSV, batch_size=1)
+        rows = [
+            {
+                "flight_number": "PS101",
+                "source_airport": "Boryspil",
+                "source_city": "Kyiv",
+                "source_country": "Ukraine",
+                "destination_airport": "Danylo Halytskyi",
+                "destination_city": "Lviv",
+                "destination_country": "Ukraine",
+                "distance": 480,
+                "airplane": "Boeing 737",
+                "airplane_type": "Jet",
+                "rows": 30,
+                "seats_in_row": 6,
+                "departure_time": "2025-07-01T09:00:00Z",
+                "arrival_time": "2025-07-01T10:10:00Z",
+                "status": "Canceled",
+                "crew": ["Olena Bondar (Stewardess)"],
+            }
+        ]
+
+        self.import_schedule(json.dumps(rows), suffix=".json")
+
+        self.assertEqual(Flight.objects.count(), 2)
+        flight = Flight.objects.get(flight_number="PS101")
+        self.assertEqual(flight.status, 3)
+        self.assertEqual(flight.departure_time.hour, 9)
+        self.assertEqual(flight.route.distance, 480)
+        self.assertEqual(
+            list(flight.crew.values_list("last_name", flat=True)), ["Bondar"]
+        )
+
+    def test_import_reports_invalid_rows(self):
+        content = SCHEDULE_CSV.replace("PS102", "ps102")
+
+        with self.assertRaisesMessage(CommandError, "Row 2"):
+            self.import_schedule(content)
+
+        self.assertFalse(Flight.objects.exists())
+
+    def test_import_rejects_unknown_status(self):
+        content = SCHEDULE_CSV.replace(",0,Ivan", ",9,Ivan")
+
+        with self.assertRaisesMessage(CommandError, "Row 2: invalid status '9'"):
+            self.import_schedule(content)
+
+    def test_import_rejects_ambiguous_airplane(self):
+        Airplane.objects.bulk_create(
+            Airplane(
+                model_name="Boeing 737",
+                rows=30,
+                seats_in_row=6,
+                airplane_type=sample_airplane_type(name="Jet"),
+            )
+            for _ in range(2)
+        )
+
+        with self.assertRaisesMessage(CommandError, "2 airplanes"):
+            self.import_schedule(SCHEDULE_CSV)
+
+        self.assertFalse(Flight.objects.exists())
+
+    def test_import_reports_airplane_seats_mismatch(self):
+        sample_airplane(
+            model_name="Boeing 737",
+            rows=20,
+            seats_in_row=6,
+            airplane_type=sample_airplane_type(name="Jet"),
+        )
+
+        with self.assertRaisesMessage(
+            CommandError, "has 20 rows of 6 seats, not 30 of 6"
+        ):
+            self.import_schedule(SCHEDULE_CSV)
+
+        self.assertFalse(Flight.objects.exists())
+
+
+class GenerateDatasetCommandTest(TestCase):
+    def generate(self, **options):
+        sizes = {
+            "cities": 10,
+            "airplanes": 3,
+            "routes": 20,
+            "flights": 30,
+            "crew_members": 8,
+            "users": 5,
+            "orders": 60,
+        }
+        sizes.update(options)
+        call_command("generate_dataset", stdout=StringIO(), **sizes)
+
+    def test_generate_dataset(self):
+        self.generate()
+
+        self.assertEqual(City.objects.count(), 10)
+        self.assertEqual(Route.objects.count(), 20)
+        self.assertEqual(Flight.objects.count(), 30)
+        self.assertGreaterEqual(Ticket.objects.count(), 60)
+        self.assertFalse(
+            Flight.objects.annotate(tickets_count=Count("tickets"))
+            .exclude(seats_sold=F("tickets_count"))
+            .exists()
+        )
+        self.assertFalse(
+            Flight.objects.filter(departure_time__gt=F("arrival_time")).exists()
+        )
+
+    def test_generate_dataset_is_reproducible(self):
+        self.generate(seed=7)
+        first = list(Route.objects.values_list("distance", flat=True))
+
+        self.generate(seed=7, flush=True)
+
+        self.assertEqual(list(Route.objects.values_list("distance", flat=True)), first)
+
+    def test_generate_dataset_skips_orders_of_full_flights(self):
+        self.generate(flights=1, orders=400)
+        flight = Flight.objects.select_related("airplane").get()
+
+        self.assertEqual(flight.seats_sold, flight.airplane.capacity)
+        self.assertLess(Order.objects.count(), 400)
+        self.assertFalse(Order.objects.filter(tickets=None).exists())
+
+    def test_generate_dataset_flush_replaces_orders(self):
+        self.generate()
+
+        self.generate(flush=True)
+
+        self.assertEqual(Flight.objects.count(), 30)
+        self.assertFalse(Order.objects.filter(tickets=None).exists())
+        self.assertFalse(
+            Flight.objects.annotate(tickets_count=Count("tickets"))
+            .exclude(seats_sold=F("tickets_count"))
+            .exists()
+        )
+
+    def test_generate_dataset_flush_sends_no_delete_signals(self):
+        self.generate()
+        deleted = []
+
+        def record(sender, **kwargs):
+            deleted.append(sender)
+
+        post_delete.connect(record)
+        try:
+            self.generate(flush=True)
+        finally:
+            post_delete.disconnect(record)
+
+        self.assertEqual(deleted, [])
+        self.assertEqual(Flight.objects.count(), 30)
+
+    def test_generate_dataset_refuses_existing_data(self):
+        sample_city()
+
+        with self.assertRaises(CommandError):
+            self.generate()
+
+
+class BenchmarkApiCommandTest(TestCase):
+    def setUp(self):
+        flight = sample_flight()
+        sample_ticket(flight=flight)
+
+    def test_benchmark_writes_results(self):
+        with tempfile.NamedTemporaryFile(suffix=".json") as output:
+            call_command(
+                "benchmark_api",
+                iterations=2,
+                warmup=0,
+                scenario=["flights.retrieve", "orders.create.50"],
+                output=output.name,
+                stdout=StringIO(),
+            )
+            results = json.load(output)
+
+        self.assertEqual(
+            set(results["scenarios"]), {"flights.retrieve", "orders.create.50"}
+        )
+        self.assertGreater(results["scenarios"]["flights.retrieve"]["queries"], 0)
+        # Orders created by the benchmark are rolled back.
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_compare_flags_regressions(self):
+        metrics = {"p50_ms": 10, "p95_ms": 12, "queries": 4, "peak_kib": 100}
+        baseline = {"scenarios": {"flights.list": metrics}}
+        current = {"scenarios": {"flights.list": {**metrics, "queries": 5}}}
+
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for name, results in (("baseline", baseline), ("current", current)):
+                paths.append(f"{directory}/{name}.json")
+                with open(paths[-1], "w") as file:
+                    json.dump(results, file)
+
+            call_command("benchmark_api", compare=paths[:1] * 2, stdout=StringIO())
+            with self.assertRaisesMessage(CommandError, "1 regression(s)"):
+                call_command("benchmark_api", compare=paths, stdout=StringIO())
+
+
+class LoadTestCommandTest(LiveServerTestCase):
+    def test_load_test_writes_results(self):
+        sample_route()
+        url = f"{self.live_server_url}{reverse('airport:route-list')}"
+
+        with throttling_disabled(), tempfile.NamedTemporaryFile(
+            suffix=".json"
+        ) as output:
+            call_command(
+                "load_test",
+                url,
+                concurrency=2,
+                duration=0.5,
+                output=output.name,
+                stdout=StringIO(),
+            )
+            results = json.load(output)
+
+        self.assertGreater(results["requests"], 0)
+        self.assertEqual(set(results["statuses"]), {"200"})
+
+    def test_load_test_rejects_bad_url(self):
+        with self.assertRaisesMessage(CommandError, "is not an http(s) URL"):
+            call_command("load_test", "localhost:8000", stdout=StringIO())
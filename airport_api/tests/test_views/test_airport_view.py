@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
@@ -13,6 +14,7 @@ from airport_api.serializers import (
 from airport_api.tests.factories import sample_city, sample_airport
 
 AIRPORT_URL = reverse("airport:airport-list")
+AUTOCOMPLETE_URL = reverse("airport:airport-autocomplete")
 
 
 def detail_url(airport_id: int):
@@ -95,3 +97,80 @@ class AdminAirportAPITest(TestCase):
 
         response = self.client.get(detail_url(self.uk_airport.id))
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AirportAutocompleteAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+        self.kyiv = sample_city(name="Kyïv", country="Ukraine")
+        self.new_york = sample_city(name="New York", country="USA")
+
+        self.boryspil = sample_airport(name="Boryspil", city=self.kyiv)
+        self.zhuliany = sample_airport(name="Zhuliany", city=self.kyiv)
+        self.jfk = sample_airport(name="John F. Kennedy", city=self.new_york)
+
+    def autocomplete(self, query, **params):
+        response = self.client.get(AUTOCOMPLETE_URL, {"q": query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_autocomplete_by_airport_name(self):
+        data = self.autocomplete("bory")
+
+        self.assertEqual(
+            data,
+            [
+                {
+                    "id": self.boryspil.id,
+                    "name": "Boryspil",
+                    "city": "Kyïv",
+                    "country": "Ukraine",
+                    "matched": "airport",
+                }
+            ],
+        )
+
+    def test_autocomplete_by_city_ignores_case_and_accents(self):
+        data = self.autocomplete("KYI")
+
+        self.assertCountEqual(
+            [item["id"] for item in data],
+            [self.boryspil.id, self.zhuliany.id],
+        )
+
+    def test_autocomplete_by_inner_word(self):
+        data = self.autocomplete("york")
+
+        self.assertEqual([item["id"] for item in data], [self.jfk.id])
+        self.assertEqual(data[0]["matched"], "city")
+
+    def test_autocomplete_ranks_airport_names_first(self):
+        usa_airport = sample_airport(name="Ukraine International", city=self.new_york)
+
+        data = self.autocomplete("ukr", limit=2)
+
+        self.assertEqual(len(data), 2)
+        self.assertEqual(data[0]["id"], usa_airport.id)
+        self.assertEqual(data[1]["matched"], "country")
+
+    def test_autocomplete_without_queries(self):
+        self.autocomplete("bor")
+
+        with self.assertNumQueries(0):
+            self.autocomplete("zhu")
+
+    def test_autocomplete_follows_changes(self):
+        self.autocomplete("bor")
+
+        self.boryspil.name = "Kyiv International"
+        self.boryspil.save()
+
+        self.assertEqual(self.autocomplete("bor"), [])
+        self.assertEqual(self.autocomplete("kyiv i")[0]["id"], self.boryspil.id)
+
+    def test_autocomplete_requires_query(self):
+        response = self.client.get(AUTOCOMPLETE_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
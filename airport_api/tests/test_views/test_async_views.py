@@ -0,0 +1,128 @@
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from airport_api.tests.test_views.test_metrics_view import scrape
+from airport_api.tests.test_views.test_performance_middleware import server_timing
+from airport_api.tests.factories import (
+    sample_city,
+    sample_airport,
+    sample_route,
+    sample_flight,
+    sample_crew_member,
+)
+
+AIRPORT_URL = reverse("airport:airport-list")
+ROUTE_URL = reverse("airport:route-list")
+FLIGHT_URL = reverse("airport:flight-list")
+
+
+def detail_url(flight_id):
+    return reverse("airport:flight-detail", args=[flight_id])
+
+
+class ASGITest(TestCase):
+    """
+    Requests the endpoints through Django's ASGI handler, as uvicorn
+    workers serve them, and compares the answers of the async views
+    with the WSGI ones of the sync viewsets.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            email="admin@test.com", password="test123admin", is_staff=True
+        )
+
+        kyiv = sample_airport(name="Boryspil", city=sample_city(name="Kyiv"))
+        lviv = sample_airport(name="Danylo Halytskyi", city=sample_city(name="Lviv"))
+        self.flight = sample_flight(route=sample_route(source=kyiv, destination=lviv))
+        self.flight.crew.add(sample_crew_member(first_name="Anna"))
+
+    def async_get(self, url, params=None, **headers):
+        return async_to_sync(self.async_client.get)(url, params, headers=headers)
+
+    def assertSameResponse(self, url, params=None):
+        async_response = self.async_get(url, params)
+        cache.clear()
+        sync_response = self.client.get(url, params)
+
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(async_response.json(), sync_response.json())
+        self.assertEqual(async_response.get("ETag"), sync_response.get("ETag"))
+
+    def test_reads(self):
+        for url, params in (
+            (FLIGHT_URL, None),
+            (FLIGHT_URL, {"expand": "route,crew"}),
+            (FLIGHT_URL, {"fields": "id,available_seats"}),
+            (FLIGHT_URL, {"pagination": "cursor"}),
+            (FLIGHT_URL, {"page": "last"}),
+            (FLIGHT_URL, {"page": 2}),
+            (FLIGHT_URL, {"departure_time_after": "tomorrow"}),
+            (detail_url(self.flight.id), None),
+            (detail_url(self.flight.id + 1), None),
+            (detail_url("UA"), None),
+            (ROUTE_URL, {"search": "kyiv"}),
+            (ROUTE_URL, {"limit": 1, "offset": 1}),
+            (AIRPORT_URL, None),
+            (AIRPORT_URL, {"offset": 10}),
+        ):
+            with self.subTest(url=url, params=params):
+                self.assertSameResponse(url, params)
+
+    def test_reads_are_served_by_async_views(self):
+        for url in (FLIGHT_URL, detail_url(self.flight.id), ROUTE_URL, AIRPORT_URL):
+            with self.subTest(url=url):
+                view = self.async_get(url).resolver_match.func
+                self.assertTrue(iscoroutinefunction(view))
+                self.assertFalse(
+                    iscoroutinefunction(self.client.get(url).resolver_match.func)
+                )
+
+    def test_not_modified(self):
+        for url in (FLIGHT_URL, detail_url(self.flight.id), ROUTE_URL):
+            with self.subTest(url=url):
+                etag = self.async_get(url)["ETag"]
+                cache.clear()
+
+                response = self.async_get(url, **{"If-None-Match": etag})
+
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_cached_response(self):
+        self.async_get(ROUTE_URL)
+
+        with self.assertNumQueries(0):
+            response = self.async_get(ROUTE_URL)
+
+        self.assertEqual(response["X-Cache"], "HIT")
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=1)
+    def test_middleware_measures_async_views(self):
+        sample = 'http_request_queries_total{view="FlightViewSet",action="list"}'
+        before = scrape(self.client).get(sample, 0)
+
+        response = self.async_get(FLIGHT_URL)
+
+        self.assertRegex(
+            server_timing(response)["db"]["desc"],
+            r'^"[1-9]\d* queries \d+ duplicates"$',
+        )
+        self.assertGreater(scrape(self.client)[sample], before)
+
+    def test_writes(self):
+        flight = sample_flight(as_dict=True, flight_number="UA200")
+        token = AccessToken.for_user(self.admin)
+
+        response = async_to_sync(self.async_client.post)(
+            FLIGHT_URL, flight, headers={"Authorization": f"Bearer {token}"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
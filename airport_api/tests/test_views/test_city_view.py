@@ -1,14 +1,25 @@
+from unittest import skipUnless
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from airport_api.apps import restore_search_triggers
 from airport_api.models import City
+from airport_api.search import (
+    SEARCH_COLUMNS,
+    sqlite_has_fts5_trigram,
+    sqlite_search_triggers,
+)
 from airport_api.serializers import CitySerializer
 from airport_api.tests.factories import sample_city
 
 CITY_URL = reverse("airport:city-list")
+RESPONSE_CACHE_STATS_URL = reverse("airport:response-cache-stats")
 
 
 class AdminCityAPITest(TestCase):
@@ -30,6 +41,37 @@ class AdminCityAPITest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["results"], serializer.data)
 
+    def test_search_cities(self):
+        sample_city(name="Lviv", country="Poland")
+
+        response = self.client.get(CITY_URL, {"search": "lv"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 2)
+
+    def test_search_matches_substrings(self):
+        sample_city(name="Ivano-Frankivsk", country="Ukraine")
+
+        response = self.client.get(CITY_URL, {"search": "ankiv"})
+        phrase_response = self.client.get(CITY_URL, {"search": "no-fr"})
+
+        self.assertEqual(
+            [city["name"] for city in response.data["results"]], ["Ivano-Frankivsk"]
+        )
+        self.assertEqual(phrase_response.data["count"], 1)
+
+    def test_search_follows_renamed_city(self):
+        self.city_2.name = "Kharkiv"
+        self.city_2.save()
+
+        response = self.client.get(CITY_URL, {"search": "khar"})
+        old_name_response = self.client.get(CITY_URL, {"search": "kyiv"})
+
+        self.assertEqual(
+            [city["id"] for city in response.data["results"]], [self.city_2.id]
+        )
+        self.assertEqual(old_name_response.data["count"], 0)
+
     def test_city_create(self):
         payload = sample_city(as_dict=True)
         response = self.client.post(CITY_URL, payload)
@@ -38,3 +80,103 @@ class AdminCityAPITest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         for field in payload:
             self.assertEqual(getattr(city, field), payload[field])
+
+
+@skipUnless(
+    connection.vendor == "sqlite" and sqlite_has_fts5_trigram(),
+    "FTS5 search tables only exist on SQLite",
+)
+class SQLiteSearchTriggersTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def trigger_names(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            return {name for (name,) in cursor.fetchall()}
+
+    def test_triggers_exist_after_migrate(self):
+        expected = {
+            name
+            for table in SEARCH_COLUMNS
+            for name, _ in sqlite_search_triggers(table)
+        }
+
+        self.assertLessEqual(expected, self.trigger_names())
+
+    def test_post_migrate_restores_dropped_triggers(self):
+        with connection.cursor() as cursor:
+            for name, _ in sqlite_search_triggers("airport_api_city"):
+                cursor.execute(f"DROP TRIGGER {name}")
+        sample_city(name="Ivano-Frankivsk")
+
+        restore_search_triggers(using=connection.alias)
+        response = self.client.get(CITY_URL, {"search": "frank"})
+
+        self.assertIn("airport_api_city_fts_update", self.trigger_names())
+        self.assertEqual(response.data["count"], 1)
+
+
+class CityResponseCacheTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+        self.city = sample_city(name="Lviv")
+
+    def test_city_list_is_cached(self):
+        first_response = self.client.get(CITY_URL)
+
+        with self.assertNumQueries(0):
+            second_response = self.client.get(CITY_URL)
+
+        self.assertEqual(first_response["X-Cache"], "MISS")
+        self.assertEqual(second_response["X-Cache"], "HIT")
+        self.assertEqual(second_response.data, first_response.data)
+
+    def test_query_params_are_normalized(self):
+        self.client.get(CITY_URL, {"limit": 1, "offset": 0})
+
+        response = self.client.get(f"{CITY_URL}?offset=0&limit=1")
+
+        self.assertEqual(response["X-Cache"], "HIT")
+
+    def test_city_write_invalidates_cache(self):
+        self.client.get(CITY_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sample_city(name="Kyiv")
+        response = self.client.get(CITY_URL)
+
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["count"], 2)
+
+    def test_response_cache_stats(self):
+        self.client.get(CITY_URL)
+        self.client.get(CITY_URL)
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="admin@test.com", password="test123user", is_staff=True
+            )
+        )
+
+        response = self.client.get(RESPONSE_CACHE_STATS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["CityViewSet"],
+            {"hits": 1, "misses": 1, "hit_ratio": 0.5},
+        )
+
+    def test_response_cache_stats_admin_only(self):
+        response = self.client.get(RESPONSE_CACHE_STATS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_city_list_not_modified(self):
+        etag = self.client.get(CITY_URL)["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(CITY_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
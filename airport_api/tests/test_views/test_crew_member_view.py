@@ -13,6 +13,7 @@ from airport_api.serializers import (
 from airport_api.tests.factories import sample_role, sample_crew_member
 
 CREW_MEMBER_URL = reverse("airport:crewmember-list")
+CREW_MEMBER_BULK_URL = reverse("airport:crewmember-bulk")
 
 
 def detail_url(crew_member_id: int):
@@ -73,6 +74,30 @@ class AdminCrewMemberAPITest(TestCase):
         self.assertIn(serializer_1.data, response.data["results"])
         self.assertNotIn(serializer_2.data, response.data["results"])
 
+    def test_search_crew_members(self):
+        sample_crew_member(
+            first_name="Antonina",
+            last_name="Steward",
+            role=self.role_2,
+        )
+
+        response = self.client.get(CREW_MEMBER_URL, {"search": "stew"})
+        names = [member["last_name"] for member in response.data["results"]]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCountEqual(names, ["Antonenko", "Steward"])
+
+    def test_search_crew_members_ranks_best_match_first(self):
+        best_match = sample_crew_member(
+            first_name="Steve",
+            last_name="Stevens",
+            role=self.role_1,
+        )
+
+        response = self.client.get(CREW_MEMBER_URL, {"search": "ste"})
+
+        self.assertEqual(response.data["results"][0]["id"], best_match.id)
+
     def test_crew_member_create(self):
         payload = sample_crew_member(as_dict=True)
         response = self.client.post(CREW_MEMBER_URL, payload)
@@ -120,3 +145,35 @@ class AdminCrewMemberAPITest(TestCase):
 
         response = self.client.get(detail_url(self.crew_member_1.id))
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CrewMemberBulkAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="admin@test.com", password="test123admin", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.role = sample_role()
+
+    def test_bulk_create_and_update_crew_members(self):
+        payload = [
+            {"first_name": "Ivan", "last_name": "Petrenko", "role": self.role.id},
+            {"first_name": "Olena", "last_name": "Shevchenko", "role": self.role.id},
+        ]
+
+        response = self.client.post(CREW_MEMBER_BULK_URL, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        ids = [member["id"] for member in response.data]
+
+        response = self.client.patch(
+            CREW_MEMBER_BULK_URL,
+            [{"id": ids[0], "last_name": "Bondar"}, {"id": ids[1], "role": 999}],
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("role", response.data[1])
+        self.assertEqual(CrewMember.objects.get(id=ids[0]).last_name, "Petrenko")
@@ -0,0 +1,133 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from airport_api.models import Order
+from airport_api.tests.factories import sample_flight, sample_order, sample_ticket
+
+FLIGHT_EXPORT_URL = reverse("airport:export-flights")
+TICKET_EXPORT_URL = reverse("airport:export-tickets")
+ORDER_EXPORT_URL = reverse("airport:export-orders")
+
+
+def read_stream(response):
+    return b"".join(response.streaming_content).decode()
+
+
+async def aread_stream(response):
+    return b"".join([chunk async for chunk in response.streaming_content]).decode()
+
+
+class UnauthenticatedExportAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        response = self.client.get(FLIGHT_EXPORT_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AuthenticatedExportAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com",
+            password="1qazcde3",
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_export_forbidden(self):
+        for url in (FLIGHT_EXPORT_URL, TICKET_EXPORT_URL, ORDER_EXPORT_URL):
+            response = self.client.get(url)
+
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class AdminExportAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            email="admin@example.com",
+            password="1qazcde3",
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+        self.other_flight = sample_flight(flight_number="PS101")
+
+    def test_export_flights_ndjson(self):
+        response = self.client.get(FLIGHT_EXPORT_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertIn('filename="flights.ndjson"', response["Content-Disposition"])
+
+        rows = [json.loads(line) for line in read_stream(response).splitlines()]
+        self.assertEqual(
+            [row["flight_number"] for row in rows],
+            [self.flight.flight_number, self.other_flight.flight_number],
+        )
+        self.assertEqual(rows[0]["capacity"], self.flight.airplane.capacity)
+        self.assertEqual(rows[0]["source"], self.flight.route.source.name)
+
+    def test_export_tickets_csv(self):
+        ticket = sample_ticket(flight=self.flight)
+
+        response = self.client.get(TICKET_EXPORT_URL, {"output": "csv"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv")
+
+        rows = list(csv.DictReader(io.StringIO(read_stream(response))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["id"], str(ticket.id))
+        self.assertEqual(rows[0]["order_id"], str(ticket.order_id))
+        self.assertEqual(rows[0]["user_id"], str(ticket.order.user_id))
+        self.assertEqual(rows[0]["flight_number"], self.flight.flight_number)
+
+    def test_export_orders_updated_after(self):
+        old_order = sample_order()
+        Order.objects.filter(id=old_order.id).update(
+            updated_at=timezone.now() - timedelta(days=1)
+        )
+        since = timezone.now() - timedelta(hours=1)
+        new_order = sample_order()
+
+        response = self.client.get(
+            ORDER_EXPORT_URL, {"updated_after": since.isoformat()}
+        )
+
+        rows = [json.loads(line) for line in read_stream(response).splitlines()]
+        self.assertEqual([row["id"] for row in rows], [new_order.id])
+
+    def test_export_invalid_output(self):
+        response = self.client.get(FLIGHT_EXPORT_URL, {"output": "xml"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_through_asgi(self):
+        token = AccessToken.for_user(self.user)
+
+        response = async_to_sync(self.async_client.get)(
+            FLIGHT_EXPORT_URL, {"output": "csv"}, AUTHORIZATION=f"Bearer {token}"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.is_async)
+        content = async_to_sync(aread_stream)(response)
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(
+            [row["flight_number"] for row in rows],
+            [self.flight.flight_number, self.other_flight.flight_number],
+        )
@@ -1,13 +1,19 @@
-from datetime import datetime
+import base64
+from datetime import datetime, time, timedelta
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.db.models import F, Count
+from django.test.utils import CaptureQueriesContext
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from airport_api.models import Flight
+from airport_api.itineraries import flight_graph
+from airport_api.models import Airplane, Flight
 from airport_api.serializers import (
     FlightSerializer,
     FlightListSerializer,
@@ -19,15 +25,23 @@ from airport_api.tests.factories import (
     sample_flight,
     sample_route,
     sample_airplane,
+    sample_ticket,
+    sample_crew_member,
 )
 
 FLIGHT_URL = reverse("airport:flight-list")
+FLIGHT_BULK_URL = reverse("airport:flight-bulk")
+ITINERARY_URL = reverse("airport:flight-itineraries")
 
 
 def detail_url(flight_id: int):
     return reverse("airport:flight-detail", args=[flight_id])
 
 
+def seats_url(flight_id: int):
+    return reverse("airport:flight-seats", args=[flight_id])
+
+
 class AdminFlightAPITest(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -96,6 +110,22 @@ class AdminFlightAPITest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["results"], serializer.data)
 
+    def test_flight_list_cursor_pagination(self):
+        response = self.client.get(
+            FLIGHT_URL,
+            {"pagination": "cursor", "page_size": 1},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", response.data)
+        self.assertEqual(response.data["results"], [self.expected_data_1])
+
+        response = self.client.get(response.data["next"])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [self.expected_data_2])
+        self.assertIsNone(response.data["next"])
+
     def test_filter_flights_by_departure_time_after(self):
         response = self.client.get(
             FLIGHT_URL,
@@ -227,3 +257,520 @@ class AdminFlightAPITest(TestCase):
 
         response = self.client.get(detail_url(self.flight_1.id))
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class FlightItineraryAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        flight_graph.invalidate()
+        # The graph only holds flights that haven't departed yet.
+        self.day = timezone.localdate() + timedelta(days=1)
+
+        airport_lviv = sample_airport(city=sample_city(name="Lviv"))
+        airport_kyiv = sample_airport(city=sample_city(name="Kyiv"))
+        airport_odesa = sample_airport(city=sample_city(name="Odesa"))
+
+        self.first_leg = sample_flight(
+            flight_number="LK100",
+            route=sample_route(
+                source=airport_lviv,
+                destination=airport_kyiv,
+                distance=500,
+            ),
+            departure_time=self.at(8),
+            arrival_time=self.at(10),
+        )
+        self.second_leg = sample_flight(
+            flight_number="KO100",
+            route=sample_route(
+                source=airport_kyiv,
+                destination=airport_odesa,
+                distance=450,
+            ),
+            departure_time=self.at(11),
+            arrival_time=self.at(13),
+        )
+        self.direct = sample_flight(
+            flight_number="LO100",
+            route=sample_route(
+                source=airport_lviv,
+                destination=airport_odesa,
+                distance=800,
+            ),
+            departure_time=self.at(9),
+            arrival_time=self.at(15),
+        )
+
+    def at(self, hour):
+        return timezone.make_aware(datetime.combine(self.day, time(hour)))
+
+    def search(self, **params):
+        defaults = {
+            "source_city": "Lviv",
+            "destination_city": "Odesa",
+            "departure_date": self.day.isoformat(),
+        }
+        defaults.update(params)
+        return self.client.get(ITINERARY_URL, defaults)
+
+    @staticmethod
+    def flight_ids(itinerary):
+        return [leg["id"] for leg in itinerary["legs"]]
+
+    def test_itineraries_sorted_by_duration(self):
+        response = self.search()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [self.flight_ids(itinerary) for itinerary in response.data],
+            [[self.first_leg.id, self.second_leg.id], [self.direct.id]],
+        )
+        self.assertEqual(response.data[0]["connections"], 1)
+        self.assertEqual(response.data[0]["duration"], 300)
+
+    def test_itineraries_sorted_by_distance(self):
+        response = self.search(sort="distance")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.flight_ids(response.data[0]), [self.direct.id])
+
+    def test_itineraries_respect_min_connection(self):
+        response = self.search(min_connection=90)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [self.flight_ids(itinerary) for itinerary in response.data],
+            [[self.direct.id]],
+        )
+
+    def test_itineraries_respect_max_legs(self):
+        response = self.search(max_legs=1)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+    def test_itineraries_follow_flight_changes(self):
+        self.search()
+
+        self.direct.delete()
+        response = self.search()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [self.flight_ids(itinerary) for itinerary in response.data],
+            [[self.first_leg.id, self.second_leg.id]],
+        )
+
+    def test_itineraries_skip_departed_and_canceled_flights(self):
+        Flight.objects.filter(pk=self.direct.pk).update(status=Flight.Status.CANCELED)
+        Flight.objects.filter(pk=self.second_leg.pk).update(
+            departure_time=timezone.now() - timedelta(hours=1)
+        )
+        flight_graph.invalidate()
+
+        response = self.search()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+    def test_itineraries_follow_flight_updates_after_commit(self):
+        self.search()
+
+        self.direct.status = 3
+        with self.captureOnCommitCallbacks(execute=True):
+            self.direct.save()
+        response = self.search()
+
+        self.assertEqual(
+            [self.flight_ids(itinerary) for itinerary in response.data],
+            [[self.first_leg.id, self.second_leg.id]],
+        )
+
+    def test_itineraries_search_is_bounded(self):
+        flight_graph.max_expansions = 2
+        try:
+            response = self.search()
+        finally:
+            flight_graph.max_expansions = None
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [self.flight_ids(itinerary) for itinerary in response.data],
+            [[self.first_leg.id, self.second_leg.id]],
+        )
+
+    def test_itineraries_same_source_and_destination(self):
+        response = self.search(destination_city="Lviv")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FlightSeatMapAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+        self.flight = sample_flight(
+            flight_number="SM100",
+            airplane=sample_airplane(rows=3, seats_in_row=4),
+        )
+        sample_ticket(flight=self.flight, row=1, seat=1)
+        sample_ticket(flight=self.flight, row=3, seat=4)
+
+    def test_seat_map(self):
+        response = self.client.get(seats_url(self.flight.id))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["taken"], 2)
+        self.assertEqual(
+            base64.b64decode(response.data["bitmap"]),
+            bytes([0b10000000, 0b00010000]),
+        )
+        self.assertEqual(
+            response.data["seats"],
+            [
+                [True, False, False, False],
+                [False, False, False, False],
+                [False, False, False, True],
+            ],
+        )
+
+    def test_seat_map_is_cached(self):
+        self.client.get(seats_url(self.flight.id))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(seats_url(self.flight.id))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_seat_map_invalidated_by_order(self):
+        user = get_user_model().objects.create_user(
+            email="user@test.com", password="test123user"
+        )
+        self.client.get(seats_url(self.flight.id))
+
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("airport:order-list"),
+                {
+                    "tickets": [
+                        {
+                            "row": 2,
+                            "seat": 2,
+                            "passenger_first_name": "John",
+                            "passenger_last_name": "Doe",
+                            "flight": self.flight.id,
+                        }
+                    ]
+                },
+                format="json",
+            )
+        response = self.client.get(seats_url(self.flight.id))
+
+        self.assertEqual(response.data["taken"], 3)
+        self.assertTrue(response.data["seats"][1][1])
+
+    def test_seat_map_cached_under_flight_id(self):
+        zero_padded_url = seats_url(self.flight.id).replace(
+            f"/{self.flight.id}/", f"/0{self.flight.id}/"
+        )
+        self.client.get(zero_padded_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sample_ticket(flight=self.flight, row=2, seat=3)
+        response = self.client.get(zero_padded_url)
+
+        self.assertEqual(response.data["taken"], 3)
+
+    def test_seat_map_skips_seats_outside_smaller_airplane(self):
+        Airplane.objects.filter(pk=self.flight.airplane_id).update(
+            rows=2, seats_in_row=3
+        )
+
+        with self.assertLogs("airport_api.seat_map", "WARNING"):
+            response = self.client.get(seats_url(self.flight.id))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["taken"], 1)
+        self.assertEqual(
+            response.data["seats"],
+            [[True, False, False], [False, False, False]],
+        )
+
+    def test_seat_map_of_invalid_flight_id(self):
+        response = self.client.get(
+            seats_url(self.flight.id).replace(f"/{self.flight.id}/", "/abc/")
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_seat_map_of_missing_flight(self):
+        response = self.client.get(seats_url(self.flight.id + 100))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class FlightConditionalGetTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+        self.flight = sample_flight(flight_number="CG100")
+        self.crew_member = sample_crew_member()
+        self.flight.crew.add(self.crew_member)
+
+    def get_etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response["ETag"]
+
+    def test_flight_list_not_modified(self):
+        etag = self.get_etag(FLIGHT_URL)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(FLIGHT_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertFalse(response.content)
+
+    def test_plain_request_reuses_etag(self):
+        etag = self.get_etag(FLIGHT_URL)
+
+        with self.assertNumQueries(3):
+            # Count, page and crew, the ETag comes from the cache.
+            response = self.client.get(FLIGHT_URL)
+
+        self.assertEqual(response["ETag"], etag)
+
+    def test_flight_list_etag_follows_filters(self):
+        etag = self.get_etag(FLIGHT_URL)
+
+        response = self.client.get(
+            FLIGHT_URL,
+            {"source_city": "Nowhere"},
+            HTTP_IF_NONE_MATCH=etag,
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_flight_change_modifies_list(self):
+        etag = self.get_etag(FLIGHT_URL)
+
+        self.flight.status = 2
+        self.flight.save()
+        response = self.client.get(FLIGHT_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_ticket_sale_modifies_list(self):
+        etag = self.get_etag(FLIGHT_URL)
+
+        sample_ticket(flight=self.flight)
+        response = self.client.get(FLIGHT_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_related_city_change_modifies_list(self):
+        etag = self.get_etag(FLIGHT_URL)
+
+        city = self.flight.route.source.city
+        city.name = "Renamed"
+        city.save()
+        response = self.client.get(FLIGHT_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_crew_change_modifies_retrieve(self):
+        etag = self.get_etag(detail_url(self.flight.id))
+
+        self.crew_member.delete()
+        response = self.client.get(
+            detail_url(self.flight.id),
+            HTTP_IF_NONE_MATCH=etag,
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["crew"], [])
+
+    def test_flight_retrieve_if_modified_since(self):
+        response = self.client.get(detail_url(self.flight.id))
+
+        response = self.client.get(
+            detail_url(self.flight.id),
+            HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class FlightSparseFieldsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+        self.flight = sample_flight(flight_number="SF100")
+        self.flight.crew.add(sample_crew_member())
+
+    def test_fields_trim_output(self):
+        response = self.client.get(FLIGHT_URL, {"fields": "id,departure_time"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(response.data["results"][0]),
+            {"id", "departure_time"},
+        )
+
+    def test_fields_skip_unneeded_queries(self):
+        with self.assertNumQueries(3):
+            # ETag, count and page, the crew prefetch is skipped.
+            self.client.get(FLIGHT_URL, {"fields": "id,flight_number"})
+
+        with self.assertNumQueries(4):
+            self.client.get(FLIGHT_URL)
+
+    def test_list_reads_search_entries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(FLIGHT_URL)
+        page_query = next(query["sql"] for query in queries if "LIMIT" in query["sql"])
+
+        self.assertEqual(response.data["results"][0]["id"], self.flight.id)
+        self.assertIn('FROM "airport_api_flightsearchentry"', page_query)
+        self.assertNotIn("JOIN", page_query)
+
+    def test_expand_nests_related_data(self):
+        response = self.client.get(FLIGHT_URL, {"expand": "route,crew"})
+        flight = response.data["results"][0]
+
+        self.assertEqual(flight["route"]["id"], self.flight.route.id)
+        self.assertEqual(flight["crew"][0]["role"], "Pilot")
+        self.assertEqual(flight["airplane"], self.flight.airplane.model_name)
+
+    def test_fields_on_retrieve(self):
+        response = self.client.get(
+            detail_url(self.flight.id),
+            {"fields": "id,airplane", "expand": "airplane"},
+        )
+
+        self.assertEqual(set(response.data), {"id", "airplane"})
+        self.assertEqual(response.data["airplane"]["airplane_type"]["name"], "Light")
+
+
+class FlightBulkAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="admin@test.com", password="test123admin", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+
+        self.route = sample_route()
+        self.airplane = sample_airplane()
+        self.pilot = sample_crew_member()
+        self.steward = sample_crew_member(first_name="Olena")
+
+    def flight_payload(self, number, **params):
+        payload = {
+            "flight_number": f"BK{number:04d}",
+            "route": self.route.id,
+            "airplane": self.airplane.id,
+            "departure_time": "2025-06-01T10:00:00Z",
+            "arrival_time": "2025-06-01T12:00:00Z",
+            "crew": [self.pilot.id, self.steward.id],
+        }
+        payload.update(params)
+        return payload
+
+    def test_bulk_create_flights(self):
+        payload = [self.flight_payload(number) for number in range(3)]
+
+        response = self.client.post(FLIGHT_BULK_URL, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [flight["flight_number"] for flight in response.data],
+            ["BK0000", "BK0001", "BK0002"],
+        )
+        flight = Flight.objects.get(flight_number="BK0001")
+        self.assertEqual(response.data[1]["id"], flight.id)
+        self.assertEqual(
+            set(flight.crew.values_list("id", flat=True)),
+            {self.pilot.id, self.steward.id},
+        )
+
+    def test_bulk_create_queries_do_not_grow_with_items(self):
+        query_counts = []
+        for start, count in ((0, 2), (100, 20)):
+            payload = [
+                self.flight_payload(number)
+                for number in range(start, start + count)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(FLIGHT_BULK_URL, payload, format="json")
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_bulk_create_returns_per_item_errors(self):
+        sample_flight(flight_number="BK0001")
+        payload = [
+            self.flight_payload(0),
+            self.flight_payload(1),
+            self.flight_payload(0),
+            self.flight_payload(3, route=999),
+            self.flight_payload(
+                4,
+                departure_time="2025-06-01T13:00:00Z",
+            ),
+        ]
+
+        response = self.client.post(FLIGHT_BULK_URL, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.data
+        self.assertEqual(errors[0], {})
+        self.assertIn("already exists", errors[1]["flight_number"][0])
+        self.assertIn("item 0", errors[2]["flight_number"][0])
+        self.assertIn("route", errors[3])
+        self.assertIn("non_field_errors", errors[4])
+        self.assertFalse(Flight.objects.filter(flight_number="BK0000").exists())
+
+    def test_bulk_update_flights(self):
+        flights = [
+            sample_flight(flight_number=f"UP{number:04d}") for number in range(2)
+        ]
+        updated_at = flights[1].updated_at
+        payload = [
+            {"id": flights[0].id, "status": 3, "crew": [self.steward.id]},
+            {"id": flights[1].id, "flight_number": "UP9999"},
+        ]
+
+        response = self.client.patch(FLIGHT_BULK_URL, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        flights[0].refresh_from_db()
+        flights[1].refresh_from_db()
+        self.assertEqual(flights[0].status, 3)
+        self.assertEqual(list(flights[0].crew.all()), [self.steward])
+        self.assertEqual(flights[1].flight_number, "UP9999")
+        self.assertGreater(flights[1].updated_at, updated_at)
+
+    def test_bulk_update_unknown_id(self):
+        response = self.client.patch(
+            FLIGHT_BULK_URL, [{"id": 999, "status": 3}], format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("id", response.data[0])
+
+    def test_bulk_requires_admin(self):
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="user@test.com", password="test123user"
+            )
+        )
+
+        response = self.client.post(
+            FLIGHT_BULK_URL, [self.flight_payload(0)], format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
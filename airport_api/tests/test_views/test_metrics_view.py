@@ -0,0 +1,217 @@
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import Throttled
+from rest_framework.test import APIClient
+
+from airport_api.metrics import tickets_sold
+from airport_api.tests.factories import sample_flight, sample_ticket
+from core.metrics import exception_handler, record_pool_stats, registry
+
+METRICS_URL = reverse("metrics")
+ORDER_URL = reverse("airport:order-list")
+FLIGHT_URL = reverse("airport:flight-list")
+
+
+def scrape(client):
+    """
+    Returns {sample with labels: value} of the /metrics response.
+    """
+    response = client.get(METRICS_URL)
+    samples = {}
+    for line in response.content.decode().splitlines():
+        if line and not line.startswith("#"):
+            sample, value = line.rsplit(" ", 1)
+            samples[sample] = float(value)
+    return samples
+
+
+class MetricsAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com", password="test123user"
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+
+    def order(self, row, seat=1):
+        return self.client.post(
+            ORDER_URL,
+            {
+                "tickets": [
+                    {
+                        "row": row,
+                        "seat": seat,
+                        "passenger_first_name": "Anna",
+                        "passenger_last_name": "Bond",
+                        "flight": self.flight.id,
+                    }
+                ]
+            },
+            format="json",
+        )
+
+    def test_metrics_format(self):
+        response = self.client.get(METRICS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        content = response.content.decode()
+        for name in (
+            "http_request_duration_seconds",
+            "http_request_queries_total",
+            "http_requests_throttled_total",
+            "airport_cache_requests_total",
+            "airport_orders_total",
+            "airport_tickets_sold_total",
+        ):
+            self.assertIn(f"# TYPE {name} ", content)
+
+    def test_request_latency_and_queries(self):
+        labels = 'view="FlightViewSet",action="list"'
+        before = scrape(self.client)
+
+        self.client.get(FLIGHT_URL)
+        after = scrape(self.client)
+
+        count = f'http_request_duration_seconds_count{{{labels},status="200"}}'
+        bucket = (
+            "http_request_duration_seconds_bucket"
+            f'{{{labels},status="200",le="+Inf"}}'
+        )
+        queries = f"http_request_queries_total{{{labels}}}"
+        self.assertEqual(after[count] - before.get(count, 0), 1)
+        self.assertEqual(after[bucket], after[count])
+        self.assertGreater(after[queries], before.get(queries, 0))
+
+    def test_order_outcomes(self):
+        sample_ticket(row=1, seat=1, flight=self.flight)
+        before = scrape(self.client)
+
+        self.assertEqual(self.order(row=2).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.order(row=1).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.order(row=999).status_code, status.HTTP_400_BAD_REQUEST)
+        after = scrape(self.client)
+
+        for outcome in ("success", "seat_conflict", "validation_error"):
+            sample = f'airport_orders_total{{outcome="{outcome}"}}'
+            self.assertEqual(after[sample] - before.get(sample, 0), 1, outcome)
+        sold = "airport_tickets_sold_total"
+        self.assertEqual(after[sold] - before.get(sold, 0), 1)
+
+    def test_throttled_requests_are_counted(self):
+        sample = 'http_requests_throttled_total{view="FlightViewSet"}'
+        before = scrape(self.client)
+
+        response = exception_handler(
+            Throttled(wait=10), {"view": type("FlightViewSet", (), {})()}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(scrape(self.client)[sample] - before.get(sample, 0), 1)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_token(self):
+        self.assertEqual(
+            self.client.get(METRICS_URL).status_code, status.HTTP_403_FORBIDDEN
+        )
+        response = self.client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_metrics_of_worker_processes_are_added_up(self):
+        sold = "airport_tickets_sold_total"
+        before = scrape(self.client)[sold]
+
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(METRICS_DIR=directory):
+                # The parent process stands in for a live worker.
+                for pid in (os.getppid(), 2**22 + 1):
+                    write_worker_file(directory, pid, 1, [[sold, [], 5]])
+
+                self.assertEqual(scrape(self.client)[sold], before + 10)
+
+                registry.dirty = True
+                registry.flush()
+                self.assertTrue(
+                    os.path.exists(os.path.join(directory, registry.file_name))
+                )
+
+    def test_metrics_of_exited_workers_are_folded_into_the_archive(self):
+        sold = "airport_tickets_sold_total"
+        gauge = 'db_pool_requests_waiting{alias="gone"}'
+        before = scrape(self.client)[sold]
+        live = os.getppid()
+
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(METRICS_DIR=directory):
+                waiting = ["db_pool_requests_waiting", [["alias", "gone"]], 4]
+                write_worker_file(directory, 2**22 + 1, 1, [[sold, [], 5], waiting])
+                # An earlier process that had the pid of a live one.
+                write_worker_file(directory, live, 1, [[sold, [], 3]])
+                write_worker_file(directory, live, 2, [[sold, [], 2]])
+
+                first = scrape(self.client)
+                self.assertEqual(first[sold], before + 10)
+                self.assertNotIn(gauge, first)
+                self.assertEqual(
+                    sorted(os.listdir(directory)),
+                    sorted(["archive.json", "archive.lock", f"{live}-2.json"]),
+                )
+
+                # The reused pid's counters go on from zero without a dip.
+                write_worker_file(directory, live, 2, [[sold, [], 4]])
+                self.assertEqual(scrape(self.client)[sold], before + 12)
+
+    def test_metrics_file_is_folded_on_exit(self):
+        sold = "airport_tickets_sold_total"
+        tickets_sold.inc()
+        before = scrape(self.client)[sold]
+
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(METRICS_DIR=directory):
+                registry.dirty = True
+                registry.close()
+                try:
+                    self.assertEqual(os.listdir(directory).count(registry.file_name), 0)
+                    self.assertEqual(scrape(self.client)[sold], before * 2)
+                finally:
+                    registry.closed = False
+
+    def test_pool_stats(self):
+        before = scrape(self.client)
+
+        record_pool_stats(
+            "default",
+            {
+                "pool_size": 5,
+                "pool_available": 2,
+                "requests_waiting": 1,
+                "requests_queued": 3,
+                "requests_wait_ms": 1500,
+                "requests_errors": 1,
+            },
+        )
+        after = scrape(self.client)
+
+        self.assertEqual(
+            after['db_pool_connections{alias="default",state="in_use"}'], 3
+        )
+        self.assertEqual(after['db_pool_connections{alias="default",state="idle"}'], 2)
+        self.assertEqual(after['db_pool_requests_waiting{alias="default"}'], 1)
+        for sample, added in (
+            ('db_pool_waits_total{alias="default"}', 3),
+            ('db_pool_wait_seconds_total{alias="default"}', 1.5),
+            ('db_pool_timeouts_total{alias="default"}', 1),
+        ):
+            self.assertEqual(after[sample] - before.get(sample, 0), added)
+
+
+def write_worker_file(directory, pid, started, samples):
+    with open(os.path.join(directory, f"{pid}-{started}.json"), "w") as file:
+        json.dump({"pid": pid, "started": started, "samples": samples}, file)
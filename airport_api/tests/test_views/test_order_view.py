@@ -1,10 +1,14 @@
+from datetime import timedelta
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from airport_api.models import Order
+from airport_api.models import Flight, Order
 from airport_api.serializers import (
     OrderListSerializer,
     OrderRetrieveSerializer,
@@ -43,6 +47,42 @@ class AdminOrderAPITest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["results"], serializer.data)
 
+    def test_order_list_cursor_pagination(self):
+        older_order = sample_order(user=self.user)
+        Order.objects.filter(pk=older_order.pk).update(
+            created_at=self.order.created_at - timedelta(days=1)
+        )
+
+        response = self.client.get(
+            ORDER_URL,
+            {"pagination": "cursor", "page_size": 1},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", response.data)
+        self.assertEqual(response.data["results"][0]["id"], self.order.id)
+
+        response = self.client.get(response.data["next"])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["id"], older_order.id)
+        self.assertIsNone(response.data["next"])
+
+    def test_order_list_sparse_fields(self):
+        response = self.client.get(ORDER_URL, {"fields": "id,created_at"})
+
+        self.assertEqual(
+            set(response.data["results"][0]),
+            {"id", "created_at"},
+        )
+
+    def test_order_list_expand_tickets(self):
+        response = self.client.get(ORDER_URL, {"expand": "tickets"})
+        ticket = response.data["results"][0]["tickets"][0]
+
+        self.assertEqual(ticket["flight"], self.ticket_1.flight.flight_number)
+        self.assertIn("departure_time", ticket)
+
     def test_order_create(self):
         flight = sample_flight()
 
@@ -75,9 +115,89 @@ class AdminOrderAPITest(TestCase):
         self.assertEqual(order.user, self.user)
         self.assertEqual(order.tickets.count(), 2)
 
+        flight.refresh_from_db()
+        self.assertEqual(flight.seats_sold, flight.tickets.count())
+
     def test_order_retrieve(self):
         response = self.client.get(detail_url(self.order.id))
         serializer = OrderRetrieveSerializer(self.order)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, serializer.data)
+
+    def test_order_etag_ignores_sales_of_other_flights(self):
+        other_flight = sample_flight(flight_number="UA4321")
+        etags = {
+            url: self.client.get(url)["ETag"]
+            for url in (ORDER_URL, detail_url(self.order.id))
+        }
+
+        sample_ticket(flight=other_flight)
+
+        for url, etag in etags.items():
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_order_etag_changes_with_flights_of_its_tickets(self):
+        etag = self.client.get(detail_url(self.order.id))["ETag"]
+
+        Flight.objects.filter(pk=self.ticket_1.flight_id).update(
+            departure_time=self.ticket_1.flight.departure_time + timedelta(hours=1),
+            updated_at=self.ticket_1.flight.updated_at + timedelta(seconds=1),
+        )
+        response = self.client.get(detail_url(self.order.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def ticket_payload(self, flight, row, seat):
+        return {
+            "row": row,
+            "seat": seat,
+            "passenger_first_name": "John",
+            "passenger_last_name": "Doe",
+            "flight": flight.id,
+        }
+
+    def test_order_create_with_taken_seat(self):
+        payload = {"tickets": [self.ticket_payload(self.ticket_1.flight, 1, 1)]}
+        response = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["tickets"][0].code, "seat_taken")
+
+    def test_order_create_with_duplicate_seat(self):
+        flight = self.ticket_1.flight
+        payload = {
+            "tickets": [
+                self.ticket_payload(flight, 5, 5),
+                self.ticket_payload(flight, 5, 5),
+            ]
+        }
+        response = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["tickets"][0].code, "duplicate_seat")
+
+    def test_order_create_query_count_does_not_grow_with_tickets(self):
+        flight = self.ticket_1.flight
+
+        with CaptureQueriesContext(connection) as single_ticket_queries:
+            self.client.post(
+                ORDER_URL,
+                {"tickets": [self.ticket_payload(flight, 10, 10)]},
+                format="json",
+            )
+        with CaptureQueriesContext(connection) as group_queries:
+            response = self.client.post(
+                ORDER_URL,
+                {
+                    "tickets": [
+                        self.ticket_payload(flight, 9, seat) for seat in range(1, 10)
+                    ]
+                },
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(group_queries), len(single_ticket_queries))
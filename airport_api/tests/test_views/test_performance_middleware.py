@@ -0,0 +1,91 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport_api.tests.factories import sample_flight
+from core.middleware import RequestMetrics
+
+FLIGHT_URL = reverse("airport:flight-list")
+
+
+def server_timing(response):
+    metrics = {}
+    for metric in response["Server-Timing"].split(", "):
+        name, *params = metric.split(";")
+        metrics[name] = dict(param.split("=", 1) for param in params)
+    return metrics
+
+
+class PerformanceMiddlewareTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com", password="test123user"
+        )
+        self.client.force_authenticate(self.user)
+        sample_flight()
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=1)
+    def test_sampled_request_has_server_timing(self):
+        response = self.client.get(FLIGHT_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        metrics = server_timing(response)
+        self.assertEqual(set(metrics), {"total", "db", "serializer"})
+        self.assertRegex(metrics["db"]["desc"], r'^"[1-9]\d* queries \d+ duplicates"$')
+        self.assertGreater(float(metrics["serializer"]["dur"]), 0)
+        self.assertGreaterEqual(
+            float(metrics["total"]["dur"]), float(metrics["db"]["dur"])
+        )
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=1)
+    def test_sampled_request_is_logged(self):
+        with self.assertLogs("core.performance", "INFO") as logs:
+            response = self.client.get(FLIGHT_URL)
+
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logs.records[0].levelname, "INFO")
+        self.assertEqual(line["path"], FLIGHT_URL)
+        self.assertEqual(line["status"], status.HTTP_200_OK)
+        self.assertEqual(line["size"], len(response.content))
+        self.assertGreater(line["queries"], 0)
+        self.assertIn("duplicate_queries", line)
+        self.assertFalse(line["slow"])
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=0, PERFORMANCE_SLOW_REQUEST_MS=0)
+    def test_slow_request_is_logged_without_sampling(self):
+        with self.assertLogs("core.performance", "WARNING") as logs:
+            response = self.client.get(FLIGHT_URL)
+
+        self.assertNotIn("Server-Timing", response)
+        line = json.loads(logs.records[0].getMessage())
+        self.assertTrue(line["slow"])
+        self.assertNotIn("queries", line)
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=0)
+    def test_unsampled_request_is_not_measured(self):
+        with self.assertNoLogs("core.performance"):
+            response = self.client.get(FLIGHT_URL)
+
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=1)
+    def test_other_paths_are_not_measured(self):
+        response = self.client.get(reverse("admin:login"))
+
+        self.assertNotIn("Server-Timing", response)
+
+    def test_duplicate_queries(self):
+        def execute(sql, params, many, context):
+            return None
+
+        metrics = RequestMetrics()
+        for params in ((1,), (1,), (2,)):
+            metrics(execute, "SELECT %s", params, False, {})
+
+        self.assertEqual(metrics.query_count, 3)
+        self.assertEqual(metrics.duplicate_count, 1)
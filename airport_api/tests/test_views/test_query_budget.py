@@ -0,0 +1,460 @@
+import io
+import tempfile
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+
+from airport_api.autocomplete import airport_index
+from airport_api.dataset import DatasetGenerator
+from airport_api.itineraries import flight_graph
+from airport_api.models import (
+    AirplaneType,
+    Airport,
+    City,
+    CrewMember,
+    Flight,
+    Order,
+    Role,
+    Route,
+    SeatHold,
+    Ticket,
+)
+from airport_api.seat_holds import hold_seats
+from airport_api.tests.factories import (
+    sample_airport,
+    sample_route,
+    sample_airplane,
+    sample_flight,
+    sample_order,
+)
+from airport_api.urls import router
+
+SIZES = (1, 50)
+
+
+def url(name, *args):
+    return reverse(f"airport:{name}", args=args)
+
+
+def photo():
+    file = io.BytesIO()
+    Image.new("RGB", (10, 10)).save(file, "JPEG")
+    file.name = "photo.jpg"
+    file.seek(0)
+    return file
+
+
+def flight_payload(world, **params):
+    return {
+        "flight_number": "ZZ1",
+        "route": world.route.id,
+        "airplane": world.airplane.id,
+        "departure_time": "2030-01-01T10:00:00Z",
+        "arrival_time": "2030-01-01T12:00:00Z",
+        "status": 0,
+        "crew": [world.crew_member.id],
+        **params,
+    }
+
+
+def ticket_payload(world):
+    row, seat = world.free_seat
+    return {
+        "row": row,
+        "seat": seat,
+        "passenger_first_name": "Query",
+        "passenger_last_name": "Budget",
+        "flight": world.flight.id,
+    }
+
+
+# "METHOD url-name" of every router action -> (the most queries it may
+# run, function building (path, data) from the test world).
+# GET data is sent as query params, anything else as JSON.
+QUERY_BUDGETS = {
+    "GET city-list": (3, lambda w: (url("city-list"), None)),
+    "POST city-list": (
+        2,
+        lambda w: (url("city-list"), {"name": "Budgetville", "country": "Nowhere"}),
+    ),
+    "GET airport-list": (3, lambda w: (url("airport-list"), None)),
+    "POST airport-list": (
+        2,
+        lambda w: (url("airport-list"), {"name": "Budget", "city": w.city.id}),
+    ),
+    "GET airport-autocomplete": (
+        1,
+        lambda w: (url("airport-autocomplete"), {"q": w.airport.name[:3]}),
+    ),
+    "GET airport-detail": (2, lambda w: (url("airport-detail", w.airport.id), None)),
+    "PUT airport-detail": (
+        5,
+        lambda w: (
+            url("airport-detail", w.airport.id),
+            {"name": "Renamed", "city": w.city.id},
+        ),
+    ),
+    "PATCH airport-detail": (
+        4,
+        lambda w: (url("airport-detail", w.airport.id), {"name": "Renamed"}),
+    ),
+    "DELETE airport-detail": (
+        13,
+        lambda w: (url("airport-detail", w.spare_airport.id), None),
+    ),
+    "GET route-list": (3, lambda w: (url("route-list"), None)),
+    "POST route-list": (
+        7,
+        lambda w: (url("route-list"), w.new_route),
+    ),
+    "POST route-bulk": (5, lambda w: (url("route-bulk"), [w.new_route])),
+    "PATCH route-bulk": (
+        7,
+        lambda w: (url("route-bulk"), [{"id": w.route.id, "distance": 999}]),
+    ),
+    "GET route-detail": (2, lambda w: (url("route-detail", w.spare_route.id), None)),
+    "PUT route-detail": (
+        11,
+        lambda w: (
+            url("route-detail", w.route.id),
+            {
+                "source": w.route.source_id,
+                "destination": w.route.destination_id,
+                "distance": 999,
+            },
+        ),
+    ),
+    "PATCH route-detail": (
+        9,
+        lambda w: (url("route-detail", w.route.id), {"distance": 999}),
+    ),
+    "DELETE route-detail": (
+        10,
+        lambda w: (url("route-detail", w.spare_route.id), None),
+    ),
+    "GET airplanetype-list": (3, lambda w: (url("airplanetype-list"), None)),
+    "POST airplanetype-list": (
+        2,
+        lambda w: (url("airplanetype-list"), {"name": "Budget"}),
+    ),
+    "GET airplane-list": (3, lambda w: (url("airplane-list"), None)),
+    "POST airplane-list": (
+        3,
+        lambda w: (
+            url("airplane-list"),
+            {
+                "model_name": "Budget",
+                "airplane_type": w.airplane_type.id,
+                "rows": 10,
+                "seats_in_row": 4,
+            },
+        ),
+    ),
+    "GET airplane-detail": (2, lambda w: (url("airplane-detail", w.airplane.id), None)),
+    "PUT airplane-detail": (
+        6,
+        lambda w: (
+            url("airplane-detail", w.airplane.id),
+            {
+                "model_name": "Renamed",
+                "airplane_type": w.airplane_type.id,
+                "rows": w.airplane.rows,
+                "seats_in_row": w.airplane.seats_in_row,
+            },
+        ),
+    ),
+    "PATCH airplane-detail": (
+        5,
+        lambda w: (url("airplane-detail", w.airplane.id), {"model_name": "Renamed"}),
+    ),
+    "DELETE airplane-detail": (
+        10,
+        lambda w: (url("airplane-detail", w.spare_airplane.id), None),
+    ),
+    "GET role-list": (3, lambda w: (url("role-list"), None)),
+    "POST role-list": (2, lambda w: (url("role-list"), {"name": "Budget"})),
+    "GET crewmember-list": (3, lambda w: (url("crewmember-list"), None)),
+    "POST crewmember-list": (
+        2,
+        lambda w: (url("crewmember-list"), w.new_crew_member),
+    ),
+    "POST crewmember-bulk": (
+        4,
+        lambda w: (url("crewmember-bulk"), [w.new_crew_member]),
+    ),
+    "PATCH crewmember-bulk": (
+        4,
+        lambda w: (
+            url("crewmember-bulk"),
+            [{"id": w.crew_member.id, "last_name": "Renamed"}],
+        ),
+    ),
+    "GET crewmember-detail": (
+        2,
+        lambda w: (url("crewmember-detail", w.crew_member.id), None),
+    ),
+    "PUT crewmember-detail": (
+        3,
+        lambda w: (url("crewmember-detail", w.crew_member.id), w.new_crew_member),
+    ),
+    "PATCH crewmember-detail": (
+        2,
+        lambda w: (
+            url("crewmember-detail", w.crew_member.id),
+            {"last_name": "Renamed"},
+        ),
+    ),
+    "DELETE crewmember-detail": (
+        4,
+        lambda w: (url("crewmember-detail", w.crew_member.id), None),
+    ),
+    "POST crewmember-upload-photo": (
+        2,
+        lambda w: (url("crewmember-upload-photo", w.crew_member.id), None),
+    ),
+    "GET flight-list": (4, lambda w: (url("flight-list"), None)),
+    "POST flight-list": (
+        15,
+        lambda w: (url("flight-list"), flight_payload(w)),
+    ),
+    "POST flight-bulk": (
+        12,
+        lambda w: (url("flight-bulk"), [flight_payload(w)]),
+    ),
+    "PATCH flight-bulk": (
+        11,
+        lambda w: (
+            url("flight-bulk"),
+            [{"id": w.flight.id, "status": 3, "crew": [w.crew_member.id]}],
+        ),
+    ),
+    "GET flight-itineraries": (
+        4,
+        lambda w: (
+            url("flight-itineraries"),
+            {
+                "source_city": w.flight.route.source.city.name,
+                "destination_city": w.flight.route.destination.city.name,
+                "departure_date": w.flight.departure_time.date(),
+            },
+        ),
+    ),
+    "GET flight-detail": (4, lambda w: (url("flight-detail", w.flight.id), None)),
+    "PUT flight-detail": (
+        13,
+        lambda w: (
+            url("flight-detail", w.flight.id),
+            flight_payload(
+                w,
+                flight_number=w.flight.flight_number,
+                route=w.flight.route_id,
+                crew=w.flight_crew,
+            ),
+        ),
+    ),
+    "PATCH flight-detail": (
+        8,
+        lambda w: (url("flight-detail", w.flight.id), {"status": 3}),
+    ),
+    "DELETE flight-detail": (
+        8,
+        lambda w: (url("flight-detail", w.spare_flight.id), None),
+    ),
+    "GET flight-seats": (3, lambda w: (url("flight-seats", w.flight.id), None)),
+    "GET order-list": (4, lambda w: (url("order-list"), None)),
+    "POST order-list": (
+        13,
+        lambda w: (url("order-list"), {"tickets": [ticket_payload(w)]}),
+    ),
+    "GET order-detail": (3, lambda w: (url("order-detail", w.order.id), None)),
+    "GET seathold-list": (3, lambda w: (url("seathold-list"), None)),
+    "POST seathold-list": (
+        12,
+        lambda w: (
+            url("seathold-list"),
+            {"flight": w.flight.id, "seats": [ticket_payload(w)]},
+        ),
+    ),
+    "DELETE seathold-detail": (
+        7,
+        lambda w: (url("seathold-detail", w.seat_hold.id), None),
+    ),
+    "GET export-flights": (1, lambda w: (url("export-flights"), None)),
+    "GET export-orders": (1, lambda w: (url("export-orders"), None)),
+    "GET export-tickets": (1, lambda w: (url("export-tickets"), None)),
+}
+
+
+def router_actions():
+    """
+    Returns "METHOD url-name" of every action the router exposes.
+    HEAD, which DRF adds to the actions on the first request, is GET.
+    """
+    actions = set()
+    for pattern in router.urls:
+        for method in getattr(pattern.callback, "actions", {}):
+            if method != "head":
+                actions.add(f"{method.upper()} {pattern.name}")
+    return actions
+
+
+def build_world(size, user):
+    """
+    Fills the database with `size` objects of every model
+    and returns the ones the requests are made against.
+    """
+    DatasetGenerator(
+        seed=size,
+        cities=max(size, 2),
+        airplanes=size + 1,
+        routes=size,
+        flights=size + 1,
+        crew_members=size + 1,
+        users=1,
+        orders=size,
+    ).generate()
+    Order.objects.update(user=user)
+
+    world = SimpleNamespace(user=user)
+    world.city = City.objects.first()
+    world.airport = Airport.objects.first()
+    world.route = Route.objects.select_related("source", "destination").first()
+    world.airplane_type = AirplaneType.objects.first()
+    world.role = Role.objects.first()
+    world.crew_member = CrewMember.objects.first()
+    flights = list(
+        Flight.objects.annotate(available=Flight.available_seats_expression())
+        .select_related("airplane", "route__source__city", "route__destination__city")
+        .order_by("-available", "id")
+    )
+    world.flight = flights[0]
+    world.flight_crew = list(world.flight.crew.values_list("id", flat=True))
+    world.airplane = world.flight.airplane
+
+    taken = set(Ticket.objects.filter(flight=world.flight).values_list("row", "seat"))
+    free_seats = [
+        (row, seat)
+        for row in range(1, world.airplane.rows + 1)
+        for seat in range(1, world.airplane.seats_in_row + 1)
+        if (row, seat) not in taken
+    ]
+    world.free_seat = free_seats[-1]
+    hold_seats(user, world.flight, free_seats[:size], minutes=15)
+    world.seat_hold = SeatHold.objects.filter(user=user).first()
+
+    # Deleted objects cascade down to an order of `size` tickets,
+    # so the same tables are touched whatever the size.
+    first, second, third = (
+        sample_airport(name=f"Budget {number}", city=world.city) for number in (1, 2, 3)
+    )
+    world.spare_airport = first
+    world.spare_route = sample_route(source=first, destination=second)
+    world.spare_airplane = sample_airplane(
+        model_name="Budget", airplane_type=world.airplane_type
+    )
+    world.spare_flight = sample_flight(
+        flight_number="ZZ9",
+        route=world.spare_route,
+        airplane=world.spare_airplane,
+        seats_sold=size,
+    )
+    world.spare_flight.crew.set([world.crew_member])
+    world.order = sample_order(user)
+    Ticket.objects.bulk_create(
+        Ticket(
+            order=world.order,
+            flight=world.spare_flight,
+            row=number // 10 + 1,
+            seat=number % 10 + 1,
+            passenger_first_name="Query",
+            passenger_last_name="Budget",
+        )
+        for number in range(size)
+    )
+
+    world.new_route = {
+        "source": second.id,
+        "destination": third.id,
+        "distance": 100,
+    }
+    world.new_crew_member = {
+        "first_name": "Query",
+        "last_name": "Budget",
+        "role": world.role.id,
+    }
+    return world
+
+
+# The world holds up to max(SIZES) seats of one flight for the user.
+@override_settings(MEDIA_ROOT=tempfile.gettempdir(), SEAT_HOLD_MAX_SEATS=100)
+class QueryBudgetTest(TestCase):
+    """
+    Runs every router action against 1 and 50 rows of every model and
+    checks that the number of queries doesn't grow with the rows and
+    stays within the budget declared in QUERY_BUDGETS. Each request is
+    rolled back and sent with empty caches, so it runs every query.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="budget@test.com", password="test123budget", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, key, world):
+        method, _ = key.split(" ")
+        path, data = QUERY_BUDGETS[key][1](world)
+        for cache in caches.all():
+            cache.clear()
+        flight_graph.invalidate()
+        airport_index.invalidate()
+
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                if method == "GET":
+                    response = self.client.get(path, data)
+                elif key == "POST crewmember-upload-photo":
+                    response = self.client.post(
+                        path, {"photo": photo()}, format="multipart"
+                    )
+                else:
+                    response = getattr(self.client, method.lower())(
+                        path, data, format="json"
+                    )
+                if response.streaming:
+                    b"".join(response.streaming_content)
+            transaction.set_rollback(True)
+
+        self.assertLess(
+            response.status_code, 400, f"{key}: {getattr(response, 'data', '')}"
+        )
+        return len(queries)
+
+    def test_every_action_has_a_budget(self):
+        self.assertEqual(router_actions(), set(QUERY_BUDGETS))
+
+    def test_queries_within_budget(self):
+        counts = {}
+        for size in SIZES:
+            with transaction.atomic():
+                world = build_world(size, self.user)
+                counts[size] = {
+                    key: self.count_queries(key, world) for key in QUERY_BUDGETS
+                }
+                transaction.set_rollback(True)
+
+        for key, (budget, _) in QUERY_BUDGETS.items():
+            with self.subTest(key):
+                few, many = (counts[size][key] for size in SIZES)
+                self.assertEqual(
+                    few, many, f"{key}: {few} queries at 1 row, {many} at 50"
+                )
+                self.assertLessEqual(many, budget)
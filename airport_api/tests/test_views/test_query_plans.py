@@ -0,0 +1,149 @@
+import re
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from airport_api.dataset import DatasetGenerator
+from airport_api.models import Order, Ticket
+
+FLIGHT_URL = reverse("airport:flight-list")
+ORDER_URL = reverse("airport:order-list")
+ENTRY_TABLE = "airport_api_flightsearchentry"
+
+
+def day(offset):
+    return (timezone.now() + timedelta(days=offset)).date().isoformat()
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            # Tiny test tables are cheaper to read whole,
+            # the plan should still be able to use an index.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}")
+        return "\n".join(str(row[-1]) for row in cursor.fetchall())
+
+
+def full_scans(plan):
+    """
+    Returns the tables the plan reads without an index.
+    """
+    return set(
+        re.findall(r"Seq Scan on (\w+)", plan)
+        + re.findall(r"^SCAN (\w+)$", plan, flags=re.MULTILINE)
+    )
+
+
+def index_on(table, columns):
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return next(
+        name
+        for name, constraint in constraints.items()
+        if constraint["index"] and constraint["columns"] == columns
+    )
+
+
+class QueryPlanTest(TestCase):
+    """
+    Explains the queries of the main list endpoints on a generated
+    dataset and checks they read the filtered and sorted tables
+    through an index.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        DatasetGenerator(
+            seed=1,
+            cities=20,
+            airplanes=10,
+            routes=50,
+            flights=500,
+            crew_members=20,
+            users=20,
+            orders=500,
+        ).generate()
+        cls.user = Order.objects.first().user
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def list_query(self, url, table, params=None):
+        """
+        Requests the url and returns the query
+        that selects the page from the table.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+
+        self.assertEqual(response.status_code, 200)
+        return next(
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith("SELECT")
+            and f'FROM "{table}"' in query["sql"]
+            and "LIMIT" in query["sql"]
+        )
+
+    def assertUsesIndex(self, sql, table, index):
+        plan = explain(sql)
+
+        self.assertIn(index, plan)
+        self.assertNotIn(table, full_scans(plan))
+
+    def test_flight_list(self):
+        for params in (None, {"pagination": "cursor"}):
+            sql = self.list_query(FLIGHT_URL, ENTRY_TABLE, params)
+
+            self.assertUsesIndex(sql, ENTRY_TABLE, "flight_search_departure_idx")
+
+    def test_expanded_flight_list(self):
+        sql = self.list_query(FLIGHT_URL, "airport_api_flight", {"expand": "route"})
+
+        self.assertUsesIndex(sql, "airport_api_flight", "flight_departure_idx")
+
+    def test_flights_by_departure_time(self):
+        sql = self.list_query(
+            FLIGHT_URL,
+            ENTRY_TABLE,
+            {"departure_time_after": day(10), "departure_time_before": day(11)},
+        )
+
+        self.assertUsesIndex(sql, ENTRY_TABLE, "flight_search_departure_idx")
+
+    def test_flights_by_arrival_time(self):
+        sql = self.list_query(
+            FLIGHT_URL,
+            ENTRY_TABLE,
+            {"arrival_time_after": day(10), "arrival_time_before": day(11)},
+        )
+
+        self.assertUsesIndex(sql, ENTRY_TABLE, "flight_search_arrival_idx")
+
+    def test_order_list(self):
+        for params in (None, {"pagination": "cursor"}):
+            sql = self.list_query(ORDER_URL, "airport_api_order", params)
+
+            self.assertUsesIndex(sql, "airport_api_order", "order_user_created_idx")
+
+    def test_order_tickets(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(ORDER_URL)
+        sql = next(
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith('SELECT "airport_api_ticket"')
+        )
+
+        self.assertUsesIndex(
+            sql,
+            "airport_api_ticket",
+            index_on(Ticket._meta.db_table, ["order_id"]),
+        )
@@ -0,0 +1,200 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport_api.models import Flight
+from airport_api.tests.factories import sample_city, sample_flight
+from core.db_router import ReplicaRouter, ReplicaSelector, read_replica
+
+FLIGHT_URL = reverse("airport:flight-list")
+ORDER_URL = reverse("airport:order-list")
+CITY_URL = reverse("airport:city-list")
+
+
+class ReachableReplicas(ReplicaSelector):
+    def available(self, alias):
+        return True
+
+
+# The test database stands in for a replica, it is the only one there is.
+@override_settings(REPLICA_DATABASES=["default"])
+class ReplicaRoutingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com", password="test123user"
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+        self.routed_to = set()
+
+    def record(self, execute, sql, params, many, context):
+        # The replica the query was routed to, None standing for the primary.
+        self.routed_to.add(read_replica.get())
+        return execute(sql, params, many, context)
+
+    def read(self, url):
+        self.routed_to = set()
+        with connection.execute_wrapper(self.record):
+            return self.client.get(url)
+
+    def order(self):
+        return self.client.post(
+            ORDER_URL,
+            {
+                "tickets": [
+                    {
+                        "row": 1,
+                        "seat": 1,
+                        "passenger_first_name": "Anna",
+                        "passenger_last_name": "Bond",
+                        "flight": self.flight.id,
+                    }
+                ]
+            },
+            format="json",
+        )
+
+    def test_reads_go_to_replica(self):
+        response = self.read(FLIGHT_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("default", self.routed_to)
+        self.assertIsNone(read_replica.get())
+
+    def test_async_reads_go_to_replica(self):
+        with connection.execute_wrapper(self.record):
+            response = async_to_sync(self.async_client.get)(FLIGHT_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("default", self.routed_to)
+        self.assertIsNone(read_replica.get())
+
+    def test_writes_go_to_primary(self):
+        with connection.execute_wrapper(self.record):
+            response = self.order()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.routed_to, {None})
+
+    def test_user_is_pinned_to_primary_after_ordering(self):
+        self.assertEqual(self.order().status_code, status.HTTP_201_CREATED)
+
+        response = self.read(ORDER_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(self.routed_to, {None})
+
+    def test_user_is_pinned_to_primary_after_any_write(self):
+        self.user.is_staff = True
+        self.user.save()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse("airport:flight-detail", args=[self.flight.id]),
+                {"flight_number": "PS999"},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.read(FLIGHT_URL)
+
+        self.assertEqual(self.routed_to, {None})
+
+    def test_failed_write_does_not_pin(self):
+        response = self.client.post(ORDER_URL, {"tickets": []}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.read(ORDER_URL)
+
+        self.assertIn("default", self.routed_to)
+
+    def test_replica_reads_are_not_cached_right_after_a_write(self):
+        self.client.force_authenticate(None)
+        with self.captureOnCommitCallbacks(execute=True):
+            sample_city(name="Kherson")
+
+        self.read(CITY_URL)
+        response = self.read(CITY_URL)
+
+        self.assertEqual(response["X-Cache"], "MISS")
+
+    @override_settings(REPLICA_PIN_SECONDS=0)
+    def test_replica_reads_are_cached_after_the_lag_window(self):
+        self.client.force_authenticate(None)
+        with self.captureOnCommitCallbacks(execute=True):
+            sample_city(name="Kherson")
+
+        self.read(CITY_URL)
+        response = self.read(CITY_URL)
+
+        self.assertEqual(response["X-Cache"], "HIT")
+
+    @override_settings(REPLICA_PIN_SECONDS=0)
+    def test_pin_expires(self):
+        self.order()
+
+        self.read(ORDER_URL)
+
+        self.assertIn("default", self.routed_to)
+
+    @override_settings(REPLICA_DATABASES=["missing"])
+    def test_falls_back_to_primary_without_reachable_replica(self):
+        response = self.read(FLIGHT_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.routed_to, {None})
+
+    @override_settings(REPLICA_DATABASES=["missing", "default"])
+    def test_unreachable_replica_is_skipped(self):
+        for _ in range(2):
+            self.read(FLIGHT_URL)
+            self.assertIn("default", self.routed_to)
+            self.assertNotIn("missing", self.routed_to)
+
+
+class ReplicaSelectorTest(TestCase):
+    @override_settings(REPLICA_DATABASES=["replica1", "replica2"])
+    def test_round_robin(self):
+        selector = ReachableReplicas()
+
+        chosen = [selector.choose() for _ in range(4)]
+
+        self.assertEqual(chosen, ["replica1", "replica2", "replica1", "replica2"])
+
+    @override_settings(
+        REPLICA_DATABASES=["replica1", "replica2", "replica3"],
+        REPLICA_BALANCING="least_loaded",
+    )
+    def test_least_loaded(self):
+        selector = ReachableReplicas()
+
+        with selector.reading() as busy:
+            with selector.reading():
+                pass
+            chosen = {selector.choose() for _ in range(3)}
+
+        self.assertEqual(chosen, {"replica1", "replica2", "replica3"} - {busy})
+
+    @override_settings(REPLICA_DATABASES=["replica1"])
+    def test_router(self):
+        router = ReplicaRouter()
+        user_model = get_user_model()
+
+        self.assertIsNone(router.db_for_read(Flight))
+        token = read_replica.set("replica1")
+        try:
+            self.assertEqual(router.db_for_read(Flight), "replica1")
+            self.assertIsNone(router.db_for_read(user_model))
+            self.assertEqual(router.db_for_write(Flight), "default")
+        finally:
+            read_replica.reset(token)
+        self.assertFalse(router.allow_migrate("replica1", "airport_api"))
+        self.assertIsNone(router.allow_migrate("default", "airport_api"))
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
@@ -17,6 +18,7 @@ from airport_api.tests.factories import (
 )
 
 ROUTE_URL = reverse("airport:route-list")
+ROUTE_BULK_URL = reverse("airport:route-bulk")
 
 
 def detail_url(route_id: int):
@@ -102,6 +104,16 @@ class AdminRouteAPITest(TestCase):
         self.assertNotIn(route_uk_usa_serializer.data, response.data["results"])
         self.assertIn(route_usa_uk_serializer.data, response.data["results"])
 
+    def test_route_list_expand_source(self):
+        response = self.client.get(
+            ROUTE_URL,
+            {"fields": "id,source", "expand": "source"},
+        )
+        route = response.data["results"][0]
+
+        self.assertEqual(set(route), {"id", "source"})
+        self.assertEqual(set(route["source"]), {"id", "name", "city"})
+
     def test_route_create(self):
         payload = sample_route(as_dict=True)
         response = self.client.post(ROUTE_URL, payload)
@@ -145,3 +157,88 @@ class AdminRouteAPITest(TestCase):
 
         response = self.client.get(detail_url(self.route_uk_usa.id))
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RouteResponseCacheTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+        self.route = sample_route()
+
+    def test_route_retrieve_is_cached(self):
+        self.client.get(detail_url(self.route.id))
+
+        response = self.client.get(detail_url(self.route.id))
+
+        self.assertEqual(response["X-Cache"], "HIT")
+
+    def test_city_rename_invalidates_routes(self):
+        self.client.get(ROUTE_URL)
+        city = self.route.source.city
+
+        with self.captureOnCommitCallbacks(execute=True):
+            city.name = "Renamed"
+            city.save()
+        response = self.client.get(ROUTE_URL)
+
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertIn("Renamed", response.data["results"][0]["source"])
+
+
+class RouteBulkAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="admin@test.com", password="test123admin", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+
+        self.lviv = sample_airport(city=sample_city(name="Lviv"))
+        self.kyiv = sample_airport(city=sample_city(name="Kyiv"))
+        self.odesa = sample_airport(city=sample_city(name="Odesa"))
+
+    def test_bulk_create_routes(self):
+        payload = [
+            {"source": self.lviv.id, "destination": self.kyiv.id, "distance": 540},
+            {"source": self.kyiv.id, "destination": self.odesa.id, "distance": 475},
+        ]
+
+        response = self.client.post(ROUTE_BULK_URL, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Route.objects.count(), 2)
+
+    def test_bulk_create_checks_unique_routes(self):
+        sample_route(source=self.lviv, destination=self.kyiv)
+        payload = [
+            {"source": self.lviv.id, "destination": self.kyiv.id, "distance": 540},
+            {"source": self.kyiv.id, "destination": self.odesa.id, "distance": 475},
+            {"source": self.kyiv.id, "destination": self.odesa.id, "distance": 475},
+            {"source": self.odesa.id, "destination": self.odesa.id, "distance": 1},
+        ]
+
+        response = self.client.post(ROUTE_BULK_URL, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("unique set", response.data[0]["non_field_errors"][0])
+        self.assertEqual(response.data[1], {})
+        self.assertIn("item 1", response.data[2]["non_field_errors"][0])
+        self.assertIn("non_field_errors", response.data[3])
+        self.assertEqual(Route.objects.count(), 1)
+
+    def test_bulk_update_invalidates_cached_routes(self):
+        route = sample_route(source=self.lviv, destination=self.kyiv)
+        self.client.get(ROUTE_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                ROUTE_BULK_URL,
+                [{"id": route.id, "distance": 600}],
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(ROUTE_URL)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["results"][0]["distance"], 600)
@@ -0,0 +1,264 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport_api.models import Flight, SeatHold, Ticket
+from airport_api.tests.factories import (
+    sample_flight,
+    sample_airplane,
+    sample_ticket,
+)
+
+SEAT_HOLD_URL = reverse("airport:seathold-list")
+ORDER_URL = reverse("airport:order-list")
+
+
+def detail_url(hold_id: int):
+    return reverse("airport:seathold-detail", args=[hold_id])
+
+
+def seats_url(flight_id: int):
+    return reverse("airport:flight-seats", args=[flight_id])
+
+
+class UnauthenticatedSeatHoldAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        response = self.client.get(SEAT_HOLD_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class SeatHoldAPITest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com", password="test123user"
+        )
+        self.client.force_authenticate(self.user)
+
+        self.flight = sample_flight(
+            flight_number="SH100",
+            airplane=sample_airplane(rows=3, seats_in_row=4),
+        )
+
+    def hold(self, *seats, client=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return (client or self.client).post(
+                SEAT_HOLD_URL,
+                {
+                    "flight": self.flight.id,
+                    "seats": [{"row": row, "seat": seat} for row, seat in seats],
+                    "minutes": 5,
+                },
+                format="json",
+            )
+
+    def test_hold_seats(self):
+        response = self.hold((1, 1), (1, 2))
+        self.flight.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(self.flight.seats_held, 2)
+        self.assertEqual(
+            SeatHold.objects.filter(user=self.user, flight=self.flight).count(), 2
+        )
+
+    @override_settings(SEAT_HOLD_MAX_SEATS=3)
+    def test_hold_limit_per_user(self):
+        self.hold((1, 1), (1, 2))
+
+        response = self.hold((2, 1), (2, 2))
+        self.flight.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("seats", response.data)
+        self.assertEqual(self.flight.seats_held, 2)
+
+    @override_settings(SEAT_HOLD_MAX_SEATS=3)
+    def test_hold_limit_counts_prolonged_holds_once(self):
+        self.hold((1, 1), (1, 2))
+
+        response = self.hold((1, 1), (1, 2), (2, 1))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(SeatHold.objects.filter(user=self.user).count(), 3)
+
+    def test_hold_again_prolongs_own_hold(self):
+        self.hold((1, 1))
+        response = self.hold((1, 1))
+        self.flight.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.flight.seats_held, 1)
+
+    def test_hold_seat_held_by_another_user(self):
+        self.hold((1, 1))
+        other_client = APIClient()
+        other_client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="other@test.com", password="test123user"
+            )
+        )
+
+        response = self.hold((1, 1), (1, 2), client=other_client)
+        self.flight.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.flight.seats_held, 1)
+
+    def test_hold_expired_seat_of_another_user(self):
+        other_user = get_user_model().objects.create_user(
+            email="other@test.com", password="test123user"
+        )
+        SeatHold.objects.create(
+            flight=self.flight,
+            user=other_user,
+            row=1,
+            seat=1,
+            expires_at=timezone.now() - timedelta(minutes=1),
+        )
+        Flight.change_seats_held(self.flight.id, 1)
+
+        response = self.hold((1, 1))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(SeatHold.objects.get().user, self.user)
+
+    def test_hold_sold_seat(self):
+        sample_ticket(flight=self.flight, row=2, seat=2)
+
+        response = self.hold((2, 2))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_hold_seat_out_of_range(self):
+        response = self.hold((4, 1))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_only_own_active_holds(self):
+        self.hold((1, 1))
+        SeatHold.objects.create(
+            flight=self.flight,
+            user=self.user,
+            row=3,
+            seat=3,
+            expires_at=timezone.now() - timedelta(minutes=1),
+        )
+        Flight.change_seats_held(self.flight.id, 1)
+
+        response = self.client.get(SEAT_HOLD_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 1)
+
+    def test_release_hold(self):
+        hold_id = self.hold((1, 1)).data[0]["id"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(detail_url(hold_id))
+        self.flight.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.flight.seats_held, 0)
+
+    def test_seat_map_counts_holds(self):
+        self.hold((1, 2))
+
+        response = self.client.get(seats_url(self.flight.id))
+
+        self.assertEqual(response.data["held"], 1)
+        self.assertTrue(response.data["seats"][0][1])
+
+    def test_order_converts_own_hold(self):
+        self.hold((1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                ORDER_URL,
+                {
+                    "tickets": [
+                        {
+                            "row": 1,
+                            "seat": 1,
+                            "passenger_first_name": "Anton",
+                            "passenger_last_name": "Antonenko",
+                            "flight": self.flight.id,
+                        }
+                    ]
+                },
+                format="json",
+            )
+        self.flight.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.flight.seats_held, 0)
+        self.assertEqual(self.flight.seats_sold, 1)
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_order_rejects_seat_held_by_another_user(self):
+        self.hold((1, 1))
+        other_client = APIClient()
+        other_client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="other@test.com", password="test123user"
+            )
+        )
+
+        response = other_client.post(
+            ORDER_URL,
+            {
+                "tickets": [
+                    {
+                        "row": 1,
+                        "seat": 1,
+                        "passenger_first_name": "Anton",
+                        "passenger_last_name": "Antonenko",
+                        "flight": self.flight.id,
+                    }
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Ticket.objects.filter(flight=self.flight).exists())
+
+    def test_expired_holds_are_available_after_sweep(self):
+        self.hold((1, 1), (1, 2))
+        SeatHold.objects.filter(seat=1).update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        call_command("sweep_seat_holds", stdout=StringIO())
+        flight_list = self.client.get(reverse("airport:flight-list")).data["results"]
+        flight_detail = self.client.get(
+            reverse("airport:flight-detail", args=[self.flight.id])
+        ).data
+
+        self.assertEqual(flight_list[0]["available_seats"], 11)
+        self.assertEqual(flight_detail["available_seats"], 11)
+
+    def test_sweep_seat_holds_command(self):
+        self.hold((1, 1))
+        SeatHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        call_command("sweep_seat_holds", stdout=StringIO())
+        self.flight.refresh_from_db()
+
+        self.assertFalse(SeatHold.objects.exists())
+        self.assertEqual(self.flight.seats_held, 0)
@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework import routers
 
+from airport_api.async_views import async_urls
 from airport_api.views import (
     CityViewSet,
     AirportViewSet,
@@ -11,6 +12,9 @@ from airport_api.views import (
     CrewMemberViewSet,
     FlightViewSet,
     OrderViewSet,
+    SeatHoldViewSet,
+    ExportViewSet,
+    ResponseCacheStatsView,
 )
 
 router = routers.DefaultRouter()
@@ -23,7 +27,31 @@ router.register("roles", RoleViewSet)
 router.register("crew_members", CrewMemberViewSet)
 router.register("flights", FlightViewSet)
 router.register("orders", OrderViewSet)
+router.register("seat_holds", SeatHoldViewSet)
+router.register("export", ExportViewSet, basename="export")
 
-urlpatterns = [path("", include(router.urls))]
+urlpatterns = [
+    path(
+        "response_cache/",
+        ResponseCacheStatsView.as_view(),
+        name="response-cache-stats",
+    ),
+    path("", include(router.urls)),
+]
+
+# The same with the hot read endpoints served by async views,
+# for requests handled in the event loop, see core.asgi_urls.
+async_urlpatterns = [
+    *urlpatterns[:-1],
+    path(
+        "",
+        include(
+            async_urls(
+                router.urls,
+                ("airport-list", "route-list", "flight-list", "flight-detail"),
+            )
+        ),
+    ),
+]
 
 app_name = "airport"
@@ -1,3 +1,5 @@
+from datetime import timedelta
+
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import (
     extend_schema_view,
@@ -5,11 +7,27 @@ from drf_spectacular.utils import (
     OpenApiParameter,
 )
 from rest_framework import viewsets, mixins, status
-from django.db.models import Prefetch, Q, F, Count
+from django.db.models import Prefetch, Q
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
-
+from rest_framework.views import APIView
+
+from airport_api import metrics
+from airport_api.autocomplete import airport_index
+from airport_api.itineraries import find_itineraries
+from airport_api.mixins import (
+    BulkWriteMixin,
+    CursorPaginationMixin,
+    ConditionalGetMixin,
+    ReplicaReadMixin,
+    ResponseCacheMixin,
+    SparseFieldsMixin,
+)
 from airport_api.models import (
     City,
     Airport,
@@ -19,12 +37,16 @@ from airport_api.models import (
     Role,
     CrewMember,
     Flight,
+    FlightSearchEntry,
     Order,
     Ticket,
+    SeatHold,
 )
 from airport_api.pagination import (
     SmallResultSetPagination,
     BigResultSetPagination,
+    FlightCursorPagination,
+    OrderCursorPagination,
 )
 from airport_api.permissions import IsAdminUserOrReadOnly
 from airport_api.serializers import (
@@ -32,6 +54,8 @@ from airport_api.serializers import (
     AirportSerializer,
     AirportListSerializer,
     AirportRetrieveSerializer,
+    AirportAutocompleteFilterSerializer,
+    AirportSuggestionSerializer,
     RouteSerializer,
     RouteListSerializer,
     RouteRetrieveSerializer,
@@ -45,20 +69,69 @@ from airport_api.serializers import (
     CrewMemberRetrieveSerializer,
     FlightSerializer,
     FlightListSerializer,
+    FlightSearchEntrySerializer,
     FlightRetrieveSerializer,
     OrderSerializer,
     OrderListSerializer,
     OrderRetrieveSerializer,
     FlightFilterSerializer,
     CrewMemberPhotoSerializer,
+    ItineraryFilterSerializer,
+    ItinerarySerializer,
+    SeatMapSerializer,
+    SeatHoldSerializer,
+    SeatHoldCreateSerializer,
+    ExportFilterSerializer,
+    RouteBulkSerializer,
+    CrewMemberBulkSerializer,
+    FlightBulkSerializer,
 )
+from airport_api.exports import streaming_export
+from airport_api.response_cache import response_cache_stats
+from airport_api.search import search
+from airport_api.seat_holds import active_holds, delete_holds
+from airport_api.seat_map import get_seat_map
+
+BULK_DESCRIPTION = (
+    "POST creates every object of the list, PATCH partially updates "
+    "the objects whose `id` is given in each item. Nothing is written "
+    "unless every item is valid, errors are returned per item."
+)
+
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        name="fields",
+        type=OpenApiTypes.STR,
+        description="Comma separated fields to return, all by default",
+        required=False,
+    ),
+    OpenApiParameter(
+        name="expand",
+        type=OpenApiTypes.STR,
+        description="Comma separated related fields to return as nested objects",
+        required=False,
+    ),
+]
 
 
 @extend_schema_view(
     create=extend_schema(summary="Create city"),
-    list=extend_schema(summary="List cities"),
+    list=extend_schema(
+        summary="List cities",
+        parameters=[
+            OpenApiParameter(
+                name="search",
+                type=OpenApiTypes.STR,
+                description="Search by name or country, best matches first",
+                required=False,
+            ),
+        ],
+    ),
 )
 class CityViewSet(
+    ReplicaReadMixin,
+    ResponseCacheMixin,
+    ConditionalGetMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     viewsets.GenericViewSet,
@@ -68,6 +141,15 @@ class CityViewSet(
     pagination_class = BigResultSetPagination
     permission_classes = (IsAdminUserOrReadOnly,)
 
+    def get_queryset(self):
+        queryset = self.queryset
+
+        search_query = self.request.query_params.get("search")
+        if search_query:
+            queryset = search(queryset, search_query, ("name", "country"))
+
+        return queryset
+
 
 @extend_schema_view(
     create=extend_schema(summary="Create airport"),
@@ -76,8 +158,14 @@ class CityViewSet(
     partial_update=extend_schema(summary="Partially update airport"),
     destroy=extend_schema(summary="Delete airport"),
 )
-class AirportViewSet(viewsets.ModelViewSet):
+class AirportViewSet(
+    ReplicaReadMixin,
+    ResponseCacheMixin,
+    ConditionalGetMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Airport.objects.all()
+    response_models = (Airport, City)
     serializer_class = AirportSerializer
     permission_classes = (IsAdminUserOrReadOnly,)
 
@@ -95,6 +183,14 @@ class AirportViewSet(viewsets.ModelViewSet):
         if country:
             queryset = queryset.filter(city__country__icontains=country)
 
+        search_query = self.request.query_params.get("search")
+        if search_query:
+            queryset = search(
+                queryset,
+                search_query,
+                ("name", "city__name", "city__country"),
+            )
+
         if self.action in ("list", "retrieve"):
             queryset = queryset.select_related("city")
 
@@ -109,23 +205,71 @@ class AirportViewSet(viewsets.ModelViewSet):
                 type=OpenApiTypes.STR,
                 description="Filter by country",
                 required=False,
-            )
+            ),
+            OpenApiParameter(
+                name="search",
+                type=OpenApiTypes.STR,
+                description="Search by airport, city or country, best matches first",
+                required=False,
+            ),
         ],
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    @extend_schema(
+        summary="Autocomplete airports",
+        description="Returns airports whose name, city or country "
+        "starts with the query, airport name matches first.",
+        parameters=[AirportAutocompleteFilterSerializer],
+        responses=AirportSuggestionSerializer(many=True),
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="autocomplete",
+    )
+    def autocomplete(self, request):
+        filter_serializer = AirportAutocompleteFilterSerializer(
+            data=request.query_params
+        )
+        filter_serializer.is_valid(raise_exception=True)
+        filters = filter_serializer.validated_data
+
+        suggestions = airport_index.search(filters["q"], filters["limit"])
+
+        serializer = AirportSuggestionSerializer(suggestions, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
 
 @extend_schema_view(
     create=extend_schema(summary="Create route"),
-    retrieve=extend_schema(summary="Get route details"),
+    retrieve=extend_schema(
+        summary="Get route details",
+        parameters=SPARSE_FIELDS_PARAMETERS,
+    ),
     update=extend_schema(summary="Update route"),
     partial_update=extend_schema(summary="Partially update route"),
     destroy=extend_schema(summary="Delete route"),
+    bulk=extend_schema(
+        summary="Create or update routes in bulk",
+        description=BULK_DESCRIPTION,
+        request=RouteBulkSerializer(many=True),
+        responses=RouteBulkSerializer(many=True),
+    ),
 )
-class RouteViewSet(viewsets.ModelViewSet):
+class RouteViewSet(
+    ReplicaReadMixin,
+    ResponseCacheMixin,
+    ConditionalGetMixin,
+    SparseFieldsMixin,
+    BulkWriteMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Route.objects.all()
+    response_models = (Route, Airport, City)
     serializer_class = RouteSerializer
+    bulk_serializer_class = RouteBulkSerializer
     permission_classes = (IsAdminUserOrReadOnly,)
 
     def get_serializer_class(self):
@@ -157,8 +301,24 @@ class RouteViewSet(viewsets.ModelViewSet):
         if destination_id:
             queryset = queryset.filter(destination__id=destination_id)
 
+        search_query = self.request.query_params.get("search")
+        if search_query:
+            queryset = search(
+                queryset,
+                search_query,
+                (
+                    "source__city__name",
+                    "destination__city__name",
+                    "source__name",
+                    "destination__name",
+                ),
+            )
+
         if self.action in ("list", "retrieve"):
-            queryset = queryset.select_related("source__city", "destination__city")
+            if self.wants_field("source"):
+                queryset = queryset.select_related("source__city")
+            if self.wants_field("destination"):
+                queryset = queryset.select_related("destination__city")
 
         return queryset
 
@@ -190,6 +350,14 @@ class RouteViewSet(viewsets.ModelViewSet):
                 description="Filter by id of destination.",
                 required=False,
             ),
+            OpenApiParameter(
+                name="search",
+                type=OpenApiTypes.STR,
+                description="Search by source or destination city and airport, "
+                "best matches first.",
+                required=False,
+            ),
+            *SPARSE_FIELDS_PARAMETERS,
         ],
     )
     def list(self, request, *args, **kwargs):
@@ -201,6 +369,9 @@ class RouteViewSet(viewsets.ModelViewSet):
     list=extend_schema(summary="List airplane types"),
 )
 class AirplaneTypeViewSet(
+    ReplicaReadMixin,
+    ResponseCacheMixin,
+    ConditionalGetMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     viewsets.GenericViewSet,
@@ -218,8 +389,9 @@ class AirplaneTypeViewSet(
     partial_update=extend_schema(summary="Partially update airplane"),
     destroy=extend_schema(summary="Delete airplane"),
 )
-class AirplaneViewSet(viewsets.ModelViewSet):
+class AirplaneViewSet(ReplicaReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Airplane.objects.all()
+    response_models = (Airplane, AirplaneType)
     serializer_class = AirplaneSerializer
     permission_classes = (IsAdminUserOrReadOnly,)
 
@@ -241,6 +413,14 @@ class AirplaneViewSet(viewsets.ModelViewSet):
         if airplane_type:
             queryset = queryset.filter(airplane_type__name__icontains=airplane_type)
 
+        search_query = self.request.query_params.get("search")
+        if search_query:
+            queryset = search(
+                queryset,
+                search_query,
+                ("model_name", "airplane_type__name"),
+            )
+
         if self.action in ("list", "retrieve"):
             return queryset.select_related("airplane_type")
 
@@ -262,6 +442,12 @@ class AirplaneViewSet(viewsets.ModelViewSet):
                 description="Filter by airplane type",
                 required=False,
             ),
+            OpenApiParameter(
+                name="search",
+                type=OpenApiTypes.STR,
+                description="Search by model name or airplane type, best matches first",
+                required=False,
+            ),
         ],
     )
     def list(self, request, *args, **kwargs):
@@ -273,6 +459,9 @@ class AirplaneViewSet(viewsets.ModelViewSet):
     list=extend_schema(summary="List crew member roles"),
 )
 class RoleViewSet(
+    ReplicaReadMixin,
+    ResponseCacheMixin,
+    ConditionalGetMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     viewsets.GenericViewSet,
@@ -290,10 +479,20 @@ class RoleViewSet(
     partial_update=extend_schema(summary="Partially update crew member"),
     destroy=extend_schema(summary="Delete crew member"),
     upload_photo=extend_schema(summary="Upload crew member photo"),
+    bulk=extend_schema(
+        summary="Create or update crew members in bulk",
+        description=BULK_DESCRIPTION,
+        request=CrewMemberBulkSerializer(many=True),
+        responses=CrewMemberBulkSerializer(many=True),
+    ),
 )
-class CrewMemberViewSet(viewsets.ModelViewSet):
+class CrewMemberViewSet(
+    ReplicaReadMixin, ConditionalGetMixin, BulkWriteMixin, viewsets.ModelViewSet
+):
     queryset = CrewMember.objects.select_related("role")
+    response_models = (CrewMember, Role)
     serializer_class = CrewMemberSerializer
+    bulk_serializer_class = CrewMemberBulkSerializer
     permission_classes = (IsAdminUserOrReadOnly,)
 
     def get_serializer_class(self):
@@ -319,6 +518,14 @@ class CrewMemberViewSet(viewsets.ModelViewSet):
                 Q(first_name__icontains=name) | Q(last_name__icontains=name)
             )
 
+        search_query = self.request.query_params.get("search")
+        if search_query:
+            queryset = search(
+                queryset,
+                search_query,
+                ("first_name", "last_name", "role__name"),
+            )
+
         if self.action in ("list", "retrieve"):
             queryset = queryset.select_related("role")
 
@@ -355,6 +562,12 @@ class CrewMemberViewSet(viewsets.ModelViewSet):
                 description="Filter by name",
                 required=False,
             ),
+            OpenApiParameter(
+                name="search",
+                type=OpenApiTypes.STR,
+                description="Search by name or role, best matches first",
+                required=False,
+            ),
         ],
     )
     def list(self, request, *args, **kwargs):
@@ -363,19 +576,62 @@ class CrewMemberViewSet(viewsets.ModelViewSet):
 
 @extend_schema_view(
     create=extend_schema(summary="Create flight"),
-    retrieve=extend_schema(summary="Get flight details"),
+    retrieve=extend_schema(
+        summary="Get flight details",
+        parameters=SPARSE_FIELDS_PARAMETERS,
+    ),
     update=extend_schema(summary="Update flight"),
     partial_update=extend_schema(summary="Partially update flight"),
     destroy=extend_schema(summary="Delete flight"),
+    bulk=extend_schema(
+        summary="Create or update flights in bulk",
+        description=BULK_DESCRIPTION,
+        request=FlightBulkSerializer(many=True),
+        responses=FlightBulkSerializer(many=True),
+    ),
 )
-class FlightViewSet(viewsets.ModelViewSet):
+class FlightViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    CursorPaginationMixin,
+    SparseFieldsMixin,
+    BulkWriteMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Flight.objects.all()
+    response_models = (
+        Flight,
+        Route,
+        Airport,
+        City,
+        Airplane,
+        AirplaneType,
+        CrewMember,
+        Role,
+    )
     serializer_class = FlightSerializer
+    bulk_serializer_class = FlightBulkSerializer
     pagination_class = SmallResultSetPagination
+    cursor_pagination_class = FlightCursorPagination
     permission_classes = (IsAdminUserOrReadOnly,)
 
+    def reads_search_entries(self) -> bool:
+        """
+        Lists read the denormalized FlightSearchEntry table,
+        unless the client expands related objects.
+        """
+        return self.action == "list" and not any(
+            self.expands_field(name) for name in FlightListSerializer.expandable_fields
+        )
+
     def get_queryset(self):
         queryset = self.queryset
+        source_city_lookup = "route__source__city__name"
+        destination_city_lookup = "route__destination__city__name"
+        if self.reads_search_entries():
+            queryset = FlightSearchEntry.objects.all()
+            source_city_lookup = "source_city"
+            destination_city_lookup = "destination_city"
 
         filter_serializer = FlightFilterSerializer(data=self.request.query_params)
         filter_serializer.is_valid(raise_exception=True)
@@ -390,43 +646,56 @@ class FlightViewSet(viewsets.ModelViewSet):
                 departure_time__lte=filters["departure_time_before"]
             )
         if "arrival_time_after" in filters:
-            queryset = queryset.filter(
-                arrival_time__gte=filters["arrival_time_after"]
-            )
+            queryset = queryset.filter(arrival_time__gte=filters["arrival_time_after"])
         if "arrival_time_before" in filters:
-            queryset = queryset.filter(
-                arrival_time__lte=filters["arrival_time_before"]
-            )
+            queryset = queryset.filter(arrival_time__lte=filters["arrival_time_before"])
 
         if "source_city" in filters:
             queryset = queryset.filter(
-                route__source__city__name__icontains=filters["source_city"]
+                **{f"{source_city_lookup}__icontains": filters["source_city"]}
             )
         if "destination_city" in filters:
             queryset = queryset.filter(
-                route__destination__city__name__icontains=filters["destination_city"]
+                **{f"{destination_city_lookup}__icontains": filters["destination_city"]}
             )
 
-        if self.action in ("list", "retrieve"):
-            queryset = (
-                queryset.select_related(
+        if queryset.model is Flight and self.action in ("list", "retrieve"):
+            # Nested airplane type and crew roles are only rendered
+            # on retrieve or when expanded.
+            nested = self.action == "retrieve"
+
+            if self.wants_field("route"):
+                queryset = queryset.select_related(
                     "route__destination__city",
                     "route__source__city",
-                    "airplane",
                 )
-                .prefetch_related("crew__role")
-                .annotate(
-                    available_seats=(
-                        F("airplane__seats_in_row") * F("airplane__rows")
-                        - Count("tickets")
-                    )
+            if self.wants_field("airplane"):
+                queryset = queryset.select_related(
+                    "airplane__airplane_type"
+                    if nested or self.expands_field("airplane")
+                    else "airplane"
+                )
+            if self.wants_field("crew"):
+                queryset = queryset.prefetch_related(
+                    "crew__role" if nested or self.expands_field("crew") else "crew"
+                )
+            if self.wants_field("available_seats"):
+                queryset = queryset.annotate(
+                    available_seats=Flight.available_seats_expression()
                 )
+        elif queryset.model is FlightSearchEntry and self.wants_field(
+            "available_seats"
+        ):
+            queryset = queryset.annotate(
+                available_seats=FlightSearchEntry.available_seats_expression()
             )
 
         return queryset
 
     def get_serializer_class(self):
         if self.action == "list":
+            if self.reads_search_entries():
+                return FlightSearchEntrySerializer
             return FlightListSerializer
         if self.action == "retrieve":
             return FlightRetrieveSerializer
@@ -473,28 +742,146 @@ class FlightViewSet(viewsets.ModelViewSet):
                 description="Filter by name of destination's city",
                 required=False,
             ),
+            OpenApiParameter(
+                name="pagination",
+                type=OpenApiTypes.STR,
+                enum=["cursor"],
+                description="Use cursor pagination instead of page numbers",
+                required=False,
+            ),
+            *SPARSE_FIELDS_PARAMETERS,
         ],
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    @extend_schema(
+        summary="Search connecting flights",
+        description="Returns direct and connecting itineraries between "
+        "two cities, departing on the given date.",
+        parameters=[ItineraryFilterSerializer],
+        responses=ItinerarySerializer(many=True),
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="itineraries",
+    )
+    def itineraries(self, request):
+        filter_serializer = ItineraryFilterSerializer(data=request.query_params)
+        filter_serializer.is_valid(raise_exception=True)
+        filters = filter_serializer.validated_data
+
+        itineraries = find_itineraries(
+            source_ids=Airport.objects.filter(
+                city__name__iexact=filters["source_city"]
+            ).values_list("id", flat=True),
+            destination_ids=Airport.objects.filter(
+                city__name__iexact=filters["destination_city"]
+            ).values_list("id", flat=True),
+            departure_date=filters["departure_date"],
+            min_connection=timedelta(minutes=filters["min_connection"]),
+            max_connection=timedelta(minutes=filters["max_connection"]),
+            max_legs=filters["max_legs"],
+            passengers=filters["passengers"],
+            sort_by=filters["sort"],
+            limit=filters["limit"],
+        )
+
+        serializer = ItinerarySerializer(itineraries, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        summary="Get flight seat map",
+        description="Returns seat occupancy of the flight "
+        "as a packed bitmap and as a grid of rows.",
+        responses=SeatMapSerializer,
+    )
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="seats",
+    )
+    def seats(self, request, pk=None):
+        # The cache key must match the one invalidated by flight id,
+        # so "01" and "1" can't be cached apart.
+        try:
+            flight_id = int(pk)
+        except (TypeError, ValueError):
+            raise Http404
+        seat_map = get_seat_map(
+            flight_id,
+            lambda: get_object_or_404(
+                Flight.objects.select_related("airplane"),
+                pk=flight_id,
+            ),
+        )
+        serializer = SeatMapSerializer(seat_map)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
 
 @extend_schema_view(
     create=extend_schema(summary="Create order"),
-    list=extend_schema(summary="List orders"),
-    retrieve=extend_schema(summary="Get order details"),
+    list=extend_schema(
+        summary="List orders",
+        parameters=[
+            OpenApiParameter(
+                name="pagination",
+                type=OpenApiTypes.STR,
+                enum=["cursor"],
+                description="Use cursor pagination instead of page numbers",
+                required=False,
+            ),
+            *SPARSE_FIELDS_PARAMETERS,
+        ],
+    ),
+    retrieve=extend_schema(
+        summary="Get order details",
+        parameters=SPARSE_FIELDS_PARAMETERS,
+    ),
 )
 class OrderViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    CursorPaginationMixin,
+    SparseFieldsMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     viewsets.GenericViewSet,
 ):
     queryset = Order.objects.all()
+    response_models = (Order, Ticket, Flight, Route, Airport, City)
+    # Ticket sales bump Flight.updated_at all the time, only the flights
+    # of the user's own tickets matter to their orders.
+    related_updates = {
+        Ticket: ("tickets__updated_at",),
+        Flight: ("tickets__flight__updated_at",),
+        Route: ("tickets__flight__route__updated_at",),
+        Airport: (
+            "tickets__flight__route__source__updated_at",
+            "tickets__flight__route__destination__updated_at",
+        ),
+        City: (
+            "tickets__flight__route__source__city__updated_at",
+            "tickets__flight__route__destination__city__updated_at",
+        ),
+    }
     serializer_class = OrderSerializer
     pagination_class = SmallResultSetPagination
+    cursor_pagination_class = OrderCursorPagination
     permission_classes = (IsAuthenticated,)
 
+    def create(self, request, *args, **kwargs):
+        try:
+            response = super().create(request, *args, **kwargs)
+        except ValidationError as error:
+            metrics.record_order_error(error)
+            raise
+        metrics.orders.inc(outcome="success")
+        metrics.tickets_sold.inc(len(response.data["tickets"]))
+        return response
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
@@ -509,7 +896,7 @@ class OrderViewSet(
     def get_queryset(self):
         queryset = self.queryset.filter(user=self.request.user)
 
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve") and self.wants_field("tickets"):
             tickets_qs = Ticket.objects.select_related(
                 "flight__route__source__city",
                 "flight__route__destination__city",
@@ -523,3 +910,108 @@ class OrderViewSet(
             )
 
         return queryset
+
+
+@extend_schema_view(
+    create=extend_schema(
+        summary="Hold seats",
+        description="Holds seats of a flight for the current user "
+        "for a few minutes, so they can't be ordered by anybody else "
+        "during checkout. Ordering held seats releases the hold.",
+        request=SeatHoldCreateSerializer,
+        responses=SeatHoldSerializer(many=True),
+    ),
+    list=extend_schema(summary="List active seat holds"),
+    destroy=extend_schema(summary="Release seat hold"),
+)
+class SeatHoldViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    queryset = SeatHold.objects.all()
+    serializer_class = SeatHoldSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_serializer_class(self):
+        if self.action == "create":
+            return SeatHoldCreateSerializer
+
+        return self.serializer_class
+
+    def get_queryset(self):
+        return active_holds().filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        holds = serializer.save(user=request.user)
+
+        return Response(
+            SeatHoldSerializer(holds, many=True).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    def perform_destroy(self, instance):
+        delete_holds([(instance.id, instance.flight_id)])
+
+
+class ExportViewSet(viewsets.ViewSet):
+    permission_classes = (IsAdminUser,)
+
+    def export(self, request, resource):
+        filter_serializer = ExportFilterSerializer(data=request.query_params)
+        filter_serializer.is_valid(raise_exception=True)
+        filters = filter_serializer.validated_data
+
+        return streaming_export(
+            resource,
+            output=filters["output"],
+            updated_after=filters.get("updated_after"),
+            is_async=isinstance(request._request, ASGIRequest),
+        )
+
+    @extend_schema(
+        summary="Export flights",
+        description="Streams all flights as NDJSON or CSV, ordered by id.",
+        parameters=[ExportFilterSerializer],
+        responses={200: OpenApiTypes.BINARY},
+    )
+    @action(methods=["GET"], detail=False, url_path="flights")
+    def flights(self, request):
+        return self.export(request, "flights")
+
+    @extend_schema(
+        summary="Export tickets",
+        description="Streams all tickets as NDJSON or CSV, ordered by id.",
+        parameters=[ExportFilterSerializer],
+        responses={200: OpenApiTypes.BINARY},
+    )
+    @action(methods=["GET"], detail=False, url_path="tickets")
+    def tickets(self, request):
+        return self.export(request, "tickets")
+
+    @extend_schema(
+        summary="Export orders",
+        description="Streams all orders as NDJSON or CSV, ordered by id.",
+        parameters=[ExportFilterSerializer],
+        responses={200: OpenApiTypes.BINARY},
+    )
+    @action(methods=["GET"], detail=False, url_path="orders")
+    def orders(self, request):
+        return self.export(request, "orders")
+
+
+class ResponseCacheStatsView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    @extend_schema(
+        summary="Response cache statistics",
+        description="Returns cache hits and misses of every cached viewset.",
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    def get(self, request):
+        return Response(response_cache_stats())
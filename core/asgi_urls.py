@@ -0,0 +1,25 @@
+"""
+URLconf of requests handled in the event loop under ASGI, set by
+core.middleware.ASGIURLConfMiddleware. It is core.urls with the
+airport API's hot read endpoints served by async views.
+"""
+
+from django.urls import include, path
+
+from airport_api import urls as airport_urls
+from core import urls
+
+urlpatterns = [
+    path(
+        "api/airport/",
+        include(
+            (airport_urls.async_urlpatterns, airport_urls.app_name),
+            namespace="airport",
+        ),
+    ),
+    *(
+        pattern
+        for pattern in urls.urlpatterns
+        if getattr(pattern, "namespace", None) != "airport"
+    ),
+]
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import count
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, connections
+from django.utils.connection import ConnectionDoesNotExist
+
+PIN_KEY = "core:db_router:pinned:{user_id}"
+
+# Replica alias the current request reads from, None for the primary.
+read_replica = ContextVar("read_replica", default=None)
+
+
+class ReplicaSelector:
+    """
+    Picks a replica from REPLICA_DATABASES for a request. A replica that
+    can't be connected to is skipped for REPLICA_RETRY_SECONDS.
+    Balances round robin or, with REPLICA_BALANCING = "least_loaded",
+    by the requests of this process currently reading from each replica.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.turns = count()
+        self.down_until = {}
+        self.in_flight = Counter()
+
+    def available(self, alias):
+        if self.down_until.get(alias, 0) > time.monotonic():
+            return False
+        try:
+            connections[alias].ensure_connection()
+        except (ConnectionDoesNotExist, DatabaseError):
+            self.down_until[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+            return False
+        return True
+
+    def choose(self):
+        # Starting at the next replica every time spreads the load
+        # and breaks least-loaded ties.
+        start = next(self.turns) % len(settings.REPLICA_DATABASES)
+        replicas = (
+            settings.REPLICA_DATABASES[start:] + settings.REPLICA_DATABASES[:start]
+        )
+        if settings.REPLICA_BALANCING == "least_loaded":
+            with self.lock:
+                replicas.sort(key=self.in_flight.__getitem__)
+        for alias in replicas:
+            if self.available(alias):
+                return alias
+        return None
+
+    @contextmanager
+    def reading(self):
+        alias = self.choose() if settings.REPLICA_DATABASES else None
+        if alias is None:
+            yield None
+            return
+
+        previous = read_replica.get()
+        read_replica.set(alias)
+        with self.lock:
+            self.in_flight[alias] += 1
+        try:
+            yield alias
+        finally:
+            with self.lock:
+                self.in_flight[alias] -= 1
+            # Not reset with a token: async views start the read in
+            # a thread and end it in the event loop's context.
+            read_replica.set(previous)
+
+
+replicas = ReplicaSelector()
+
+
+def pin_cache():
+    return caches[settings.REPLICA_PIN_CACHE_ALIAS]
+
+
+def pin_to_primary(user):
+    """
+    Sends the user's reads to the primary for REPLICA_PIN_SECONDS,
+    so they see their own writes before the replicas catch up.
+    """
+    pin_cache().set(PIN_KEY.format(user_id=user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def pinned_to_primary(user):
+    if not user.is_authenticated:
+        return False
+    return pin_cache().get(PIN_KEY.format(user_id=user.pk), False)
+
+
+class ReplicaRouter:
+    """
+    Routes reads of REPLICA_APPS models to the replica chosen for the
+    current request, see airport_api.mixins.ReplicaReadMixin.
+    Writes and everything outside such requests go to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = read_replica.get()
+        if alias is not None and model._meta.app_label in settings.REPLICA_APPS:
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {"default", *settings.REPLICA_DATABASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
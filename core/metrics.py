@@ -0,0 +1,513 @@
+import atexit
+import fcntl
+import json
+import math
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from rest_framework.exceptions import Throttled
+from rest_framework.views import exception_handler as default_exception_handler
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Counters of the worker processes that are gone, see Registry.fold.
+ARCHIVE = "archive.json"
+ARCHIVE_LOCK = "archive.lock"
+WORKER_FILE = re.compile(r"^\d+-\d+\.json$")
+
+
+class Registry:
+    """
+    Values of every metric of this process as a flat
+    {(sample name, labels): value} dict, so the values of several
+    processes are aggregated by adding them up.
+
+    With METRICS_DIR set, every process writes its values to
+    `<METRICS_DIR>/<pid>-<start time>.json` at most every
+    METRICS_FLUSH_INTERVAL seconds, from a background thread, and
+    /metrics adds up the files of all the worker processes. Gauges are
+    only added up for the processes that are still alive.
+
+    Counters of a process that is gone are folded into
+    `<METRICS_DIR>/archive.json` and its file is deleted, when it exits
+    or at the next scrape, so the totals never go down and the directory
+    doesn't grow as workers are recycled.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.reset()
+        os.register_at_fork(after_in_child=self.reset)
+        atexit.register(self.close)
+
+    def reset(self):
+        # A forked worker starts from zero, the parent keeps its own file.
+        self.values = defaultdict(float)
+        self.pid = os.getpid()
+        # The start time tells this process apart from an earlier one
+        # that had the same pid.
+        self.started = time.time_ns()
+        self.file_name = f"{self.pid}-{self.started}.json"
+        self.dirty = False
+        self.closed = False
+        self.flusher = None
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def add(self, key, amount):
+        with self.lock:
+            self.values[key] += amount
+            self.dirty = True
+        if self.flusher is None and settings.METRICS_DIR:
+            self.start_flusher()
+
+    def set(self, key, value):
+        with self.lock:
+            self.values[key] = value
+            self.dirty = True
+        if self.flusher is None and settings.METRICS_DIR:
+            self.start_flusher()
+
+    def start_flusher(self):
+        with self.lock:
+            if self.flusher is not None:
+                return
+            self.flusher = threading.Thread(target=self.flush_forever, daemon=True)
+        self.flusher.start()
+
+    def flush_forever(self):
+        stopped = threading.Event()
+        while not stopped.wait(settings.METRICS_FLUSH_INTERVAL):
+            self.refresh()
+            self.flush()
+
+    def refresh(self):
+        for metric in list(self.metrics.values()):
+            metric.refresh()
+
+    def flush(self):
+        if not settings.METRICS_DIR or not self.dirty or self.closed:
+            return
+        with self.lock:
+            samples = [
+                [name, list(labels), value]
+                for (name, labels), value in self.values.items()
+            ]
+            self.dirty = False
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        write_json(
+            os.path.join(settings.METRICS_DIR, self.file_name),
+            {"pid": self.pid, "started": self.started, "samples": samples},
+        )
+
+    def close(self):
+        if not settings.METRICS_DIR:
+            return
+        self.flush()
+        # Whatever is recorded from now on is lost with the process.
+        self.closed = True
+        if os.path.exists(os.path.join(settings.METRICS_DIR, self.file_name)):
+            self.fold([self.file_name])
+
+    def is_cumulative(self, sample_name):
+        metric = self.metrics.get(metric_name(sample_name))
+        return metric is not None and metric.kind != "gauge"
+
+    @contextmanager
+    def archive_lock(self, operation):
+        """
+        Folding takes the lock exclusively and scrapes take it shared,
+        so a scrape never sees a file both on its own and in the archive.
+        """
+        with open(os.path.join(settings.METRICS_DIR, ARCHIVE_LOCK), "a") as lock:
+            fcntl.flock(lock, operation)
+            yield
+
+    def read_archive(self):
+        archive = read_json(os.path.join(settings.METRICS_DIR, ARCHIVE)) or {}
+        return samples_to_values(archive.get("samples", [])), set(
+            archive.get("folded", [])
+        )
+
+    def fold(self, file_names):
+        """
+        Adds the counters and histograms of the given worker files
+        to the archive and deletes the files. The archive remembers
+        the files it holds until they are deleted, so a file is
+        never added twice.
+        """
+        directory = settings.METRICS_DIR
+        with self.archive_lock(fcntl.LOCK_EX):
+            totals, folded = self.read_archive()
+            folded = {
+                file_name
+                for file_name in folded
+                if os.path.exists(os.path.join(directory, file_name))
+            }
+            for file_name in file_names:
+                data = read_json(os.path.join(directory, file_name))
+                if data is None or file_name in folded:
+                    continue
+                for key, value in samples_to_values(data["samples"]).items():
+                    if self.is_cumulative(key[0]):
+                        totals[key] += value
+                folded.add(file_name)
+
+            write_json(
+                os.path.join(directory, ARCHIVE),
+                {"samples": values_to_samples(totals), "folded": sorted(folded)},
+            )
+            for file_name in file_names:
+                try:
+                    os.remove(os.path.join(directory, file_name))
+                except FileNotFoundError:
+                    pass
+
+    def worker_files(self):
+        """
+        Returns {file name: data} of the files of the other processes.
+        """
+        files = {}
+        for file_name in os.listdir(settings.METRICS_DIR):
+            if file_name == self.file_name or not WORKER_FILE.match(file_name):
+                continue
+            data = read_json(os.path.join(settings.METRICS_DIR, file_name))
+            if data is not None:
+                files[file_name] = data
+        return files
+
+    def process_values(self):
+        """
+        Yields (alive, values) of this process and, with METRICS_DIR set,
+        of the other worker processes and of the archive. Files of
+        processes that are gone are folded into the archive afterwards.
+        """
+        with self.lock:
+            yield True, dict(self.values)
+        if not settings.METRICS_DIR or not os.path.isdir(settings.METRICS_DIR):
+            return
+
+        with self.archive_lock(fcntl.LOCK_SH):
+            files = self.worker_files()
+            archived, folded = self.read_archive()
+        latest = {}
+        for data in files.values():
+            latest[data["pid"]] = max(latest.get(data["pid"], 0), data["started"])
+
+        dead = []
+        for file_name, data in files.items():
+            if file_name in folded:
+                continue
+            # An older file of a pid in use belongs to a process
+            # that exited before the pid was reused.
+            alive = data["started"] == latest[data["pid"]] and process_alive(
+                data["pid"]
+            )
+            if not alive:
+                dead.append(file_name)
+            yield alive, samples_to_values(data["samples"])
+        yield False, archived
+
+        if dead:
+            self.fold(dead)
+
+    def collect(self):
+        self.refresh()
+        totals = defaultdict(float)
+        for alive, values in self.process_values():
+            for key, value in values.items():
+                metric = self.metrics.get(metric_name(key[0]))
+                if metric is None or (metric.kind == "gauge" and not alive):
+                    continue
+                totals[key] += value
+        return totals
+
+    def expose(self):
+        samples = defaultdict(list)
+        for (name, labels), value in sorted(self.collect().items()):
+            samples[metric_name(name)].append((name, labels, value))
+
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            metric_samples = samples[metric.name]
+            if not metric_samples and not metric.labelnames:
+                metric_samples = [(metric.name, (), 0)]
+            lines += metric.format(metric_samples)
+        return "\n".join(lines) + "\n"
+
+
+def read_json(path):
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, data):
+    temporary = f"{path}.tmp{os.getpid()}"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(data, file)
+    os.replace(temporary, path)
+
+
+def samples_to_values(samples):
+    values = defaultdict(float)
+    for name, labels, value in samples:
+        values[name, tuple(tuple(label) for label in labels)] += value
+    return values
+
+
+def values_to_samples(values):
+    return [[name, list(labels), value] for (name, labels), value in values.items()]
+
+
+def metric_name(sample_name):
+    for suffix in ("_bucket", "_count", "_sum"):
+        if sample_name.endswith(suffix):
+            return sample_name.removesuffix(suffix)
+    return sample_name
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{escape(value)}"' for name, value in labels)
+    return "{" + pairs + "}"
+
+
+def escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+registry = Registry()
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callbacks = []
+        registry.register(self)
+
+    def labels_key(self, labels):
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    def refresh(self):
+        for callback in self.callbacks:
+            callback(self)
+
+    def format(self, samples):
+        return [
+            f"{name}{format_labels(labels)} {format_value(value)}"
+            for name, labels, value in samples
+        ]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        registry.add((self.name, self.labels_key(labels)), amount)
+
+
+class Gauge(Metric):
+    """
+    A value of every process, added up over the live processes.
+    `refresh_with(callback)` registers `callback(gauge)`
+    that sets the value right before every collection.
+    """
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        registry.set((self.name, self.labels_key(labels)), value)
+
+    def inc(self, amount=1, **labels):
+        registry.add((self.name, self.labels_key(labels)), amount)
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def refresh_with(self, callback):
+        self.callbacks.append(callback)
+        return callback
+
+
+class Histogram(Metric):
+    """
+    Buckets are stored per process as plain counts
+    and made cumulative on exposition.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self.labels_key(labels)
+        bound = self.buckets[bisect_left(self.buckets, value)]
+        registry.add((f"{self.name}_bucket", key + (("le", format_value(bound)),)), 1)
+        registry.add((f"{self.name}_count", key), 1)
+        registry.add((f"{self.name}_sum", key), value)
+
+    def format(self, samples):
+        buckets = defaultdict(dict)
+        rest = []
+        for name, labels, value in samples:
+            if name.endswith("_bucket"):
+                bound = float(dict(labels)["le"])
+                buckets[labels[:-1]][bound] = value
+            else:
+                rest.append((name, labels, value))
+
+        lines = []
+        for labels, counts in sorted(buckets.items()):
+            cumulative = 0
+            for bound in self.buckets:
+                cumulative += counts.get(bound, 0)
+                bucket_labels = labels + (("le", format_value(bound)),)
+                lines.append(
+                    f"{self.name}_bucket{format_labels(bucket_labels)} "
+                    f"{format_value(cumulative)}"
+                )
+        return lines + super().format(rest)
+
+
+def metrics_view(request):
+    """
+    Serves the metrics in the Prometheus text format. With METRICS_TOKEN
+    set, scrapers have to send it as `Authorization: Bearer <token>`.
+    """
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.expose(), content_type=CONTENT_TYPE)
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling API requests.",
+    ("view", "action", "status"),
+)
+request_queries = Counter(
+    "http_request_queries_total",
+    "Database queries run by API requests.",
+    ("view", "action"),
+)
+throttled_requests = Counter(
+    "http_requests_throttled_total",
+    "API requests rejected by a throttle.",
+    ("view",),
+)
+
+
+def exception_handler(exc, context):
+    if isinstance(exc, Throttled):
+        throttled_requests.inc(view=type(context["view"]).__name__)
+    return default_exception_handler(exc, context)
+
+
+db_connections_opened = Counter(
+    "db_connections_opened_total",
+    "New database connections, few with persistent connections or a pool.",
+    ("alias",),
+)
+db_pool_connections = Gauge(
+    "db_pool_connections",
+    "Connections of the psycopg pool by state.",
+    ("alias", "state"),
+)
+db_pool_requests_waiting = Gauge(
+    "db_pool_requests_waiting",
+    "Requests waiting for a connection from the pool.",
+    ("alias",),
+)
+db_pool_waits = Counter(
+    "db_pool_waits_total",
+    "Requests that had to wait for a pool connection.",
+    ("alias",),
+)
+db_pool_wait_seconds = Counter(
+    "db_pool_wait_seconds_total",
+    "Time spent waiting for pool connections.",
+    ("alias",),
+)
+db_pool_timeouts = Counter(
+    "db_pool_timeouts_total",
+    "Requests that got no pool connection in time.",
+    ("alias",),
+)
+
+
+def count_connection(sender, connection, **kwargs):
+    db_connections_opened.inc(alias=connection.alias)
+
+
+connection_created.connect(count_connection)
+
+
+def record_pool_stats(alias, stats):
+    """
+    Records the stats of a psycopg pool, as returned by `pop_stats()`,
+    which resets the cumulative counters after every call.
+    """
+    in_use = stats.get("pool_size", 0) - stats.get("pool_available", 0)
+    db_pool_connections.set(in_use, alias=alias, state="in_use")
+    db_pool_connections.set(stats.get("pool_available", 0), alias=alias, state="idle")
+    db_pool_requests_waiting.set(stats.get("requests_waiting", 0), alias=alias)
+    db_pool_waits.inc(stats.get("requests_queued", 0), alias=alias)
+    db_pool_wait_seconds.inc(stats.get("requests_wait_ms", 0) / 1000, alias=alias)
+    db_pool_timeouts.inc(stats.get("requests_errors", 0), alias=alias)
+
+
+@db_pool_connections.refresh_with
+def refresh_pool_stats(gauge):
+    for connection in connections.all():
+        try:
+            pool = getattr(connection, "pool", None)
+        except ImproperlyConfigured:
+            continue
+        if pool is not None:
+            record_pool_stats(connection.alias, pool.pop_stats())
@@ -0,0 +1,313 @@
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework import serializers
+
+from core.metrics import request_duration, request_queries
+
+logger = logging.getLogger("core.performance")
+
+# Metrics of the request being handled, None outside sampled requests.
+current_metrics = ContextVar("current_metrics", default=None)
+# Wrappers of the queries of the request being handled,
+# run by every connection, see wrapping_queries().
+query_wrappers = ContextVar("query_wrappers", default=())
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.queries = Counter()
+        # Nesting depth of `serializer.data`, only the outermost is timed.
+        self.serializing = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.queries[(sql, repr(params))] += 1
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def duplicate_count(self):
+        return self.query_count - len(self.queries)
+
+
+def timed_data(data):
+    """
+    Wraps a serializer `data` property to add the time spent
+    serializing to the metrics of the current request.
+    """
+
+    def wrapper(serializer):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return data.fget(serializer)
+
+        metrics.serializing += 1
+        started = time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            metrics.serializing -= 1
+            if not metrics.serializing:
+                metrics.serializer_seconds += time.perf_counter() - started
+
+    wrapper.timed = True
+    return property(wrapper)
+
+
+def instrument_serializers():
+    for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+        data = serializer_class.__dict__["data"]
+        if not getattr(data.fget, "timed", False):
+            serializer_class.data = timed_data(data)
+
+
+def run_query_wrappers(execute, sql, params, many, context):
+    for wrapper in query_wrappers.get():
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def install_query_wrappers(connection, **kwargs):
+    if run_query_wrappers not in connection.execute_wrappers:
+        connection.execute_wrappers.append(run_query_wrappers)
+
+
+connection_created.connect(install_query_wrappers)
+
+
+@contextmanager
+def wrapping_queries(wrapper):
+    """
+    Runs `wrapper` around the queries of the current request. It is
+    passed on in a context variable, as connections belong to a thread
+    and the async ORM queries from a thread of its own.
+    """
+    for connection in connections.all():
+        install_query_wrappers(connection)
+    token = query_wrappers.set((*query_wrappers.get(), wrapper))
+    try:
+        yield
+    finally:
+        query_wrappers.reset(token)
+
+
+def response_size(response):
+    if response.streaming:
+        return None
+    return len(response.content)
+
+
+class PerformanceMiddleware:
+    """
+    Measures requests to PERFORMANCE_PATHS. A PERFORMANCE_SAMPLE_RATE
+    share of them also records database time, query and duplicate query
+    counts and serializer time, returned in a Server-Timing header.
+    Sampled requests are logged at INFO and requests slower than
+    PERFORMANCE_SLOW_REQUEST_MS at WARNING, as one JSON line each.
+    Async-capable, so ASGI requests to async views stay in the event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.paths = tuple(settings.PERFORMANCE_PATHS)
+        self.sample_rate = settings.PERFORMANCE_SAMPLE_RATE
+        self.slow_seconds = settings.PERFORMANCE_SLOW_REQUEST_MS / 1000
+        instrument_serializers()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not request.path.startswith(self.paths):
+            return self.get_response(request)
+
+        metrics = RequestMetrics() if random.random() < self.sample_rate else None
+        started = time.perf_counter()
+        if metrics is None:
+            response = self.get_response(request)
+        else:
+            token = current_metrics.set(metrics)
+            try:
+                with wrapping_queries(metrics):
+                    response = self.get_response(request)
+            finally:
+                current_metrics.reset(token)
+        self.finish(request, response, time.perf_counter() - started, metrics)
+        return response
+
+    async def __acall__(self, request):
+        if not request.path.startswith(self.paths):
+            return await self.get_response(request)
+
+        metrics = RequestMetrics() if random.random() < self.sample_rate else None
+        started = time.perf_counter()
+        if metrics is None:
+            response = await self.get_response(request)
+        else:
+            token = current_metrics.set(metrics)
+            try:
+                with wrapping_queries(metrics):
+                    response = await self.get_response(request)
+            finally:
+                current_metrics.reset(token)
+        self.finish(request, response, time.perf_counter() - started, metrics)
+        return response
+
+    def finish(self, request, response, total_seconds, metrics):
+        if metrics is not None:
+            response["Server-Timing"] = self.server_timing(total_seconds, metrics)
+        slow = total_seconds >= self.slow_seconds
+        if metrics is not None or slow:
+            self.log(request, response, total_seconds, metrics, slow)
+
+    def server_timing(self, total_seconds, metrics):
+        return ", ".join(
+            (
+                f"total;dur={total_seconds * 1000:.1f}",
+                f"db;dur={metrics.db_seconds * 1000:.1f};"
+                f'desc="{metrics.query_count} queries '
+                f'{metrics.duplicate_count} duplicates"',
+                f"serializer;dur={metrics.serializer_seconds * 1000:.1f}",
+            )
+        )
+
+    def log(self, request, response, total_seconds, metrics, slow):
+        line = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(total_seconds * 1000, 1),
+            "size": response_size(response),
+            "slow": slow,
+        }
+        if metrics is not None:
+            line.update(
+                db_ms=round(metrics.db_seconds * 1000, 1),
+                queries=metrics.query_count,
+                duplicate_queries=metrics.duplicate_count,
+                serializer_ms=round(metrics.serializer_seconds * 1000, 1),
+            )
+        logger.log(logging.WARNING if slow else logging.INFO, json.dumps(line))
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def view_labels(request):
+    """
+    Returns the view class and action of the request,
+    e.g. ("FlightViewSet", "list").
+    """
+    match = request.resolver_match
+    if match is None:
+        return "unmatched", request.method.lower()
+    view_class = getattr(match.func, "cls", None)
+    if view_class is None:
+        return match.view_name, request.method.lower()
+    actions = getattr(match.func, "actions", None) or {}
+    return view_class.__name__, actions.get(
+        request.method.lower(), request.method.lower()
+    )
+
+
+class MetricsMiddleware:
+    """
+    Counts the latency and database queries of requests to
+    PERFORMANCE_PATHS per view and action for the /metrics endpoint.
+    Async-capable like PerformanceMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.paths = tuple(settings.PERFORMANCE_PATHS)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not request.path.startswith(self.paths):
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with wrapping_queries(counter):
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - started, counter)
+        return response
+
+    async def __acall__(self, request):
+        if not request.path.startswith(self.paths):
+            return await self.get_response(request)
+
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with wrapping_queries(counter):
+            response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - started, counter)
+        return response
+
+    def record(self, request, response, duration, counter):
+        view, action = view_labels(request)
+        request_duration.observe(
+            duration, view=view, action=action, status=response.status_code
+        )
+        request_queries.inc(counter.count, view=view, action=action)
+
+
+class ASGIURLConfMiddleware:
+    """
+    Resolves requests handled in the event loop with ASGI_URLCONF, which
+    serves the hot read endpoints with async views. Under WSGI every
+    async view would run in an event loop of its own, slower than the
+    sync viewsets, so those requests keep ROOT_URLCONF.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.urlconf = settings.ASGI_URLCONF
+        return await self.get_response(request)
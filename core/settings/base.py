@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/5.1/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
+
 import os
 from datetime import timedelta
 from pathlib import Path
@@ -23,17 +24,16 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = os.environ.get("DJANGO_SECRET_KEY", "django-insecure-%%%ar%qb+yiw^npt99coy#h%(8x*-fu6w%=kk$+nyo-_)7o(*9")
+SECRET_KEY = os.environ.get(
+    "DJANGO_SECRET_KEY",
+    "django-insecure-%%%ar%qb+yiw^npt99coy#h%(8x*-fu6w%=kk$+nyo-_)7o(*9",
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
 ALLOWED_HOSTS = []
 
-INTERNAL_IPS = [
-    "127.0.0.1",
-]
-
 # Application definition
 
 INSTALLED_APPS = [
@@ -43,7 +43,6 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
-    "debug_toolbar",
     "rest_framework",
     "rest_framework.authtoken",
     "drf_spectacular",
@@ -54,7 +53,9 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
+    "core.middleware.MetricsMiddleware",
+    "core.middleware.PerformanceMiddleware",
+    "core.middleware.ASGIURLConfMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -64,6 +65,9 @@ MIDDLEWARE = [
 ]
 
 ROOT_URLCONF = "core.urls"
+# URLconf of requests handled in the event loop under ASGI,
+# see core.middleware.ASGIURLConfMiddleware.
+ASGI_URLCONF = "core.asgi_urls"
 
 TEMPLATES = [
     {
@@ -94,6 +98,24 @@ DATABASES = {
     }
 }
 
+# Safe-method requests of the REPLICA_APPS viewsets read from one of
+# the REPLICA_DATABASES aliases, see core.db_router.
+DATABASE_ROUTERS = ["core.db_router.ReplicaRouter"]
+REPLICA_DATABASES = []
+REPLICA_APPS = ("airport_api",)
+# "round_robin" or "least_loaded", by the requests of a worker
+# currently reading from each replica.
+REPLICA_BALANCING = os.environ.get("REPLICA_BALANCING", "round_robin")
+# Seconds an unreachable replica is skipped before it is tried again.
+REPLICA_RETRY_SECONDS = int(os.environ.get("REPLICA_RETRY_SECONDS", 30))
+# Seconds replicas are allowed to lag. A user reads from the primary for
+# this long after a write, so they see it before the replicas catch up,
+# and responses read from a replica are not cached for this long after
+# a write to their models. Pins are kept in this cache, point it to
+# a shared backend when running several workers.
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", 10))
+REPLICA_PIN_CACHE_ALIAS = os.environ.get("REPLICA_PIN_CACHE_ALIAS", "default")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -155,10 +177,11 @@ REST_FRAMEWORK = {
         "rest_framework.throttling.UserRateThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {
-        "anon": "100/day",
-        "user": "1000/day",
+        "anon": os.environ.get("THROTTLE_ANON_RATE", "100/day"),
+        "user": os.environ.get("THROTTLE_USER_RATE", "1000/day"),
     },
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "EXCEPTION_HANDLER": "core.metrics.exception_handler",
 }
 
 SIMPLE_JWT = {
@@ -167,6 +190,71 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": True,
 }
 
+# Seconds before a worker rebuilds its in-memory flight graph
+# to pick up schedule changes made by other workers.
+ITINERARY_GRAPH_TTL = int(os.environ.get("ITINERARY_GRAPH_TTL", 300))
+
+# Flights tried by one itinerary search before it returns
+# what it has found so far.
+ITINERARY_MAX_EXPANSIONS = int(os.environ.get("ITINERARY_MAX_EXPANSIONS", 10000))
+
+# Seconds before a worker reloads its airport autocomplete index
+# when the cache doesn't tell it about changes made by other workers.
+AUTOCOMPLETE_INDEX_TTL = int(os.environ.get("AUTOCOMPLETE_INDEX_TTL", 300))
+
+# Seat maps are invalidated on every ticket change,
+# the timeout only bounds how long an unused map stays in the cache.
+SEAT_MAP_CACHE_TIMEOUT = int(os.environ.get("SEAT_MAP_CACHE_TIMEOUT", 60 * 60))
+
+# Cache backend for the reference endpoints (cities, airports, routes, ...).
+# Defaults to the local-memory cache of every worker, point it
+# to a shared backend configured in CACHES to share hits between workers.
+RESPONSE_CACHE_ALIAS = os.environ.get("RESPONSE_CACHE_ALIAS", "default")
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get("RESPONSE_CACHE_TIMEOUT", 60 * 60))
+# Seconds the ETag and Last-Modified of a response are reused
+# for requests that don't revalidate.
+VALIDATORS_CACHE_TIMEOUT = int(os.environ.get("VALIDATORS_CACHE_TIMEOUT", 60))
+
+# Longest time a customer can keep seats held during checkout.
+SEAT_HOLD_MAX_MINUTES = int(os.environ.get("SEAT_HOLD_MAX_MINUTES", 15))
+# Most seats of one flight a customer can hold at once, so one account
+# can't keep a flight off sale by holding and renewing all of its seats.
+SEAT_HOLD_MAX_SEATS = int(os.environ.get("SEAT_HOLD_MAX_SEATS", 9))
+
+# Requests measured by core.middleware.PerformanceMiddleware.
+PERFORMANCE_PATHS = ("/api/airport/", "/api/user/")
+# Share of the requests that also record database and serializer
+# time and return them in a Server-Timing header.
+PERFORMANCE_SAMPLE_RATE = float(os.environ.get("PERFORMANCE_SAMPLE_RATE", 0.1))
+# Requests slower than this are logged whether they are sampled or not.
+PERFORMANCE_SLOW_REQUEST_MS = int(os.environ.get("PERFORMANCE_SLOW_REQUEST_MS", 500))
+
+# Directory where every worker process writes its metrics, so /metrics
+# adds up all the workers of a server. Without it, /metrics only shows
+# the process that answers the scrape.
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+# Seconds between writes of a worker's metrics to METRICS_DIR.
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 1))
+# Bearer token scrapers have to send to /metrics, if set.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# Slow requests are logged at WARNING, set PERFORMANCE_LOG_LEVEL=INFO
+# to also log every sampled request.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "core.performance": {
+            "handlers": ["console"],
+            "level": os.environ.get("PERFORMANCE_LOG_LEVEL", "WARNING"),
+            "propagate": False,
+        },
+    },
+}
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Airport API",
     "DESCRIPTION": "Airport management system",
@@ -1,3 +1,5 @@
+import os
+
 from .base import *
 
 
@@ -6,6 +8,19 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+INTERNAL_IPS = [
+    "127.0.0.1",
+]
+
+# The toolbar slows every request down, so it only runs in development.
+INSTALLED_APPS += ["debug_toolbar"]
+MIDDLEWARE.insert(
+    MIDDLEWARE.index("core.middleware.PerformanceMiddleware") + 1,
+    "debug_toolbar.middleware.DebugToolbarMiddleware",
+)
+
+PERFORMANCE_SAMPLE_RATE = float(os.environ.get("PERFORMANCE_SAMPLE_RATE", 1))
+
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
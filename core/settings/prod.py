@@ -1,3 +1,4 @@
+import copy
 import os
 
 from .base import *
@@ -6,7 +7,12 @@ from .base import *
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = False
 
-ALLOWED_HOSTS = []
+# Comma separated hosts the app answers to, besides the Render hostname.
+ALLOWED_HOSTS = [
+    host.strip()
+    for host in os.environ.get("DJANGO_ALLOWED_HOSTS", "").split(",")
+    if host.strip()
+]
 
 RENDER_EXTERNAL_HOSTNAME = os.environ.get("RENDER_EXTERNAL_HOSTNAME")
 if RENDER_EXTERNAL_HOSTNAME:
@@ -23,5 +29,38 @@ DATABASES = {
         "PASSWORD": os.environ["POSTGRES_PASSWORD"],
         "HOST": os.environ["POSTGRES_HOST"],
         "PORT": int(os.environ["POSTGRES_DB_PORT"]),
+        # Seconds a connection is reused across requests, so requests
+        # don't pay a TCP and auth handshake each. With gthread workers
+        # every thread keeps its own connection.
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        # Check a reused connection before the request that reuses it.
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
     }
 }
+
+# A psycopg connection pool per worker process, shared by its threads or
+# ASGI tasks, instead of a persistent connection per thread.
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", 0))
+if DB_POOL_MAX_SIZE:
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+        "max_size": DB_POOL_MAX_SIZE,
+        # Seconds a request waits for a free connection before failing.
+        "timeout": float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+    }
+
+# Comma separated hosts of streaming replicas of the primary,
+# with the same database, user and password.
+DB_REPLICA_HOSTS = os.environ.get("DB_REPLICA_HOSTS", "")
+for number, host in enumerate(filter(None, DB_REPLICA_HOSTS.split(",")), 1):
+    alias = f"replica{number}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host.strip(),
+        "OPTIONS": copy.deepcopy(DATABASES["default"]["OPTIONS"]),
+        # Tests read replicas through the test database of the primary.
+        "TEST": {"MIRROR": "default"},
+    }
+    REPLICA_DATABASES.append(alias)
@@ -15,6 +15,7 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
@@ -24,13 +25,14 @@ from drf_spectacular.views import (
     SpectacularRedocView,
 )
 
+from core.metrics import metrics_view
 from core.settings import base
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/airport/", include("airport_api.urls", namespace="airport")),
     path("api/user/", include("user.urls", namespace="user")),
-    path("__debug__/", include("debug_toolbar.urls")),
+    path("metrics", metrics_view, name="metrics"),
     path("api/doc/", SpectacularAPIView.as_view(), name="schema"),
     path(
         "api/doc/swagger/",
@@ -43,3 +45,6 @@ urlpatterns = [
         name="redoc",
     ),
 ] + static(base.MEDIA_URL, document_root=base.MEDIA_ROOT)
+
+if "debug_toolbar" in settings.INSTALLED_APPS:
+    urlpatterns.append(path("__debug__/", include("debug_toolbar.urls")))
@@ -0,0 +1,60 @@
+"""
+Gunicorn settings for production, loaded automatically by
+`gunicorn` from the project root. Every setting can be changed
+with the environment variables below.
+
+GUNICORN_WORKER_CLASS=gthread (default) serves core.wsgi with threads,
+GUNICORN_WORKER_CLASS=uvicorn serves core.asgi with uvicorn workers.
+"""
+
+import multiprocessing
+import os
+import shutil
+
+worker_mode = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+if worker_mode == "uvicorn":
+    wsgi_app = "core.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+else:
+    wsgi_app = "core.wsgi:application"
+    worker_class = "gthread"
+    threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+
+# Load the app once in the master, workers fork with the code
+# already imported, which starts them faster and shares memory.
+preload_app = True
+
+# Restart workers after a random number of requests around max_requests,
+# so slow memory growth is bounded and workers don't restart all at once.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+# Time for in-flight requests to finish on restart and shutdown.
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+
+
+def on_starting(server):
+    # Metrics files of the previous run would be added to the new workers'.
+    metrics_dir = os.environ.get("METRICS_DIR")
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir, exist_ok=True)
+
+
+def post_fork(server, worker):
+    # Connections and pools opened while preloading must not be shared
+    # by workers, every worker opens its own.
+    from django.db import connections
+
+    connections.close_all()
+    for connection in connections.all():
+        if hasattr(connection, "close_pool"):
+            connection.close_pool()